@@ -0,0 +1,5 @@
+import sys
+
+from macats.cli import main
+
+sys.exit(main())
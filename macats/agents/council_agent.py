@@ -1,39 +1,146 @@
 # macats/agents/council_agent.py
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Dict, Optional, Tuple
+
 from macats.event_bus import Event, EventBus
 
 DIR = {"long": 1, "short": -1, "flat": 0}
 
+
+def _score(x: Dict[str, Any]) -> float:
+    side = str(x.get("signal", "flat")).lower()
+    try:
+        conf = float(x.get("confidence", 0.0))
+    except Exception:
+        conf = 0.0
+    return DIR.get(side, 0) * max(0.0, min(conf, 1.0))
+
+
 class CouncilAgent:
     """
     Combines LLM analyst votes into a single action.
-    Weights: tech 0.5, sentiment 0.3, macro 0.2 (tweak as you like).
+    Weights: tech 0.5, sentiment 0.3, macro 0.2 (tweak as you like), or any
+    {name: weight} mapping for an arbitrary set of analysts.
     Emits 'signals.target' with side + strength 0..1
+
+    Two ways in:
+      - run():    consumes complete 'analysis.result' payloads
+      - decide(): quorum mode — takes the analyst calls themselves, scores votes
+                  as they arrive and decides as soon as the weight still pending
+                  can no longer move s across ±threshold; slow calls are cancelled.
     """
-    def __init__(self, bus: EventBus, w_tech=0.5, w_sent=0.3, w_macro=0.2):
+    def __init__(self, bus: EventBus, w_tech=0.5, w_sent=0.3, w_macro=0.2,
+                 weights: Optional[Dict[str, float]] = None,
+                 threshold: float = 0.1,
+                 vote_timeout: Optional[float] = None):
         self.bus = bus
-        self.w = (w_tech, w_sent, w_macro)
+        self.weights: Dict[str, float] = dict(weights) if weights else {
+            "technical": w_tech, "sentiment": w_sent, "macro": w_macro,
+        }
+        self.threshold = threshold
+        self.vote_timeout = vote_timeout      # secs per vote, counted from round start; late votes count as flat
+
+        # time-to-decision metrics (quorum mode)
+        self.rounds = 0
+        self.early = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self._ttd_ms: deque = deque(maxlen=256)
+
+    # --------------------------- scoring ---------------------------
+
+    def _map(self, s: float) -> Tuple[str, float]:
+        # Map s -> final side & strength
+        if s > self.threshold:
+            return "long", min(1.0, s)
+        if s < -self.threshold:
+            return "short", min(1.0, -s)
+        return "flat", 0.0
+
+    def _settled(self, s: float, pending_w: float) -> bool:
+        """True once no outcome of the pending votes can change the side."""
+        lo, hi = s - pending_w, s + pending_w
+        th = self.threshold
+        return lo > th or hi < -th or (lo >= -th and hi <= th)
+
+    async def _emit(self, s: float, votes: Dict[str, Any], **extra) -> None:
+        side, strength = self._map(s)
+        await self.bus.publish(Event(topic="strategy.log", payload={"note": f"Council s={s:.3f}", "votes": votes, **extra}))
+        await self.bus.publish(Event(topic="signals.target", payload={"side": side, "strength": strength}))
+
+    # --------------------------- quorum mode ---------------------------
+
+    async def decide(self, calls: Dict[str, Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Run analyst calls concurrently and decide on a quorum of votes.
+        Analysts without a weight are still awaited but do not move s.
+        Strength on an early decision is taken from the votes received so far.
+        """
+        t0 = time.perf_counter()
+        names = {asyncio.ensure_future(c): name for name, c in calls.items()}
+        pending = set(names)
+        pending_w = sum(abs(self.weights.get(n, 0.0)) for n in names.values())
+        deadline = t0 + self.vote_timeout if self.vote_timeout else None
+
+        s = 0.0
+        votes: Dict[str, Any] = {}
+        timed_out = False
+        try:
+            while pending and not self._settled(s, pending_w):
+                timeout = None if deadline is None else max(0.0, deadline - time.perf_counter())
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    timed_out = True
+                    break
+                for t in done:
+                    name = names[t]
+                    w = self.weights.get(name, 0.0)
+                    pending_w -= abs(w)
+                    if t.exception() is not None:
+                        votes[name] = {"signal": "flat", "confidence": 0.0, "error": str(t.exception())}
+                        continue
+                    votes[name] = t.result()
+                    s += w * _score(votes[name])
+        finally:
+            for t in pending:
+                t.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        ttd_ms = (time.perf_counter() - t0) * 1000.0
+        skipped = sorted(names[t] for t in pending)
+        self.rounds += 1
+        self.early += int(bool(skipped) and not timed_out)
+        self.timeouts += int(timed_out)
+        self.cancelled += len(skipped)
+        self._ttd_ms.append(ttd_ms)
+
+        side, strength = self._map(s)
+        await self._emit(s, votes, ttd_ms=round(ttd_ms, 3), skipped=skipped, timed_out=timed_out)
+        return {"side": side, "strength": strength, "s": s, "votes": votes,
+                "skipped": skipped, "timed_out": timed_out, "ttd_ms": ttd_ms}
+
+    def metrics(self) -> Dict[str, Any]:
+        ttd = sorted(self._ttd_ms)
+        n = len(ttd)
+        return {
+            "rounds": self.rounds,
+            "early": self.early,
+            "timeouts": self.timeouts,
+            "cancelled_calls": self.cancelled,
+            "ttd_ms_p50": ttd[n // 2] if n else 0.0,
+            "ttd_ms_p95": ttd[min(n - 1, int(n * 0.95))] if n else 0.0,
+            "ttd_ms_max": ttd[-1] if n else 0.0,
+        }
+
+    # --------------------------- bus mode ---------------------------
 
     async def run(self):
         sub = self.bus.subscribe("analysis.result")
         async for e in sub:
             d = e.payload
-            tech, sent, macro = d["technical"], d["sentiment"], d["macro"]
-            w_tech, w_sent, w_macro = self.w
-
-            def score(x):
-                side = x.get("signal","flat").lower()
-                conf = float(x.get("confidence", 0.0))
-                return DIR.get(side, 0) * max(0.0, min(conf, 1.0))
-
-            s = w_tech*score(tech) + w_sent*score(sent) + w_macro*score(macro)
-
-            # Map s -> final side & strength
-            if s > 0.1:
-                side, strength = "long", min(1.0, s)
-            elif s < -0.1:
-                side, strength = "short", min(1.0, -s)
-            else:
-                side, strength = "flat", 0.0
-
-            await self.bus.publish(Event(topic="strategy.log", payload={"note": f"Council s={s:.3f}", "votes": {"tech":tech,"sent":sent,"macro":macro}}))
-            await self.bus.publish(Event(topic="signals.target", payload={"side": side, "strength": strength}))
\ No newline at end of file
+            votes = {name: d.get(name, {}) for name in self.weights}
+            s = sum(w * _score(votes[name]) for name, w in self.weights.items())
+            await self._emit(s, votes)
@@ -1,12 +1,73 @@
+import asyncio
+from typing import List, Optional
+
 from macats.event_bus import Event, EventBus
+from macats.paper_engine import Fill, PaperConfig, PaperEngine
+from macats import tracing
 
 class ExecutionAgent:
-    def __init__(self, bus: EventBus):
+    """
+    Paper execution through the simulated exchange (PaperEngine).
+    Listens:
+      - orders.planned {"order_id"?,"symbol","side","qty","price"?,"type"?,"limit_price"?,"atr"?}
+      - orders.batch   {"cycle","orders":[order, ...]}   (RiskAgent basket)
+      - orders.cancel  {"order_id"}
+      - market.last / market.bar   (quotes, volume for partial fills, resting limits)
+    Emits:
+      - exec.fills {"status":"filled"|"rejected", ...order, "order_id","fill_id","qty","price","fee",...}
+    This is the only publisher of exec.fills; duplicate order_ids are filled once.
+    Fills keep the order's trace, marked "filled".
+    """
+    def __init__(self, bus: EventBus, engine: Optional[PaperEngine] = None):
         self.bus = bus
+        self.engine = engine or PaperEngine(PaperConfig.from_settings())
+
+    async def _publish(self, fills: List[Fill]):
+        for f in fills:
+            if f.get("trace") and f.get("status") == "filled":
+                f["trace"] = tracing.mark(f["trace"], "filled")
+            await self.bus.publish(Event(topic="exec.fills", payload=f))
+
+    async def _on_orders(self):
+        latency = self.engine.cfg.latency_ms / 1000.0
+        async for e in self.bus.subscribe("orders.planned"):
+            await self._publish(self.engine.submit(e.payload))
+            if latency > 0:
+                asyncio.get_running_loop().call_later(latency, self._release)
+
+    async def _on_batches(self):
+        latency = self.engine.cfg.latency_ms / 1000.0
+        async for e in self.bus.subscribe("orders.batch"):
+            submit = self.engine.submit
+            await self._publish([f for o in e.payload.get("orders", ()) for f in submit(o)])
+            if latency > 0:
+                asyncio.get_running_loop().call_later(latency, self._release)
+
+    def _release(self):
+        fills = self.engine.advance()
+        if fills:
+            asyncio.ensure_future(self._publish(fills))
+
+    async def _on_cancels(self):
+        async for e in self.bus.subscribe("orders.cancel"):
+            self.engine.cancel(str(e.payload.get("order_id")))
+
+    async def _on_prices(self):
+        async for e in self.bus.subscribe("market.last"):
+            p = e.payload
+            fills = self.engine.on_price(str(p["symbol"]), float(p["price"]))
+            if fills:
+                await self._publish(fills)
+
+    async def _on_bars(self):
+        async for e in self.bus.subscribe("market.bar"):
+            p = e.payload
+            if p.get("c") is None or p.get("closed") is False:
+                continue
+            fills = self.engine.on_bar(str(p["symbol"]), float(p["h"]), float(p["l"]), float(p["c"]),
+                                       float(p.get("v") or 0.0))
+            if fills:
+                await self._publish(fills)
 
     async def run(self):
-        sub = self.bus.subscribe("orders.planned")
-        async for e in sub:
-            order = e.payload
-            # Paper “fill” for now
-            await self.bus.publish(Event(topic="exec.fills", payload={"status": "filled", **order}))
\ No newline at end of file
+        await asyncio.gather(self._on_orders(), self._on_batches(), self._on_cancels(), self._on_prices(), self._on_bars())
@@ -1,11 +1,21 @@
 import asyncio
+import math
+import time
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
-import numpy as np
+from typing import Callable, Dict, List, Optional, Tuple
 import pandas as pd
 
 from macats.event_bus import Event, EventBus
-from macats.data.market import load_ohlcv, indicators
+from macats.data.market import load_ohlcv, fetch_last_price
+from macats.data.bar_store import STORE
+from macats.data.universe import (DEFAULT_UNIVERSE, Snapshot, UniverseFilter, bar_snapshot, parse_universe,
+                                  shard_universe, ticker_snapshot)
+from macats.scheduler import BarScheduler, bar_open, closed_bars, timeframe_seconds
+from macats.rolling import KeyedRollingStats
+from macats.features import CONTEXTS, FeatureContext
+from macats.agents.signal_netting_agent import cycle_topic
+from macats.checkpoint import Checkpointer
+from macats import tracing
 from macats.config import SETTINGS
 
 
@@ -18,31 +28,17 @@ class FSVZOParams:
     min_confluence: int = 3      # trade if >=3 out of F,S,V,Z,O
 
 
-def _latest(df: pd.DataFrame, col: str) -> float:
-    """Return the last scalar value of df[col] as float."""
-    val = df[col].iloc[-1]
-    # in case it's a 0-dim array/Series, item() handles it
-    try:
-        return float(getattr(val, "item", lambda: val)())
-    except Exception:
-        return float(val)
+def _volume_anomaly(ctx: FeatureContext, mult: float) -> bool:
+    return bool(ctx.latest("v") > mult * ctx.latest("vol_sma"))
 
 
-def _volume_anomaly(df: pd.DataFrame, mult: float) -> bool:
-    v = _latest(df, "v")
-    v_sma = float(df["v"].rolling(20).mean().iloc[-1])
-    return bool(v > mult * v_sma)
-
-
-def _key_zones(df: pd.DataFrame) -> Dict[str, float]:
+def _key_zones(ctx: FeatureContext) -> Dict[str, float]:
     # Simple zones: lookback window highs/lows and prior pivot
-    d1 = df.tail(48).copy()
-    yh = float(d1["h"].max())
-    yl = float(d1["l"].min())
+    yh = float(ctx["h"][-48:].max())
+    yl = float(ctx["l"][-48:].min())
     # prior bar pivot
-    if len(df) >= 2:
-        prior = df.iloc[-2]
-        pivot = float((prior["h"] + prior["l"] + prior["c"]) / 3.0)
+    if len(ctx) >= 2:
+        pivot = float((ctx["h"][-2] + ctx["l"][-2] + ctx["c"][-2]) / 3.0)
     else:
         pivot = float((yh + yl) / 2.0)
     return {"y_high": yh, "y_low": yl, "pivot": pivot}
@@ -55,43 +51,37 @@ def _near_zone(price: float, zones: Dict[str, float], tol_pct: float) -> bool:
     return False
 
 
-def _overlay_long(df: pd.DataFrame) -> bool:
-    c = _latest(df, "c")
-    # EMAs and BB mid as scalars
-    ema_fast = float(df["c"].ewm(span=20, min_periods=20).mean().iloc[-1])
-    ema_slow = float(df["c"].ewm(span=50, min_periods=50).mean().iloc[-1])
-    bb_mid   = float(df["c"].rolling(20).mean().iloc[-1])
-    # RSI trend up?
-    rsi_now = _latest(df, "rsi")
-    rsi_prev = float(df["rsi"].iloc[-3:-1].mean()) if len(df) >= 3 else rsi_now
-    return bool((ema_fast > ema_slow) and (c > bb_mid) and (rsi_now >= rsi_prev))
+def _rsi_now_prev(ctx: FeatureContext) -> Tuple[float, float]:
+    rsi_now = ctx.latest("rsi")
+    return rsi_now, (ctx.latest("rsi_prev") if len(ctx) >= 3 else rsi_now)
+
+
+def _overlay_long(ctx: FeatureContext) -> bool:
+    # EMAs and BB mid come from the context: computed once for both overlays
+    rsi_now, rsi_prev = _rsi_now_prev(ctx)    # RSI trend up?
+    return bool((ctx.latest("ema_fast") > ctx.latest("ema_slow")) and (ctx.latest("c") > ctx.latest("bb_mid"))
+                and (rsi_now >= rsi_prev))
 
 
-def _overlay_short(df: pd.DataFrame) -> bool:
-    c = _latest(df, "c")
-    ema_fast = float(df["c"].ewm(span=20, min_periods=20).mean().iloc[-1])
-    ema_slow = float(df["c"].ewm(span=50, min_periods=50).mean().iloc[-1])
-    bb_mid   = float(df["c"].rolling(20).mean().iloc[-1])
-    rsi_now = _latest(df, "rsi")
-    rsi_prev = float(df["rsi"].iloc[-3:-1].mean()) if len(df) >= 3 else rsi_now
-    return bool((ema_fast < ema_slow) and (c < bb_mid) and (rsi_now <= rsi_prev))
+def _overlay_short(ctx: FeatureContext) -> bool:
+    rsi_now, rsi_prev = _rsi_now_prev(ctx)
+    return bool((ctx.latest("ema_fast") < ctx.latest("ema_slow")) and (ctx.latest("c") < ctx.latest("bb_mid"))
+                and (rsi_now <= rsi_prev))
 
 
-def _sentiment_proxy_long(df: pd.DataFrame) -> bool:
-    rsi_now = _latest(df, "rsi")
-    rsi_prev = float(df["rsi"].iloc[-3:-1].mean()) if len(df) >= 3 else rsi_now
+def _sentiment_proxy_long(ctx: FeatureContext) -> bool:
+    rsi_now, rsi_prev = _rsi_now_prev(ctx)
     return bool((rsi_now < 40.0) and (rsi_now > rsi_prev))
 
 
-def _sentiment_proxy_short(df: pd.DataFrame) -> bool:
-    rsi_now = _latest(df, "rsi")
-    rsi_prev = float(df["rsi"].iloc[-3:-1].mean()) if len(df) >= 3 else rsi_now
+def _sentiment_proxy_short(ctx: FeatureContext) -> bool:
+    rsi_now, rsi_prev = _rsi_now_prev(ctx)
     return bool((rsi_now > 60.0) and (rsi_now < rsi_prev))
 
 
-def _direction(df: pd.DataFrame) -> str:
-    sma_fast = _latest(df, "sma_fast")
-    sma_slow = _latest(df, "sma_slow")
+def _direction(ctx: FeatureContext) -> str:
+    sma_fast = ctx.latest("sma_fast")
+    sma_slow = ctx.latest("sma_slow")
     if sma_fast > sma_slow:
         return "long"
     if sma_fast < sma_slow:
@@ -105,46 +95,82 @@ class FSVZOScannerAgent:
     Emits:
       - strategy.log  (informational)
       - market.last   {"symbol","price"}  (so PortfolioAgent can MTM)
-      - signals.target {"symbol","side","strength","sl_price","tp_price","atr"}
+      - signals.target {"symbol","side","strength","score","sl_price","tp_price","atr","cycle","trace"}
+      - signals.cycle  {"cycle","shard","shard_count","signals","symbols"}  after each bar-close pass
+    With topic="signals.candidate" the two go to signals.candidate(.cycle) for SignalNettingAgent.
+    Bars come from the process-wide bar store (one download per symbol per bar, shared with
+    TechAgent). `loader` replaces data.market.load_ohlcv (same signature) and bypasses the
+    store, e.g. a synthetic market for load tests.
+    With UNIVERSE_* set, one bulk ticker snapshot (bar-store stats if that fails) picks the
+    liquid / moving subset each refresh; the rest is neither fetched nor evaluated. Symbols
+    with an open position (tracked from exec.fills since start) are always scanned.
     """
 
-    def __init__(self, bus: EventBus, params: FSVZOParams | None = None):
+    def __init__(self, bus: EventBus, params: FSVZOParams | None = None, topic: str = "signals.target",
+                 loader: Optional[Callable[..., pd.DataFrame]] = None, state_dir: str | None = None):
         self.bus = bus
+        self.load_ohlcv = loader or load_ohlcv
+        self.bars = None if loader else STORE
         self.params = params or FSVZOParams()
-        self.universe: List[str] = [s.strip() for s in getattr(SETTINGS, "universe", "BTC/USDT,ETH/USDT,SOL/USDT,BNB/USDT,XRP/USDT,ADA/USDT,DOGE/USDT,AVAX/USDT,DOT/USDT,MATIC/USDT,TRX/USDT,LINK/USDT,ATOM/USDT,LTC/USDT,UNI/USDT,ETC/USDT,XMR/USDT,APT/USDT,ARB/USDT,NEAR/USDT,OP/USDT,HBAR/USDT,ICP/USDT,FIL/USDT,STX/USDT,SUI/USDT,ALGO/USDT,VET/USDT,MKR/USDT,GRT/USDT,SAND/USDT,AXS/USDT,AAVE/USDT,RUNE/USDT,THETA/USDT,EGLD/USDT,KAVA/USDT,INJ/USDT,CRV/USDT,FTM/USDT,DYDX/USDT,LDO/USDT,GMX/USDT,ENS/USDT,CHZ/USDT,COMP/USDT,1INCH/USDT,BAL/USDT,ZIL/USDT,FLR/USDT").split(",")]
+        self.topic = topic
+        universe = parse_universe(getattr(SETTINGS, "universe", DEFAULT_UNIVERSE))
+        # multi-node: each scanner takes its consistent-hash shard of the universe
+        self.universe: List[str] = shard_universe(universe, SETTINGS.shard_index, SETTINGS.shard_count)
         self.exchange_id = SETTINGS.exchange_id
         self.interval = SETTINGS.timeframe
         self.lookback = "7d"
+        self.filter = UniverseFilter(self._snapshot, min_quote_volume=SETTINGS.universe_min_quote_vol,
+                                     min_range_pct=SETTINGS.universe_min_range_pct, top_n=SETTINGS.universe_top_n,
+                                     refresh_secs=SETTINGS.universe_refresh_secs)
+        self.positions: Dict[str, float] = {}    # symbol -> net filled qty (signed), from exec.fills
+        self.skipped = 0
+        if state_dir:
+            self._seed_positions(state_dir)
+
+    def _seed_positions(self, state_dir: str) -> None:
+        """Positions held across a restart: RiskAgent checkpoints filled qty per symbol."""
+        state, records = Checkpointer(state_dir, "risk").load(repair=False)
+        pos: Dict[str, float] = dict(state["pos"]) if state is not None else {}
+        for r in records:
+            pos[r["s"]] = r["q"]
+        self.positions.update({sym: q for sym, q in pos.items() if abs(q) > 1e-12})
+
+    def _snapshot(self, symbols: List[str]) -> Snapshot:
+        try:
+            return ticker_snapshot(symbols, self.exchange_id)
+        except Exception:
+            return bar_snapshot(STORE, symbols, self.interval)
 
     def _evaluate(self, sym: str, df: pd.DataFrame) -> Tuple[str, Dict]:
-        df = indicators(df)
+        # features over the rows indicators() would keep, shared until the next bar
+        ctx = CONTEXTS.get(sym, self.interval, df).indicators()
 
         # === latest scalars ===
-        price = _latest(df, "c")
-        atr   = _latest(df, "atr")
+        price = ctx.latest("c")
+        atr   = ctx.latest("atr")
 
         # Signals
-        v = _volume_anomaly(df, self.params.vol_mult)
-        zones = _key_zones(df)
+        v = _volume_anomaly(ctx, self.params.vol_mult)
+        zones = _key_zones(ctx)
         z = _near_zone(price, zones, self.params.zone_pct)
-        bias = _direction(df)
+        bias = _direction(ctx)
 
         if bias == "long":
-            o = _overlay_long(df)
-            s = _sentiment_proxy_long(df)
+            o = _overlay_long(ctx)
+            s = _sentiment_proxy_long(ctx)
             side = "long"
         elif bias == "short":
-            o = _overlay_short(df)
-            s = _sentiment_proxy_short(df)
+            o = _overlay_short(ctx)
+            s = _sentiment_proxy_short(ctx)
             side = "short"
         else:
             # No clear bias: require strong confluence in either direction
-            long_o = _overlay_long(df)
-            short_o = _overlay_short(df)
+            long_o = _overlay_long(ctx)
+            short_o = _overlay_short(ctx)
             if long_o and z and v:
-                side = "long"; o = True; s = _sentiment_proxy_long(df)
+                side = "long"; o = True; s = _sentiment_proxy_long(ctx)
             elif short_o and z and v:
-                side = "short"; o = True; s = _sentiment_proxy_short(df)
+                side = "short"; o = True; s = _sentiment_proxy_short(ctx)
             else:
                 return "flat", {"why": "no bias", "price": price}
 
@@ -177,30 +203,153 @@ class FSVZOScannerAgent:
 
         return "flat", {"score": score, "price": price, "signals": {"F": f, "S": s, "V": v, "Z": z, "O": o}}
 
+    async def _scan(self, sym: str, cycle: Optional[int] = None) -> bool:
+        try:
+            trace = tracing.start("scan")
+            if self.bars is not None:
+                df = self.bars.frame(sym, self.interval, lookback=self.lookback, exchange_id=self.exchange_id)
+            else:
+                df = closed_bars(self.load_ohlcv(symbol=sym, interval=self.interval, lookback=self.lookback,
+                                                 exchange_id=self.exchange_id), self.interval)
+            trace = tracing.mark(trace, "fetched")
+            side, detail = self._evaluate(sym, df)
+
+            # publish latest price for PortfolioAgent mark-to-market
+            await self.bus.publish(Event(topic="market.last", payload={"symbol": sym, "price": float(detail.get("price", float(df['c'].iloc[-1]))) }))
+
+            note = {"symbol": sym, **detail}
+            await self.bus.publish(Event(topic="strategy.log", payload={"note": f"FSVZO scan {sym}: {side}", **note}))
+
+            if side != "flat":
+                await self.bus.publish(Event(topic=self.topic, payload={
+                    "symbol": sym,
+                    "side": side,
+                    "strength": float(min(1.0, 0.8)),   # base strength; tune or derive from score
+                    "sl_price": detail["sl_price"],
+                    "tp_price": detail["tp_price"],
+                    "atr": detail["atr"],
+                    "score": detail["score"],
+                    "cycle": cycle,
+                    "trace": tracing.mark(trace, "signal"),
+                }))
+                return True
+        except Exception as e:
+            await self.bus.publish(Event(topic="strategy.log", payload={"note": f"FSVZO error {sym}: {e}"}))
+        return False
+
+    async def _refresh_price(self, sym: str):
+        # intrabar fast path: price only, for stops / mark-to-market
+        try:
+            px = fetch_last_price(sym, self.exchange_id)
+            await self.bus.publish(Event(topic="market.last", payload={"symbol": sym, "price": px}))
+        except Exception as e:
+            await self.bus.publish(Event(topic="strategy.log", payload={"note": f"FSVZO price error {sym}: {e}"}))
+
+    async def _on_fills(self):
+        async for e in self.bus.subscribe("exec.fills"):
+            p = e.payload
+            if p.get("status") != "filled":
+                continue
+            sym, qty = str(p.get("symbol")), float(p.get("qty", 0.0))
+            pos = self.positions.get(sym, 0.0)
+            if p.get("side") == "long":
+                pos += qty
+            elif p.get("side") == "short":
+                pos -= qty
+            elif p.get("side") == "flat":              # towards zero: a partial exit leaves the rest held
+                pos = math.copysign(max(0.0, abs(pos) - qty), pos)
+            if abs(pos) <= 1e-12:
+                self.positions.pop(sym, None)
+            else:
+                self.positions[sym] = pos
+
     async def run(self):
+        await asyncio.gather(self._scan_loop(), self._on_fills())
+
+    async def _scan_loop(self):
+        # bar-close aligned: each symbol is fetched + evaluated once per closed bar
+        sched = BarScheduler(close_delay=SETTINGS.bar_close_delay)
+        # without a live feed, market.last comes from here: poll held symbols' prices for stops
+        fast = None if SETTINGS.market_feed else (SETTINGS.intrabar_secs or None)
+        for sym in self.universe:
+            sched.add(sym, self.interval, fast_interval=fast)
+
         while True:
-            for sym in self.universe:
-                try:
-                    df = load_ohlcv(symbol=sym, interval=self.interval, lookback=self.lookback, exchange_id=self.exchange_id)
-                    side, detail = self._evaluate(sym, df)
-
-                    # publish latest price for PortfolioAgent mark-to-market
-                    await self.bus.publish(Event(topic="market.last", payload={"symbol": sym, "price": float(detail.get("price", float(df['c'].iloc[-1]))) }))
-
-                    note = {"symbol": sym, **detail}
-                    await self.bus.publish(Event(topic="strategy.log", payload={"note": f"FSVZO scan {sym}: {side}", **note}))
-
-                    if side != "flat":
-                        await self.bus.publish(Event(topic="signals.target", payload={
-                            "symbol": sym,
-                            "side": side,
-                            "strength": float(min(1.0, 0.8)),   # base strength; tune or derive from score
-                            "sl_price": detail["sl_price"],
-                            "tp_price": detail["tp_price"],
-                            "atr": detail["atr"],
-                        }))
-                except Exception as e:
-                    await self.bus.publish(Event(topic="strategy.log", payload={"note": f"FSVZO error {sym}: {e}"}))
+            due = await sched.next_due()
+            # cycle id = open of the bar now forming; identical on every shard
+            cycle = int(bar_open(time.time() - SETTINGS.bar_close_delay, self.interval))
+            # a ticker refresh is a blocking exchange call: keep it off the loop
+            active = set(await asyncio.to_thread(self.filter.active, self.universe)) if self.filter.enabled else None
+            scanned: List[str] = []
+            signals = 0
+            for sym, _, kind in due:
+                if active is not None and sym not in active and sym not in self.positions:
+                    self.skipped += kind == "bar"
+                    continue
+                if kind == "bar":
+                    scanned.append(sym)
+                    signals += await self._scan(sym, cycle)
+                elif sym in self.positions:
+                    await self._refresh_price(sym)
                 await asyncio.sleep(0)  # yield between symbols
+            if scanned:
+                await self.bus.publish(Event(topic=cycle_topic(self.topic), payload={
+                    "cycle": cycle, "shard": SETTINGS.shard_index, "shard_count": SETTINGS.shard_count,
+                    "signals": signals, "symbols": scanned}))
+
+
+class MTFFSVZOScannerAgent(FSVZOScannerAgent):
+    """
+    FSVZO on SETTINGS.timeframe, confirmed by the trend of a higher timeframe `htf` that is
+    resampled from the same cached bars (no extra downloads). A signal against the htf bias
+    (SMA20 vs SMA50 of closed htf bars) is dropped; "htf" is added to the signal detail.
+    The htf SMAs are RollingStats fed from bar-store hooks: O(1) per completed htf bar.
+    Until a symbol has 50 htf bars, or with a custom `loader` (no bar store), signals pass.
+    """
+
+    def __init__(self, bus: EventBus, params: FSVZOParams | None = None, topic: str = "signals.target",
+                 loader: Optional[Callable[..., pd.DataFrame]] = None, htf: str = "4h", state_dir: str | None = None):
+        super().__init__(bus, params=params, topic=topic, loader=loader, state_dir=state_dir)
+        self.htf = htf
+        # base history deep enough to backfill 50 htf bars on the first scan
+        self.lookback = f"{max(7, math.ceil(51 * timeframe_seconds(htf) / 86400))}d"
+        self.htf_stats = KeyedRollingStats(capacity=50, windows=(20, 50))
+        self._htf_last: Dict[str, int] = {}      # store symbol -> open ts (ns) of the last htf bar pushed
+        if self.bars is not None:
+            self.bars.derive(htf, self.interval)
+            self.bars.on_bar(self._on_htf_bar)
+
+    def _push_closed(self, sym: str, ring) -> None:
+        w = ring.window(closed_before=int(bar_open(time.time(), self.htf)) * 1_000_000_000)
+        last = self._htf_last.get(sym, -1)
+        for t, c in zip(w.ts[-50:], w["c"][-50:]):
+            if t > last:
+                self.htf_stats.push(sym, float(c))
+                last = int(t)
+        self._htf_last[sym] = last
+
+    def _on_htf_bar(self, sym: str, tf: str, ring) -> None:
+        if tf == self.htf and sym in self._htf_last:
+            self._push_closed(sym, ring)
+
+    def _htf_bias(self, sym: str) -> Optional[str]:
+        if self.bars is None:
+            return None
+        key = self.bars.key(sym, self.htf)[0]
+        if key not in self._htf_last:             # first sight: backfill from the derived ring
+            self._push_closed(key, self.bars.ensure(sym, self.htf, self.lookback, self.exchange_id))
+        rs = self.htf_stats[key]
+        if rs.count(50) < 50:
+            return None
+        fast, slow = rs.mean(20), rs.mean(50)
+        return "long" if fast > slow else "short" if fast < slow else "flat"
 
-            await asyncio.sleep(20)     # rescan cadence
\ No newline at end of file
+    def _evaluate(self, sym: str, df: pd.DataFrame) -> Tuple[str, Dict]:
+        side, detail = super()._evaluate(sym, df)
+        if side == "flat":
+            return side, detail
+        htf = self._htf_bias(sym)
+        detail["htf"] = htf
+        if htf is not None and htf != side:
+            return "flat", {**detail, "why": f"{self.htf} bias {htf}"}
+        return side, detail
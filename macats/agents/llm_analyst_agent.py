@@ -1,10 +1,13 @@
 # macats/agents/llm_analyst_agent.py
 import asyncio, math
-import pandas as pd
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from macats.event_bus import Event, EventBus
+from macats.agents.council_agent import CouncilAgent
+from macats.rolling import RollingStats
 from macats.llm.providers import get_llm
 from macats.data.macro import toy_calendar
+from macats.data.frames import FeatureFrame
+from macats.features import request
 
 TAKE_COLS = ["c","sma_fast","sma_slow","rsi","atr"]
 
@@ -25,20 +28,22 @@ MACRO_SYSTEM = (
     "\"confidence\":0..1,\"rationale\":string}"
 )
 
-def df_to_short_csv(df: pd.DataFrame, cols: List[str], limit: int = 60) -> str:
-    d = df[cols].tail(limit).copy()
-    d.index = d.index.astype(str)
-    return d.to_csv(index=True)
+def frame_to_short_csv(frame: FeatureFrame, cols: List[str], limit: int = 60) -> str:
+    return frame.to_csv(cols, limit=limit)
 
 class LLMAnalystAgent:
     """
     Waits for market features + collects a rolling sentiment window.
     Calls 3 LLM 'characters' and publishes a combined analysis payload.
+    With a `council`, the calls are handed to CouncilAgent.decide() instead so the
+    decision is taken on a quorum and slow analysts are cancelled.
     """
-    def __init__(self, bus: EventBus, sentiment_window: int = 32):
+    def __init__(self, bus: EventBus, sentiment_window: int = 32, council: Optional[CouncilAgent] = None):
         self.bus = bus
-        self.sent_scores: List[float] = []
         self.sentiment_window = sentiment_window
+        self.sent = RollingStats(capacity=sentiment_window, windows=(sentiment_window,))
+        self.council = council
+        request("llm_analyst", TAKE_COLS)
 
     async def _call(self, system: str, user: str) -> Dict[str, Any]:
         llm = await get_llm()
@@ -48,28 +53,27 @@ class LLMAnalystAgent:
         sub_feat = self.bus.subscribe("market.features")
         sub_sent = self.bus.subscribe("sentiment.raw")
 
-        latest_df = None
+        latest_frame = None
 
         async def collect_features():
-            nonlocal latest_df
+            nonlocal latest_frame
             async for e in sub_feat:
-                latest_df = e.payload["df"]
+                latest_frame = e.payload["frame"]
                 # kick LLM once we have at least a few sentiment points
-                if len(self.sent_scores) >= max(8, self.sentiment_window//2):
-                    await self._analyze(latest_df)
+                if len(self.sent) >= max(8, self.sentiment_window//2):
+                    await self._analyze(latest_frame)
                     break
 
         async def collect_sentiment():
             async for e in sub_sent:
-                self.sent_scores.append(float(e.payload.get("score", 0.0)))
-                self.sent_scores = self.sent_scores[-self.sentiment_window:]
+                self.sent.push(float(e.payload.get("score", 0.0)))
 
         await asyncio.gather(collect_features(), collect_sentiment())
 
-    async def _analyze(self, df: pd.DataFrame):
+    async def _analyze(self, frame: FeatureFrame):
         # Build compact context
-        csv_block = df_to_short_csv(df, TAKE_COLS, limit=48)
-        last = df.iloc[-1]
+        csv_block = frame_to_short_csv(frame, TAKE_COLS, limit=48)
+        last = frame.latest_row(TAKE_COLS)
         features = {
             "price": float(last["c"]),
             "sma_fast": float(last["sma_fast"]),
@@ -78,10 +82,10 @@ class LLMAnalystAgent:
             "atr_ratio": float(last["atr"]/last["c"]) if last["c"] else 0.0,
         }
         sent_stats = {
-            "count": len(self.sent_scores),
-            "sum": float(sum(self.sent_scores)),
-            "avg": float(sum(self.sent_scores)/len(self.sent_scores)) if self.sent_scores else 0.0,
-            "pos_frac": float(sum(1 for x in self.sent_scores if x>0)/len(self.sent_scores)) if self.sent_scores else 0.0
+            "count": len(self.sent),
+            "sum": self.sent.sum(),
+            "avg": self.sent.mean(),
+            "pos_frac": self.sent.pos_frac(),
         }
         macro_events = toy_calendar()
 
@@ -93,7 +97,7 @@ class LLMAnalystAgent:
             "Provide a JSON decision per schema."
         )
         sent_user = (
-            f"Rolling sentiment scores (last {len(self.sent_scores)}): {self.sent_scores}\n"
+            f"Rolling sentiment scores (last {len(self.sent)}): {self.sent.values().tolist()}\n"
             f"Stats: {sent_stats}\n"
             "Provide a JSON decision per schema."
         )
@@ -102,6 +106,14 @@ class LLMAnalystAgent:
             "Assume BTC risk asset exposure typical. Provide JSON decision per schema."
         )
 
+        if self.council is not None:
+            await self.council.decide({
+                "technical": self._call(TECH_SYSTEM, tech_user),
+                "sentiment": self._call(SENT_SYSTEM, sent_user),
+                "macro": self._call(MACRO_SYSTEM, macro_user),
+            })
+            return
+
         # Call 3 LLMs concurrently
         tech_fut = asyncio.create_task(self._call(TECH_SYSTEM, tech_user))
         sent_fut = asyncio.create_task(self._call(SENT_SYSTEM, sent_user))
@@ -0,0 +1,117 @@
+# macats/agents/llm_sentiment_agent.py
+import asyncio
+import json
+import math
+import time
+from typing import Any, Dict, List, Optional
+
+from macats.event_bus import Event, EventBus
+from macats.llm.providers import get_llm
+from macats.data.sentiment import lexicon_score
+from macats.config import SETTINGS
+
+SYSTEM = (
+    "You are a crypto market sentiment scorer. Return ONLY JSON. "
+    "You get a JSON array of texts. Score each text from -1 (very bearish) to 1 (very bullish). "
+    "Schema: {\"scores\":[number, ...]} with exactly one score per text, in input order."
+)
+
+
+def _clip(x: float) -> float:
+    x = float(x)
+    if math.isnan(x):
+        raise ValueError("NaN score")
+    return max(-1.0, min(x, 1.0))
+
+
+def _parse_scores(resp: Any, n: int) -> Optional[List[float]]:
+    """Pull a per-item score array out of the LLM reply; None if it doesn't line up."""
+    if not isinstance(resp, dict):
+        return None
+    raw = resp.get("scores")
+    if not isinstance(raw, list) or len(raw) != n:
+        return None
+    out: List[float] = []
+    for x in raw:
+        if isinstance(x, dict):
+            x = x.get("score")
+        try:
+            out.append(_clip(x))
+        except Exception:
+            return None
+    return out
+
+
+class LLMSentimentAgent:
+    """
+    Batched LLM sentiment scoring.
+    Texts are accumulated until `batch_size` items or `max_wait_ms` after the first
+    one, then scored with one structured LLM request. If the request fails (or the
+    reply doesn't line up with the batch) the batch is scored with the lexicon.
+    Scores are clipped to -1..1 either way.
+
+    Listens:
+      - sentiment.text : {"text": str, "ts"?: float, ...extra}
+    Emits:
+      - sentiment.raw  : {"ts","text","score","source":"llm|lexicon", ...extra} per item
+    """
+
+    def __init__(self, bus: EventBus,
+                 batch_size: Optional[int] = None,
+                 max_wait_ms: Optional[float] = None,
+                 max_inflight: int = 2):
+        self.bus = bus
+        self.batch_size = max(1, int(batch_size or SETTINGS.sent_batch_size))
+        self.max_wait = float(max_wait_ms if max_wait_ms is not None else SETTINGS.sent_batch_max_wait_ms) / 1000.0
+        self._inbox: asyncio.Queue = asyncio.Queue()
+        self._inflight = asyncio.Semaphore(max_inflight)
+        self._tasks: set = set()
+
+    def submit(self, text: str, **extra) -> None:
+        """In-process entry point (same as publishing sentiment.text)."""
+        self._inbox.put_nowait({"ts": time.time(), "text": text, **extra})
+
+    async def _llm_scores(self, texts: List[str]) -> Optional[List[float]]:
+        try:
+            llm = await get_llm()
+            resp = await llm.chat_json(SYSTEM, json.dumps(texts, ensure_ascii=False))
+        except Exception:
+            return None
+        return _parse_scores(resp, len(texts))
+
+    async def _score_batch(self, batch: List[Dict[str, Any]]) -> None:
+        async with self._inflight:
+            texts = [str(m.get("text", "")) for m in batch]
+            scores = await self._llm_scores(texts)
+            source = "llm"
+            if scores is None:
+                scores = [_clip(lexicon_score(t)) for t in texts]
+                source = "lexicon"
+            for m, s in zip(batch, scores):
+                await self.bus.publish(Event(topic="sentiment.raw", payload={**m, "score": s, "source": source}))
+
+    async def _collect(self) -> None:
+        sub = self.bus.subscribe("sentiment.text")
+        async for e in sub:
+            self._inbox.put_nowait({"ts": time.time(), **e.payload})
+
+    async def _batches(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._inbox.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._inbox.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # don't hold up the next window while the LLM is thinking
+            t = asyncio.create_task(self._score_batch(batch))
+            self._tasks.add(t)
+            t.add_done_callback(self._tasks.discard)
+
+    async def run(self) -> None:
+        await asyncio.gather(self._collect(), self._batches())
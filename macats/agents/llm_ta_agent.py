@@ -1,9 +1,10 @@
 # macats/agents/llm_ta_agent.py
 import asyncio
-import pandas as pd
 from typing import Dict
 from macats.event_bus import Event, EventBus
 from macats.llm.providers import get_llm
+from macats.data.frames import FeatureFrame
+from macats.features import FeatureContext, request
 
 SYSTEM = (
     "You are a disciplined technical analyst. Return ONLY JSON.\n"
@@ -11,29 +12,25 @@ SYSTEM = (
     '"stop_loss_bps":int,"take_profit_bps":int}'
 )
 
-def df_to_csv(df: pd.DataFrame) -> str:
-    d = df[["c","sma_fast","sma_slow","rsi","atr"]].tail(60).copy()
-    d.index = d.index.astype(str)
-    return d.to_csv(index=True)
+COLS = ("c","sma_fast","sma_slow","rsi","atr")
+
+def frame_to_csv(frame: FeatureFrame) -> str:
+    return frame.to_csv(COLS, limit=60)
 
 class LLMTAStrategyAgent:
     def __init__(self, bus: EventBus): 
         self.bus = bus
+        request("llm_ta", (*COLS, "atr_pct"))
 
     async def run(self):
         sub = self.bus.subscribe("market.features")
         async for e in sub:
-            df: pd.DataFrame = e.payload["df"]
-            # --- robust scalar extraction from the latest bar ---
-            last = df[["c","sma_fast","sma_slow","rsi","atr"]].iloc[-1]
-            # convert all five to plain floats in one shot
-            c, sma_fast, sma_slow, rsi, atr = (
-                last.astype("float64").to_numpy().tolist()
-            )
-            # guard division by zero
-            atr_ratio = float(atr) / float(c) if c else 0.0
+            frame: FeatureFrame = e.payload["frame"]
+            ctx = FeatureContext.from_frame(frame)
+            c, sma_fast, sma_slow, rsi, atr = (ctx.latest(k) for k in COLS)
+            atr_ratio = ctx.latest("atr_pct")
 
-            csv_block = df_to_csv(df)
+            csv_block = frame_to_csv(frame)
             context = {
                 "price": float(c),
                 "sma_fast": float(sma_fast),
@@ -4,10 +4,12 @@ import csv
 import os
 import time
 from dataclasses import dataclass, field
-from typing import Dict, Optional, Tuple
+from typing import Callable, Dict, Optional, Tuple
 
 from macats.event_bus import Event, EventBus
 from macats.config import SETTINGS
+from macats import tracing
+from macats.checkpoint import Checkpointer
 
 LOG_DIR = "logs"
 TRADES_CSV = os.path.join(LOG_DIR, "trades.csv")
@@ -39,24 +41,42 @@ class PortfolioAgent:
 
     Listens:
       - market.last : {"symbol": str, "price": float}
-      - exec.fills  : {"status":"filled","symbol": str,"side":"long|short|flat","qty": float,"price"?: float}
+      - exec.fills  : {"status":"filled","symbol": str,"side":"long|short|flat","qty": float,"price"?: float,"fee"?: float}
 
     Writes CSV:
-      - logs/trades.csv  : one row per fill
+      - logs/trades.csv  : one row per fill (trace_id links it to the scan/stop that caused it)
       - logs/equity.csv  : equity snapshots on each price + after fills
+      - logs/traces.bin  : the fill's trace, marked "ledger" once the row is written (TRACE=1)
+
+    With state_dir the ledger is checkpointed (<state_dir>/portfolio.snap + .wal) and restored on start.
     """
 
-    def __init__(self, bus: EventBus, start_balance: Optional[float] = None) -> None:
+    def __init__(self, bus: EventBus, start_balance: Optional[float] = None, log_dir: str = LOG_DIR,
+                 clock: Callable[[], float] = time.time, state_dir: Optional[str] = None) -> None:
         self.bus = bus
         self.state = AccountState(cash=start_balance or SETTINGS.paper_start_balance)
-        os.makedirs(LOG_DIR, exist_ok=True)
+        self.trades_csv = os.path.join(log_dir, "trades.csv")
+        self.equity_csv = os.path.join(log_dir, "equity.csv")
+        self.clock = clock      # backtests pass simulated time
+        os.makedirs(log_dir, exist_ok=True)
         self._ensure_csv_headers()
+        self.traces = tracing.TraceExporter(os.path.join(log_dir, "traces.bin")) if SETTINGS.trace else None
+        # restart resumes the ledger: last snapshot + fills logged since (instead of start_balance)
+        self.ckpt = Checkpointer(state_dir, "portfolio", every_secs=SETTINGS.checkpoint_secs,
+                                 fsync=SETTINGS.checkpoint_fsync) if state_dir else None
+        if self.ckpt is not None:
+            self._restore()
 
     # --------------------------- CSV ---------------------------
 
     def _ensure_csv_headers(self) -> None:
-        if not os.path.exists(TRADES_CSV):
-            with open(TRADES_CSV, "w", newline="") as f:
+        # trades.csv written before trace ids existed keeps its columns
+        self._trade_ids = True
+        if os.path.exists(self.trades_csv):
+            with open(self.trades_csv, newline="") as f:
+                self._trade_ids = "trace_id" in f.readline()
+        if not os.path.exists(self.trades_csv):
+            with open(self.trades_csv, "w", newline="") as f:
                 writer = csv.DictWriter(
                     f,
                     fieldnames=[
@@ -70,11 +90,12 @@ class PortfolioAgent:
                         "cash_after",
                         "pos_qty",
                         "pos_avg_px",
+                        "trace_id",
                     ],
                 )
                 writer.writeheader()
-        if not os.path.exists(EQUITY_CSV):
-            with open(EQUITY_CSV, "w", newline="") as f:
+        if not os.path.exists(self.equity_csv):
+            with open(self.equity_csv, "w", newline="") as f:
                 writer = csv.DictWriter(
                     f,
                     fieldnames=[
@@ -99,9 +120,10 @@ class PortfolioAgent:
         realized_total: float,
         cash_after: float,
         pos: Position,
+        trace_id: str = "",
     ) -> None:
         row = {
-            "ts": time.time(),
+            "ts": self.clock(),
             "symbol": symbol,
             "side": side,
             "qty": float(qty),
@@ -112,13 +134,15 @@ class PortfolioAgent:
             "pos_qty": float(pos.qty),
             "pos_avg_px": float(pos.avg_px),
         }
-        with open(TRADES_CSV, "a", newline="") as f:
+        if self._trade_ids:
+            row["trace_id"] = trace_id
+        with open(self.trades_csv, "a", newline="") as f:
             csv.DictWriter(f, fieldnames=row.keys()).writerow(row)
 
     def _write_equity_row(self) -> None:
         equity, unrealized, realized_total, gross = self._mark_to_market()
         row = {
-            "ts": time.time(),
+            "ts": self.clock(),
             "equity": float(equity),
             "cash": float(self.state.cash),
             "unrealized": float(unrealized),
@@ -126,7 +150,7 @@ class PortfolioAgent:
             "gross_exposure": float(gross),
             "num_positions": int(sum(1 for p in self.state.positions.values() if abs(p.qty) > 0)),
         }
-        with open(EQUITY_CSV, "a", newline="") as f:
+        with open(self.equity_csv, "a", newline="") as f:
             csv.DictWriter(f, fieldnames=row.keys()).writerow(row)
 
     # --------------------------- Helpers ---------------------------
@@ -328,8 +352,11 @@ class PortfolioAgent:
                     continue
                 fill_px = lp
             fill_px = float(fill_px)
+            fee = float(p.get("fee") or 0.0)
 
+            due = self.ckpt is not None and self.ckpt.append([sym, side, qty, fill_px, fee])
             realized_delta, pos = self._apply_fill(sym, side, qty, fill_px)
+            self.state.cash -= fee
             self._write_trade_row(
                 symbol=sym,
                 side=side,
@@ -339,10 +366,41 @@ class PortfolioAgent:
                 realized_total=pos.realized,
                 cash_after=self.state.cash,
                 pos=pos,
+                trace_id=tracing.trace_id(p),
             )
+            if self.traces is not None:
+                self.traces.export(tracing.carry(p, "ledger"), symbol=sym, side=side, qty=qty, price=fill_px,
+                                   ts=self.clock(), reason=p.get("reason", ""))
             self._write_equity_row()
+            if due:
+                self._snapshot()
+
+    # --------------------------- Checkpoint ---------------------------
+
+    def _snapshot(self) -> None:
+        st = self.state
+        self.ckpt.snapshot({"cash": st.cash, "last_price": st.last_price,
+                            "positions": {s: [p.qty, p.avg_px, p.realized] for s, p in st.positions.items()}})
+
+    def _restore(self) -> None:
+        state, records = self.ckpt.load()
+        if state is not None:
+            self.state = AccountState(cash=state["cash"], last_price=dict(state["last_price"]),
+                                      positions={s: Position(*v) for s, v in state["positions"].items()})
+        for sym, side, qty, px, fee in records:      # fills since the snapshot (CSV rows already written)
+            self._apply_fill(sym, side, qty, px)
+            self.state.cash -= fee
+
+    async def _checkpoints(self) -> None:
+        while True:
+            await asyncio.sleep(self.ckpt.every_secs)
+            if self.ckpt.pending:
+                self._snapshot()
 
     # --------------------------- Main ---------------------------
 
     async def run(self) -> None:
-        await asyncio.gather(self._listen_prices(), self._listen_fills())
\ No newline at end of file
+        tasks = [self._listen_prices(), self._listen_fills()]
+        if self.ckpt is not None:
+            tasks.append(self._checkpoints())
+        await asyncio.gather(*tasks)
\ No newline at end of file
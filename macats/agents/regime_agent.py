@@ -1,23 +1,20 @@
 from macats.event_bus import Event
+from macats.features import FeatureContext, request
 
 class RegimeAgent:
     def __init__(self, bus):
         self.bus = bus
+        request("regime", ("c", "trend", "atr_pct"))
 
     async def run(self):
         sub = self.bus.subscribe("market.features")
         async for e in sub:
-            df = e.payload["df"]
-            latest = df.iloc[-1]
+            ctx   = FeatureContext.from_frame(e.payload["frame"])
+            sign  = ctx.latest("trend")
+            close = ctx.latest("c")
 
-            # ✅ robust scalar extraction
-            fast  = latest["sma_fast"].item()
-            slow  = latest["sma_slow"].item()
-            atr   = latest["atr"].item()
-            close = latest["c"].item()
-
-            trend = "trend_up" if fast > slow else ("trend_down" if fast < slow else "flat")
-            vol   = "high_vol" if (atr / close) > 0.01 else "low_vol"
+            trend = "trend_up" if sign > 0 else ("trend_down" if sign < 0 else "flat")
+            vol   = "high_vol" if ctx.latest("atr_pct") > 0.01 else "low_vol"
             regime = f"{trend}:{vol}"
 
             await self.bus.publish(Event(topic="regime.current",
@@ -1,10 +1,37 @@
 # macats/agents/risk_agent.py
-from collections import defaultdict
+import asyncio
+import math
+from collections import defaultdict, deque
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
 from macats.event_bus import Event, EventBus
 from macats.config import SETTINGS
+from macats.paper_engine import new_order_id
+from macats.risk_engine import RiskEngine
+from macats.checkpoint import Checkpointer
+from macats import tracing
 
 class RiskAgent:
-    def __init__(self, bus: EventBus, balance: float | None = None):
+    """
+    Sizes signals into orders behind max-open, allocation and VaR gates.
+    Listens:
+      - market.last    {"symbol","price"}
+      - signals.target {"symbol","side","strength","score"?,"sl_price","tp_price","atr","cycle"?,"trace"?}
+      - signals.cycle  {"cycle","shard","shard_count","signals"}   (end of one scanner pass)
+      - exec.fills     (every fill, ours or StopAgent's; rejects release our reservations)
+    Emits:
+      - orders.planned (signals without a cycle: sized one by one as they arrive)
+      - orders.batch   {"cycle","orders":[...]}  (a whole cycle, ranked and allocated at once)
+      - strategy.log
+    Orders carry the signal's trace, marked "risk" (sizing) and "planned" (published).
+    Positions are what filled (exec.fills, including StopAgent exits) plus our own orders that
+    are still working: an order reserves its quantity when planned, the reservation turns into
+    position as it fills and is released on a reject. Slots, allocation and VaR all use this.
+    """
+    def __init__(self, bus: EventBus, balance: float | None = None, batch: bool | None = None,
+                 batch_wait: float | None = None, state_dir: str | None = None):
         self.bus = bus
         self.start_balance = balance if balance is not None else SETTINGS.paper_start_balance
 
@@ -13,9 +40,31 @@ class RiskAgent:
         self.per_trade_allocation_pct = float(getattr(SETTINGS, "per_trade_allocation_pct", 25.0)) / 100.0
         self.max_portfolio_allocation_pct = float(getattr(SETTINGS, "max_portfolio_allocation_pct", 100.0)) / 100.0
 
-        self.open_positions: dict[str, float] = defaultdict(float)  # symbol -> qty (signed)
         self.last_price: dict[str, float] = {}
-        self.gross_exposure: float = 0.0  # rough estimate from our own orders
+        # the book: filled qty (exec.fills) + our unfilled orders
+        self.filled: dict[str, float] = defaultdict(float)        # symbol -> filled qty (signed)
+        self.pending: dict[str, float] = defaultdict(float)       # symbol -> unfilled qty of our orders (signed)
+        self.reserved: Dict[str, List[Any]] = {}                  # order_id -> [symbol, unfilled qty (signed)]
+        self._live: set = set()                                   # symbols with a non-zero position
+
+        # correlated exposure: EWMA covariance across everything we see prices for
+        self.var_limit = self.start_balance * float(SETTINGS.var_limit_pct) / 100.0
+        self.risk = RiskEngine(sample_secs=SETTINGS.risk_sample_secs, confidence=SETTINGS.var_confidence)
+
+        # cycle batching: signals tagged with a scanner cycle wait for its end marker(s)
+        self.batch = SETTINGS.risk_batch if batch is None else batch
+        self.batch_wait = SETTINGS.risk_batch_wait if batch_wait is None else batch_wait
+        self._pending: Dict[Any, List[Dict[str, Any]]] = {}
+        self._markers: Dict[Any, Dict[Any, int]] = {}             # cycle -> shard -> signals it counted
+        self._shards: Dict[Any, int] = {}                         # cycle -> shard_count
+        self._timers: Dict[Any, asyncio.TimerHandle] = {}
+        self._done: deque = deque(maxlen=256)                     # flushed cycles: stragglers go alone
+
+        # filled positions + covariance survive restarts: snapshot + WAL of filled qty per fill
+        self.ckpt = Checkpointer(state_dir, "risk", every_secs=SETTINGS.checkpoint_secs,
+                                 fsync=SETTINGS.checkpoint_fsync) if state_dir else None
+        if self.ckpt is not None:
+            self._restore()
 
     async def _listen_prices(self):
         sub = self.bus.subscribe("market.last")
@@ -26,14 +75,268 @@ class RiskAgent:
             except Exception:
                 continue
             self.last_price[sym] = px
+            self.risk.on_price(sym, px)
+
+    async def _sample_returns(self):
+        while True:
+            await asyncio.sleep(SETTINGS.risk_sample_secs)
+            self.risk.sample()
+
+    def _var_cap(self, sym: str, side: str, qty: float, px: float) -> float:
+        """Shrink qty so portfolio VaR stays under the limit (O(1) per signal)."""
+        if self.var_limit <= 0:
+            return qty
+        room = self.risk.max_add(sym, self.var_limit, 1.0 if side == "long" else -1.0)
+        return min(qty, room / px)
+
+    # --------------------------- fills / reservations ---------------------------
+
+    def position(self, sym: str) -> float:
+        """Filled plus still-working quantity (signed)."""
+        return self.filled.get(sym, 0.0) + self.pending.get(sym, 0.0)
+
+    @property
+    def live(self) -> int:
+        return len(self._live)
+
+    @property
+    def gross_exposure(self) -> float:
+        """Notional of filled + working positions at the latest prices."""
+        return sum((abs(self.position(s)) * self.last_price.get(s, 0.0) for s in self._live), 0.0)
+
+    def _sync(self, sym: str) -> None:
+        q = self.position(sym)
+        if abs(q) > 1e-12:
+            self._live.add(sym)
+        else:
+            self._live.discard(sym)
+        self.risk.set_position(sym, q)
+
+    def _reserve(self, order: Dict[str, Any]) -> None:
+        sym, q = order["symbol"], float(order["qty"])
+        d = q if order["side"] == "long" else -q if order["side"] == "short" else -self.filled.get(sym, 0.0)
+        self.reserved[order["order_id"]] = [sym, d]
+        self.pending[sym] += d
+        self._sync(sym)
+
+    def _release(self, oid: Any) -> None:
+        r = self.reserved.pop(oid, None)
+        if r is not None:
+            self.pending[r[0]] -= r[1]
+            if abs(self.pending[r[0]]) <= 1e-12:
+                del self.pending[r[0]]
+
+    def _on_fill(self, p: Dict[str, Any]) -> None:
+        oid, sym = p.get("order_id"), str(p.get("symbol"))
+        if p.get("status") == "rejected":
+            self._release(oid)
+            self._sync(sym)
+            return
+        if p.get("status") != "filled":
+            return
+        qty, side, pos = float(p.get("qty", 0.0)), p.get("side"), self.filled.get(sym, 0.0)
+        if side == "long":
+            d = qty
+        elif side == "short":
+            d = -qty
+        else:                                          # flat: towards zero, never through it
+            d = -math.copysign(min(qty, abs(pos)), pos) if pos else 0.0
+        pos += d
+        if abs(pos) <= 1e-12:
+            self.filled.pop(sym, None)
+            pos = 0.0
+        else:
+            self.filled[sym] = pos
+        # only filled qty is journaled: working orders die with the process that placed them
+        due = self.ckpt is not None and self.ckpt.append({"s": sym, "q": pos})
+        r = self.reserved.get(oid)
+        if r is not None:
+            r[1] -= d
+            self.pending[sym] -= d
+            if p.get("leaves_qty", 0) <= 1e-12 or r[1] * d <= 0:   # done (or overfilled): drop the rest
+                self._release(oid)
+        self._sync(sym)
+        if due:
+            self._snapshot()
+
+    async def _listen_fills(self):
+        async for e in self.bus.subscribe("exec.fills"):
+            self._on_fill(e.payload)
+
+    # --------------------------- checkpoint ---------------------------
+
+    def _snapshot(self) -> None:
+        self.ckpt.snapshot({"pos": dict(self.filled), "risk": self.risk.state()})
+
+    def _restore(self) -> None:
+        state, records = self.ckpt.load()
+        pos: Dict[str, float] = {}
+        if state is not None:
+            self.risk.load_state(state["risk"])
+            pos.update(state["pos"])
+        for r in records:
+            pos[r["s"]] = r["q"]
+        for sym, q in pos.items():
+            if q:
+                self.filled[sym] = q
+            self._sync(sym)
+
+    async def _checkpoints(self):
+        while True:
+            await asyncio.sleep(self.ckpt.every_secs)
+            self._snapshot()      # also keeps the covariance history fresh on disk
+
+    # --------------------------- batch (per scan cycle) ---------------------------
+
+    def _allocate(self, signals: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Rank one cycle's signals by score then strength and hand out the free position
+        slots and allocation budget best-first in one vectorized pass.
+        Returns (orders, log notes).
+        """
+        by_sym: Dict[str, Dict[str, Any]] = {}
+        for p in signals:                       # last signal per symbol wins
+            by_sym[str(p.get("symbol", getattr(SETTINGS, "symbol", "BTC/USDT")))] = p
+
+        orders: List[Dict[str, Any]] = []
+        notes: List[Dict[str, Any]] = []
+        allow_shorts = bool(getattr(SETTINGS, "allow_shorts", False))
+        cands = []
+        for sym, p in by_sym.items():
+            side = str(p["side"]).lower()
+            px = self.last_price.get(sym)
+            if px is None:
+                notes.append({"note": f"Risk: missing price for {sym}"})
+            elif side == "flat":
+                # exits first: they free slots and budget for this cycle's entries
+                q = abs(self.filled.get(sym, 0.0)) if self.position(sym) else 0.0
+                if q > 0:
+                    orders.append({"order_id": new_order_id("risk"), "symbol": sym, "side": "flat", "qty": q, "price": px,
+                                   "trace": tracing.carry(p, "risk")})
+                    self._reserve(orders[-1])
+            elif side == "short" and not allow_shorts:
+                notes.append({"note": "Risk: shorts disabled (spot mode)", "symbol": sym})
+            elif side in ("long", "short"):
+                cands.append((sym, side, px, p))
+        if not cands:
+            return orders, notes
+
+        px = np.array([c[2] for c in cands])
+        atr = np.array([float(c[3].get("atr", 0.0)) for c in cands])
+        strength = np.array([float(c[3].get("strength", 0.0)) for c in cands])
+        score = np.array([float(c[3].get("score", 0.0)) for c in cands])
+        pos = np.array([self.position(c[0]) for c in cands])
+        held = pos * np.array([1.0 if c[1] == "long" else -1.0 for c in cands])
+        is_new = pos == 0.0
+
+        # same sizing as the per-signal path, for all candidates at once
+        risk_dollars = max(0.0, self.start_balance * self.risk_pct)
+        target = np.where(atr > 0, risk_dollars / np.where(atr > 0, atr, 1.0), 0.0) * np.clip(strength, 0.2, 1.0)
+        target = np.minimum(target, self.start_balance * self.per_trade_allocation_pct / px)
+        qty = target - held                      # size to the target: a repeated signal only tops up
+        qty = np.where(qty >= 0.1 * target, qty, 0.0)
+
+        rank = np.lexsort((-strength, -score))
+        rank = rank[qty[rank] > 0]
+        # free slots go best-first; adds to open positions don't take a slot
+        slots = max(0, self.max_open - self.live)
+        rank = rank[~is_new[rank] | (np.cumsum(is_new[rank]) <= slots)]
+        # allocation budget best-first; the marginal candidate gets what is left
+        notional = qty[rank] * px[rank]
+        budget = max(0.0, self.start_balance * self.max_portfolio_allocation_pct - self.gross_exposure)
+        before = np.cumsum(notional) - notional
+        alloc = np.clip(budget - before, 0.0, notional)
+        qty[rank] = alloc / px[rank]
+
+        skipped = len(cands) - int((alloc > 0).sum())
+        for i in rank:
+            if qty[i] <= 0:
+                continue
+            sym, side, p_i, p = cands[i]
+            q = self._var_cap(sym, side, float(qty[i]), p_i)
+            if q < 0.1 * qty[i]:
+                skipped += 1
+                continue
+            q = round(q, 6)
+            orders.append({"order_id": new_order_id("risk"), "symbol": sym, "side": side, "qty": q,
+                           "price": p_i, "atr": float(atr[i]), "sl_price": p.get("sl_price"), "tp_price": p.get("tp_price"),
+                           "trace": tracing.carry(p, "risk")})
+            self._reserve(orders[-1])                          # sequential: each order moves VaR
+        if skipped:
+            notes.append({"note": "Risk gate: basket capacity", "skipped": skipped, "candidates": len(cands),
+                          "var": round(self.risk.var(), 2)})
+        return orders, notes
+
+    async def _flush(self, cycle: Any) -> None:
+        timer = self._timers.pop(cycle, None)
+        if timer is not None:
+            timer.cancel()
+        self._markers.pop(cycle, None)
+        self._shards.pop(cycle, None)
+        signals = self._pending.pop(cycle, None)
+        self._done.append(cycle)
+        if not signals:
+            return
+        orders, notes = self._allocate(signals)
+        for n in notes:
+            await self.bus.publish(Event(topic="strategy.log", payload=n))
+        if orders:
+            for o in orders:
+                o["trace"] = tracing.mark(o["trace"], "planned")
+            await self.bus.publish(Event(topic="orders.batch", payload={"cycle": cycle, "orders": orders}))
+
+    def _complete(self, cycle: Any) -> bool:
+        """All shards' markers are in, and as many signals as they count."""
+        seen = self._markers.get(cycle, {})
+        return len(seen) >= self._shards.get(cycle, 1) and len(self._pending.get(cycle, ())) >= sum(seen.values())
+
+    async def _on_cycle_signal(self, p: Dict[str, Any]) -> None:
+        cycle = p["cycle"]
+        if cycle in self._done:
+            self._pending[cycle] = [p]          # after its basket (shard timed out): allocate alone
+            await self._flush(cycle)
+            return
+        self._pending.setdefault(cycle, []).append(p)
+        if cycle in self._markers and self._complete(cycle):
+            await self._flush(cycle)
+
+    async def _listen_cycles(self):
+        async for e in self.bus.subscribe("signals.cycle"):
+            p = e.payload
+            cycle = p.get("cycle")
+            if cycle in self._done:
+                continue
+            # a cycle whose marker never came must not hold its signals past the next one
+            for stale in [c for c in self._pending if c != cycle and c not in self._markers]:
+                await self._flush(stale)
+            seen = self._markers.setdefault(cycle, {})
+            shard = p.get("shard", 0)
+            seen[shard] = seen.get(shard, 0) + int(p.get("signals", 0))
+            self._shards[cycle] = int(p.get("shard_count", 1))
+            if cycle not in self._timers:
+                # the first marker means a shard finished its pass: wait that long for the rest
+                self._timers[cycle] = asyncio.get_running_loop().call_later(
+                    self.batch_wait, lambda: asyncio.ensure_future(self._flush(cycle)))
+            if self._complete(cycle):
+                await self._flush(cycle)
+
+    # --------------------------- main ---------------------------
 
     async def run(self):
-        import asyncio
         asyncio.create_task(self._listen_prices())
+        asyncio.create_task(self._sample_returns())
+        asyncio.create_task(self._listen_cycles())
+        asyncio.create_task(self._listen_fills())
+        if self.ckpt is not None:
+            asyncio.create_task(self._checkpoints())
 
         sub = self.bus.subscribe("signals.target")
         async for e in sub:
             p = e.payload
+            if self.batch and p.get("cycle") is not None:
+                await self._on_cycle_signal(p)
+                continue
+            trace = tracing.carry(p, "risk")
             sym = str(p.get("symbol", getattr(SETTINGS, "symbol", "BTC/USDT")))
             side = str(p["side"]).lower()
             strength = float(p.get("strength", 0.0))
@@ -47,8 +350,7 @@ class RiskAgent:
                 continue
 
             # Max concurrent trades
-            live = sum(1 for q in self.open_positions.values() if abs(q) > 0)
-            if live >= self.max_open and side != "flat":
+            if self.live >= self.max_open and side != "flat":
                 await self.bus.publish(Event(topic="strategy.log", payload={"note": "Risk gate: max open reached", "symbol": sym}))
                 continue
 
@@ -73,34 +375,43 @@ class RiskAgent:
             # Cap by per-trade notional
             max_qty_by_allocation = per_trade_cap / px
             qty = min(qty_target, max_qty_by_allocation)
-            if qty <= 0:
+            if qty <= 0 and side != "flat":   # flats (e.g. lapsed netted targets) carry no atr
                 continue
 
+            # Size to the target, not on top of it: a repeated signal only tops the position up
+            if side in ("long", "short"):
+                held = self.position(sym) * (1.0 if side == "long" else -1.0)
+                if qty - held < 0.1 * qty:
+                    continue
+                qty -= held
+
+            # Portfolio VaR: ten correlated alt longs are not ten independent bets
+            if side in ("long", "short"):
+                capped = self._var_cap(sym, side, qty, px)
+                if capped < 0.1 * qty:
+                    await self.bus.publish(Event(topic="strategy.log", payload={
+                        "note": "Risk gate: VaR limit", "symbol": sym,
+                        "var": round(self.risk.var(), 2), "limit": round(self.var_limit, 2)}))
+                    continue
+                qty = capped
+
             if side == "flat":
-                order_qty = abs(self.open_positions.get(sym, 0.0))
+                order_qty = abs(self.filled.get(sym, 0.0)) if self.position(sym) else 0.0
                 if order_qty > 0:
-                    await self.bus.publish(Event(topic="orders.planned", payload={
-                        "symbol": sym, "side": "flat", "qty": order_qty
-                    }))
-                    await self.bus.publish(Event(topic="exec.fills", payload={
-                        "status": "filled", "symbol": sym, "side": "flat",
-                        "qty": order_qty, "price": px
-                    }))
-                    self.gross_exposure -= min(self.gross_exposure, order_qty * px)
-                    self.open_positions[sym] = 0.0
+                    order = {"order_id": new_order_id("risk"), "symbol": sym, "side": "flat", "qty": order_qty, "price": px,
+                             "trace": tracing.mark(trace, "planned")}
+                    self._reserve(order)
+                    await self.bus.publish(Event(topic="orders.planned", payload=order))
                 continue
 
             if side == "long":
                 order_qty = round(qty, 6)
-                await self.bus.publish(Event(topic="orders.planned", payload={
-                    "symbol": sym, "side": "long", "qty": order_qty, "sl_price": sl_price, "tp_price": tp_price
-                }))
-                await self.bus.publish(Event(topic="exec.fills", payload={
-                    "status": "filled", "symbol": sym, "side": "long",
-                    "qty": order_qty, "price": px, "sl_price": sl_price, "tp_price": tp_price
-                }))
-                self.open_positions[sym] += order_qty
-                self.gross_exposure += order_qty * px
+                order = {"order_id": new_order_id("risk"), "symbol": sym, "side": "long", "qty": order_qty,
+                         "price": px, "atr": atr, "sl_price": sl_price, "tp_price": tp_price,
+                         "trace": tracing.mark(trace, "planned")}
+                self._reserve(order)
+                # ExecutionAgent fills it (and is the only publisher of exec.fills)
+                await self.bus.publish(Event(topic="orders.planned", payload=order))
                 continue
 
             if side == "short":
@@ -109,12 +420,8 @@ class RiskAgent:
                     await self.bus.publish(Event(topic="strategy.log", payload={"note": "Risk: shorts disabled (spot mode)", "symbol": sym}))
                     continue
                 order_qty = round(qty, 6)
-                await self.bus.publish(Event(topic="orders.planned", payload={
-                    "symbol": sym, "side": "short", "qty": order_qty, "sl_price": sl_price, "tp_price": tp_price
-                }))
-                await self.bus.publish(Event(topic="exec.fills", payload={
-                    "status": "filled", "symbol": sym, "side": "short",
-                    "qty": order_qty, "price": px, "sl_price": sl_price, "tp_price": tp_price
-                }))
-                self.open_positions[sym] -= order_qty
-                self.gross_exposure += order_qty * px
\ No newline at end of file
+                order = {"order_id": new_order_id("risk"), "symbol": sym, "side": "short", "qty": order_qty,
+                         "price": px, "atr": atr, "sl_price": sl_price, "tp_price": tp_price,
+                         "trace": tracing.mark(trace, "planned")}
+                self._reserve(order)
+                await self.bus.publish(Event(topic="orders.planned", payload=order))
\ No newline at end of file
@@ -1,33 +1,40 @@
-import asyncio, random, time, re
-from macats.event_bus import Event
-from macats.event_bus import EventBus
+import asyncio
+from typing import AsyncIterable, Dict, List, Optional
 
-POS = {"moon","pump","breakout","bullish","rocket","win","long"}
-NEG = {"dump","bearish","rug","short","liquidate","fear","crash"}
+from macats.event_bus import Event, EventBus
+from macats.data.lexicon import Lexicon
+from macats.data.sentiment import default_lexicon, toy_source
 
 class SentimentAgent:
-    def __init__(self, bus):
+    """
+    Async sentiment ingestion: pulls texts from one or more sources, scores them with a
+    compiled lexicon (weighted words + phrases) and tags the coins they mention.
+    Sources: any async iterable of {"text", "ts"?, ...} (toy_source, FileReplaySource, ...).
+
+    Emits:
+      - sentiment.raw        {"ts","text","score","symbols":[base,...],"source"?}
+      - sentiment.raw.<BASE> same payload, once per tagged coin (only with symbol_topics=True)
+    """
+    def __init__(self, bus: EventBus,
+                 sources: Optional[List[AsyncIterable[Dict]]] = None,
+                 lexicon: Optional[Lexicon] = None,
+                 symbol_topics: bool = False):
         self.bus = bus
+        self.sources = sources if sources is not None else [toy_source(0.2)]
+        self.lexicon = lexicon or default_lexicon()
+        self.symbol_topics = symbol_topics
 
-    def _toy_stream(self):
-        import random, time, re
-        samples = [
-            "BTC looks bullish, breakout soon?",
-            "Funding too high, crash coming",
-            "ETH on a rocket, careful at resistance",
-            "Chop city. Staying flat.",
-            "Bearish div on 4h, likely dump",
-            "Macro improving, DXY down, risk on",
-        ]
-        while True:
-            text = random.choice(samples)
-            toks = re.findall(r"[a-z]+", text.lower())
-            # ✅ correct membership checks:
-            score = sum(1 for t in toks if t in POS) - sum(1 for t in toks if t in NEG)
-            yield {"ts": time.time(), "text": text, "score": float(score)}
+    def score(self, item: Dict) -> Dict:
+        score, symbols = self.lexicon.score_tags(str(item.get("text", "")))
+        return {**item, "score": score, "symbols": symbols}
 
-    async def run(self):
-        import asyncio
-        for msg in self._toy_stream():
+    async def _pump(self, source: AsyncIterable[Dict]) -> None:
+        async for item in source:
+            msg = self.score(item)
             await self.bus.publish(Event(topic="sentiment.raw", payload=msg))
-            await asyncio.sleep(0.2)
\ No newline at end of file
+            if self.symbol_topics:
+                for base in msg["symbols"]:
+                    await self.bus.publish(Event(topic=f"sentiment.raw.{base}", payload=msg))
+
+    async def run(self):
+        await asyncio.gather(*(self._pump(s) for s in self.sources))
@@ -0,0 +1,207 @@
+# macats/agents/signal_netting_agent.py
+import asyncio
+import math
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from macats.event_bus import Event, EventBus
+from macats.config import SETTINGS
+from macats import tracing
+
+
+def cycle_topic(signal_topic: str) -> str:
+    """Cycle-marker topic that travels with a signal topic (signals.target -> signals.cycle)."""
+    return "signals.cycle" if signal_topic == "signals.target" else f"{signal_topic}.cycle"
+
+
+@dataclass
+class TargetState:
+    side: str = "flat"
+    strength: float = 0.0
+    since: float = 0.0        # when the current side was adopted
+    misses: int = 0           # consecutive scans without a signal while non-flat
+    suppressed: int = 0
+
+
+class SignalNettingAgent:
+    """
+    Sits between the scanner and RiskAgent and forwards only changes in intent.
+
+    Per symbol it keeps the last forwarded target side/strength:
+      - same side: forwarded again only if strength rises by more than `band` (RiskAgent
+        sizes to the target, so this tops the position up rather than stacking an entry)
+      - side flip: forwarded once `min_hold` secs have passed since the last change; shorts
+        are dropped while shorts are disabled, so a held long keeps its side
+      - no signal for `exit_after` scans in a row: the target lapses to flat, forwarded as a
+        flat signal with forward_flat=True; otherwise stops handle the exit and the target
+        keeps its side until the position is closed
+      - the position (net filled qty from exec.fills) reaching zero resets the target so a
+        later signal re-enters; a partial exit does not
+    Bursts are coalesced: within one scan cycle the last signal per symbol wins, and signals
+    without a cycle are held for `coalesce_ms` first. A cycle is netted once its marker and
+    as many signals as the marker counts have arrived (or `cycle_wait` secs after the marker).
+
+    Listens:
+      - <in_topic>            (scanner signals, default signals.candidate)
+      - <in_topic>.cycle      {"cycle","symbols",...}
+      - exec.fills
+    Emits:
+      - signals.target, signals.cycle (same payloads, only the netted subset)
+    """
+
+    def __init__(self, bus: EventBus, in_topic: str = "signals.candidate", out_topic: str = "signals.target",
+                 min_hold: Optional[float] = None, band: Optional[float] = None, exit_after: Optional[int] = None,
+                 forward_flat: Optional[bool] = None, coalesce_ms: float = 250.0, cycle_wait: float = 5.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.bus = bus
+        self.in_topic, self.out_topic = in_topic, out_topic
+        self.min_hold = SETTINGS.net_min_hold_secs if min_hold is None else min_hold
+        self.band = SETTINGS.net_band if band is None else band
+        self.exit_after = SETTINGS.net_exit_after if exit_after is None else exit_after
+        self.forward_flat = SETTINGS.net_forward_flat if forward_flat is None else forward_flat
+        self.coalesce = coalesce_ms / 1000.0
+        self.cycle_wait = cycle_wait
+        self.clock = clock
+        self.state: Dict[str, TargetState] = {}
+        self.positions: Dict[str, float] = {}          # symbol -> net filled qty (signed)
+        self._cycles: Dict[Any, Dict[str, Dict[str, Any]]] = {}
+        self._got: Dict[Any, int] = {}                 # cycle -> signals received, not yet netted
+        self._marks: Dict[Any, List[Dict[str, Any]]] = {}
+        self._timers: Dict[Any, asyncio.TimerHandle] = {}
+        self._forced: deque = deque(maxlen=256)        # cycles closed on timeout: stragglers go loose
+        self._loose: Dict[str, Dict[str, Any]] = {}
+        self.stats = {"in": 0, "out": 0}
+
+    def _st(self, sym: str) -> TargetState:
+        st = self.state.get(sym)
+        if st is None:
+            st = self.state[sym] = TargetState(since=-1e18)
+        return st
+
+    def net(self, p: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply one (coalesced) signal to the state machine; returns the payload to forward, if any."""
+        sym = str(p.get("symbol", getattr(SETTINGS, "symbol", "BTC/USDT")))
+        side = str(p.get("side", "flat")).lower()
+        strength = float(p.get("strength", 0.0))
+        st = self._st(sym)
+        now = self.clock()
+        if side == "short" and not getattr(SETTINGS, "allow_shorts", False):
+            st.suppressed += 1               # spot mode: RiskAgent would drop it; keep the held side
+            return None
+        if side != "flat":
+            st.misses = 0
+        elif not self.forward_flat:
+            st.suppressed += 1               # nothing closes the position: hold the side until its flat fill
+            return None
+        if side == st.side:
+            if side == "flat" or strength <= st.strength + self.band:
+                st.suppressed += 1
+                return None
+        elif now - st.since < self.min_hold:
+            st.suppressed += 1               # flip too soon after the last change
+            return None
+        prev = st.side
+        if side != prev:
+            st.since = now
+        st.side, st.strength = side, strength
+        return {**p, "prev_side": prev, "trace": tracing.carry(p, "netted")}
+
+    def _lapse(self, symbols: List[str], signalled) -> List[Dict[str, Any]]:
+        out = []
+        for sym in symbols:
+            st = self.state.get(sym)
+            if st is None or st.side == "flat" or sym in signalled:
+                continue
+            st.misses += 1
+            if st.misses >= self.exit_after:
+                fwd = self.net({"symbol": sym, "side": "flat", "strength": 0.0, "reason": "lapsed"})
+                if fwd is not None:
+                    out.append(fwd)
+        return out
+
+    async def _forward(self, payloads: List[Dict[str, Any]]) -> None:
+        for p in payloads:
+            self.stats["out"] += 1
+            await self.bus.publish(Event(topic=self.out_topic, payload=p))
+
+    async def _on_signals(self):
+        async for e in self.bus.subscribe(self.in_topic):
+            p = e.payload
+            self.stats["in"] += 1
+            sym = str(p.get("symbol", getattr(SETTINGS, "symbol", "BTC/USDT")))
+            cycle = p.get("cycle")
+            if cycle is not None and cycle not in self._forced:
+                self._cycles.setdefault(cycle, {})[sym] = p
+                self._got[cycle] = self._got.get(cycle, 0) + 1
+                await self._close(cycle)
+                continue
+            if sym not in self._loose:
+                asyncio.get_running_loop().call_later(self.coalesce, lambda s=sym: asyncio.ensure_future(self._flush_loose(s)))
+            self._loose[sym] = p
+
+    async def _flush_loose(self, sym: str):
+        p = self._loose.pop(sym, None)
+        fwd = self.net(p) if p is not None else None
+        if fwd is not None:
+            await self._forward([fwd])
+
+    async def _close(self, cycle: Any, force: bool = False) -> None:
+        """Net a cycle once its marker(s) and the signals they count are in."""
+        marks = self._marks.get(cycle)
+        if not marks:
+            return
+        want = sum(int(m.get("signals", 0)) for m in marks)
+        if not force and self._got.get(cycle, 0) < want:
+            if cycle not in self._timers:
+                self._timers[cycle] = asyncio.get_running_loop().call_later(
+                    self.cycle_wait, lambda: asyncio.ensure_future(self._close(cycle, force=True)))
+            return
+        timer = self._timers.pop(cycle, None)
+        if timer is not None:
+            timer.cancel()
+        del self._marks[cycle]
+        left = self._got.pop(cycle, 0) - want      # another shard's signals, already here
+        if force:
+            self._forced.append(cycle)
+        elif left > 0:
+            self._got[cycle] = left
+        batch = self._cycles.pop(cycle, {})
+        out = [f for f in (self.net(p) for p in batch.values()) if f is not None]
+        out += self._lapse([s for m in marks for s in m.get("symbols", ())], batch)
+        await self._forward(out)
+        for i, m in enumerate(marks):
+            await self.bus.publish(Event(topic=cycle_topic(self.out_topic), payload={**m, "signals": len(out) if i == 0 else 0}))
+
+    async def _on_cycles(self):
+        async for e in self.bus.subscribe(cycle_topic(self.in_topic)):
+            m = e.payload
+            self._marks.setdefault(m.get("cycle"), []).append(m)
+            await self._close(m.get("cycle"))
+
+    async def _on_fills(self):
+        async for e in self.bus.subscribe("exec.fills"):
+            p = e.payload
+            if p.get("status") == "rejected" and not self.positions.get(str(p.get("symbol"))):
+                p = {**p, "status": "filled", "side": "flat", "qty": 0.0}     # entry never filled: nothing to hold
+            if p.get("status") != "filled":
+                continue
+            sym, qty = str(p.get("symbol")), float(p.get("qty", 0.0))
+            pos = self.positions.get(sym, 0.0)
+            if p.get("side") == "long":
+                pos += qty
+            elif p.get("side") == "short":
+                pos -= qty
+            elif p.get("side") == "flat":
+                pos = math.copysign(max(0.0, abs(pos) - qty), pos)
+            if abs(pos) > 1e-12:
+                self.positions[sym] = pos
+                continue
+            self.positions.pop(sym, None)
+            st = self.state.get(sym)
+            if st is not None and st.side != "flat":     # position closed: a later signal re-enters
+                st.side, st.strength, st.since, st.misses = "flat", 0.0, self.clock(), 0
+
+    async def run(self):
+        await asyncio.gather(self._on_signals(), self._on_cycles(), self._on_fills())
@@ -1,62 +1,95 @@
 # macats/agents/stop_agent.py
 import asyncio
+import time
 from dataclasses import dataclass
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from macats.event_bus import Event, EventBus
+from macats.checkpoint import Checkpointer
+from macats.config import SETTINGS
+from macats.paper_engine import new_order_id
+from macats.stop_book import StopBook, StopOrder
+from macats import tracing
 
 @dataclass
 class PosState:
     qty: float = 0.0          # +long, -short
     avg_px: float = 0.0
-    sl: Optional[float] = None
-    tp: Optional[float] = None
 
 class StopAgent:
     """
-    Auto-close on SL/TP breaches.
+    Auto-close on SL/TP/trailing/time stops, kept in a price-indexed StopBook.
+    Every entry fill gets its own OCO bracket, so adds keep their own levels.
     Listens:
       - market.last: {"symbol","price"}
-      - exec.fills : {"status":"filled","symbol","side","qty","price", "sl_price"?, "tp_price"?}
+      - market.bar : {"symbol","h","l",...}      (wicks trigger stops inside a bar)
+      - exec.fills : {"status":"filled","symbol","side","qty","price",
+                      "sl_price"?, "tp_price"?, "trail_dist"?, "max_hold_secs"?}
     Emits:
-      - orders.planned (flat)
-      - exec.fills    (simulated by ExecutionAgent)
+      - orders.planned (flat, with "stop_id", "stop_px" and a new trace whose parent is the entry's)
+      - exec.fills    (filled by ExecutionAgent)
+    With state_dir, positions and the stop book survive restarts (snapshot + WAL of fills).
     """
-    def __init__(self, bus: EventBus):
+    def __init__(self, bus: EventBus, time_check_secs: float = 1.0, state_dir: Optional[str] = None):
         self.bus = bus
+        self.book = StopBook()
         self.pos: Dict[str, PosState] = {}
         self.last_px: Dict[str, float] = {}
+        self.time_check_secs = time_check_secs
+        self.entry_trace: Dict[str, str] = {}     # symbol -> trace id of the latest entry fill
+        self.ckpt = Checkpointer(state_dir, "stops", every_secs=SETTINGS.checkpoint_secs,
+                                 fsync=SETTINGS.checkpoint_fsync) if state_dir else None
+        if self.ckpt is not None:
+            self._restore()
 
     def _ps(self, sym: str) -> PosState:
         if sym not in self.pos:
             self.pos[sym] = PosState()
         return self.pos[sym]
 
+    async def _flatten(self, fired: List[StopOrder]):
+        for o in fired:
+            ps = self._ps(o.symbol)
+            qty = min(o.qty, abs(ps.qty))
+            if qty <= 0 or (ps.qty > 0) != (o.side == "long"):
+                continue       # position already gone or flipped; the stop is stale
+            # the book has dropped the stop (and its OCO siblings), so it cannot fire twice
+            # while the flatten is in flight; PortfolioAgent updates after the fill
+            trace = tracing.start("trigger", parent=self.entry_trace.get(o.symbol))
+            await self.bus.publish(Event(topic="orders.planned", payload={
+                "order_id": new_order_id("stop"), "symbol": o.symbol, "side": "flat", "qty": qty, "reason": o.kind.upper(),
+                "stop_id": o.id, "stop_px": o.level if o.kind != "time" else self.last_px.get(o.symbol),
+                "trace": tracing.mark(trace, "planned"),
+            }))
+
     async def _on_price(self):
         sub = self.bus.subscribe("market.last")
         async for e in sub:
             sym = str(e.payload["symbol"])
             px = float(e.payload["price"])
             self.last_px[sym] = px
+            fired = self.book.on_tick(sym, px)
+            if fired:
+                await self._flatten(fired)
 
-            ps = self._ps(sym)
-            if ps.qty == 0.0:
+    async def _on_bars(self):
+        sub = self.bus.subscribe("market.bar")
+        async for e in sub:
+            p = e.payload
+            if p.get("h") is None or p.get("l") is None:
                 continue
+            fired = self.book.on_bar(str(p["symbol"]), float(p["h"]), float(p["l"]))
+            if fired:
+                await self._flatten(fired)
 
-            # Check SL/TP
-            if ps.qty > 0:
-                hit_sl = (ps.sl is not None) and (px <= ps.sl)
-                hit_tp = (ps.tp is not None) and (px >= ps.tp)
-            else:  # short
-                hit_sl = (ps.sl is not None) and (px >= ps.sl)
-                hit_tp = (ps.tp is not None) and (px <= ps.tp)
-
-            if hit_sl or hit_tp:
-                qty_to_close = abs(ps.qty)
-                # Fire a flatten order
-                await self.bus.publish(Event(topic="orders.planned", payload={
-                    "symbol": sym, "side": "flat", "qty": qty_to_close, "reason": "SL" if hit_sl else "TP"
-                }))
-                # Let ExecutionAgent fill it; we do not modify position state here. PortfolioAgent updates after fill.
+    async def _on_time(self):
+        while True:
+            await asyncio.sleep(self.time_check_secs)
+            fired = self.book.on_time(time.time())
+            if fired:
+                await self._flatten(fired)
+
+    # fill fields the position/bracket logic uses (the WAL record)
+    _FILL_KEYS = ("symbol", "side", "qty", "price", "stop_id", "sl_price", "tp_price", "trail_dist", "max_hold_secs")
 
     async def _on_fills(self):
         sub = self.bus.subscribe("exec.fills")
@@ -64,45 +97,94 @@ class StopAgent:
             p = e.payload
             if p.get("status") != "filled":
                 continue
-            sym = str(p["symbol"])
-            side = str(p["side"])
-            qty = float(p.get("qty", 0.0))
-            px = float(p.get("price", self.last_px.get(sym, 0.0)))
-            sl = p.get("sl_price")
-            tp = p.get("tp_price")
-
-            ps = self._ps(sym)
-
-            # Update state on fills
-            if side == "flat":
-                # Position is closed (or reduced) — rely on PortfolioAgent to handle exact avg.
-                # We only zero SL/TP if fully flat afterwards; we infer via qty in pos (StopAgent doesn't know post-trade pos immediately).
-                # To keep it simple, if a flatten is requested, clear SL/TP.
-                ps.sl, ps.tp = None, None
+            if self.ckpt is None:
+                self._apply_fill(p, time.time())
                 continue
+            rec = {k: p[k] for k in self._FILL_KEYS if p.get(k) is not None}
+            rec["ts"] = time.time()
+            rec["trace_id"] = tracing.trace_id(p)
+            due = self.ckpt.append(rec)
+            self._apply_fill(rec, rec["ts"])
+            if due:
+                self._snapshot()
+
+    def _apply_fill(self, p: Dict, now: float) -> None:
+        sym = str(p["symbol"])
+        side = str(p["side"])
+        qty = float(p.get("qty", 0.0))
+        px = float(p.get("price", self.last_px.get(sym, 0.0)))
+
+        ps = self._ps(sym)
+
+        if side == "flat":
+            closing = abs(ps.qty) if qty <= 0 else min(qty, abs(ps.qty))
+            ps.qty -= closing if ps.qty > 0 else -closing
+            # our own stop fills were removed from the book when they fired;
+            # any other flatten (risk, manual) or a full close drops the rest
+            if p.get("stop_id") is None or ps.qty == 0.0:
+                self.book.cancel_symbol(sym)
+            if ps.qty == 0.0:
+                ps.avg_px = 0.0
+            return
+
+        trade_qty = qty if side == "long" else -qty
+        new_qty = ps.qty + trade_qty
+        tid = p.get("trace_id") or tracing.trace_id(p)
+        if tid:
+            self.entry_trace[sym] = tid
+
+        # Update avg price (VWAP) locally for reference (PortfolioAgent is the source of truth)
+        if ps.qty == 0.0 or (ps.qty > 0 and new_qty > 0) or (ps.qty < 0 and new_qty < 0):
+            total_notional = abs(ps.qty) * ps.avg_px + abs(trade_qty) * px
+            total_qty = abs(ps.qty) + abs(trade_qty)
+            ps.avg_px = (total_notional / total_qty) if total_qty > 0 else 0.0
+        elif new_qty == 0.0 or (new_qty > 0) != (ps.qty > 0):
+            # closed or flipped by an opposite fill: old brackets no longer apply
+            self.book.cancel_symbol(sym)
+            ps.avg_px = 0.0 if new_qty == 0.0 else px
+
+        ps.qty = new_qty
+        if new_qty == 0.0 or (new_qty > 0) != (side == "long"):
+            return       # the fill only reduced the opposite position
+
+        # bracket for the part of this fill that opened/added exposure
+        opened = min(qty, abs(new_qty))
+        sl, tp = p.get("sl_price"), p.get("tp_price")
+        trail = p.get("trail_dist")
+        hold = p.get("max_hold_secs")
+        if sl is None and tp is None and not trail and hold is None:
+            return
+        self.book.add_bracket(
+            sym, side, opened,
+            sl=float(sl) if sl is not None else None,
+            tp=float(tp) if tp is not None else None,
+            trail=float(trail) if trail else None, ref_price=px,
+            expires=now + float(hold) if hold is not None else None,
+        )
+
+    # --------------------------- checkpoint ---------------------------
+
+    def _snapshot(self) -> None:
+        self.ckpt.snapshot({"book": self.book.state(), "entry_trace": self.entry_trace,
+                            "pos": {s: [ps.qty, ps.avg_px] for s, ps in self.pos.items() if ps.qty}})
+
+    def _restore(self) -> None:
+        state, records = self.ckpt.load()
+        if state is not None:
+            self.book = StopBook.from_state(state["book"])
+            self.entry_trace = dict(state["entry_trace"])
+            self.pos = {s: PosState(q, a) for s, (q, a) in state["pos"].items()}
+        for r in records:
+            self._apply_fill(r, r["ts"])
 
-            trade_qty = qty if side == "long" else -qty
-            new_qty = ps.qty + trade_qty
-
-            # Update avg price (VWAP) locally for reference (PortfolioAgent is the source of truth)
-            if ps.qty == 0.0 or (ps.qty > 0 and new_qty > 0) or (ps.qty < 0 and new_qty < 0):
-                total_notional = abs(ps.qty) * ps.avg_px + abs(trade_qty) * px
-                total_qty = abs(ps.qty) + abs(trade_qty)
-                ps.avg_px = (total_notional / total_qty) if total_qty > 0 else 0.0
-            else:
-                # crossing through zero
-                if new_qty == 0.0:
-                    ps.avg_px = 0.0
-                else:
-                    ps.avg_px = px
-
-            ps.qty = new_qty
-
-            # Update SL/TP if provided by the order/fill
-            if sl is not None:
-                ps.sl = float(sl)
-            if tp is not None:
-                ps.tp = float(tp)
+    async def _checkpoints(self):
+        while True:
+            await asyncio.sleep(self.ckpt.every_secs)
+            if self.ckpt.pending or len(self.book):    # trailing peaks move without fills
+                self._snapshot()
 
     async def run(self):
-        await asyncio.gather(self._on_price(), self._on_fills())
\ No newline at end of file
+        tasks = [self._on_price(), self._on_bars(), self._on_fills(), self._on_time()]
+        if self.ckpt is not None:
+            tasks.append(self._checkpoints())
+        await asyncio.gather(*tasks)
@@ -1,5 +1,6 @@
 import asyncio
 from macats.event_bus import Event, EventBus
+from macats.rolling import RollingStats
 
 class StrategyAgent:
     def __init__(self, bus: EventBus):
@@ -10,7 +11,7 @@ class StrategyAgent:
         sub_s = self.bus.subscribe("sentiment.raw")
 
         regime = None
-        sentiment_window = []
+        sentiment_window = RollingStats(capacity=8, windows=(8,))
 
         async def handle_regime():
             nonlocal regime
@@ -22,9 +23,9 @@ class StrategyAgent:
         async def handle_sentiment():
             nonlocal regime
             async for e in sub_s:
-                sentiment_window.append(e.payload["score"])
+                sentiment_window.push(e.payload["score"])
                 if len(sentiment_window) >= 8:
-                    s = sum(sentiment_window[-8:])
+                    s = sentiment_window.sum()
                     if regime and "trend_up" in regime and s > 0:
                         sig = {"side": "long", "strength": min(1.0, 0.1 + 0.1*s)}
                     elif regime and "trend_down" in regime and s < 0:
@@ -1,8 +1,12 @@
 # macats/agents/ta_strategy_agent.py
 import asyncio
 import math
-import pandas as pd
+from typing import Mapping
 from macats.event_bus import Event, EventBus
+from macats.data.frames import FeatureFrame
+from macats.features import FeatureContext, request
+
+COLS = ("c", "rsi", "trend", "ma_sep", "atr_pct")
 
 class TAStrategyAgent:
     """
@@ -14,30 +18,28 @@ class TAStrategyAgent:
     """
     def __init__(self, bus: EventBus):
         self.bus = bus
+        request("ta_strategy", COLS)
 
-    def _decide(self, row: pd.Series) -> dict:
-        c = float(row["c"])
-        sma_fast = float(row["sma_fast"])
-        sma_slow = float(row["sma_slow"])
+    def _decide(self, row: Mapping[str, float]) -> dict:
         rsi = float(row["rsi"])
-        atr = float(row["atr"])
+        trend = float(row["trend"])
 
         # Exit to flat on extreme RSI (overbought/oversold)
         if rsi >= 70 or rsi <= 30:
             return {"side": "flat", "strength": 0.0, "why": f"RSI={rsi:.1f} extreme"}
 
-        # Trend direction via MA cross
-        if sma_fast > sma_slow:
+        # Trend direction via MA cross (sign of SMA20 - SMA50)
+        if trend > 0:
             base_side = "long"
-        elif sma_fast < sma_slow:
+        elif trend < 0:
             base_side = "short"
         else:
             return {"side": "flat", "strength": 0.0, "why": "MAs equal"}
 
         # Conviction from MA separation (normalized) and RSI’s distance to 50
-        ma_sep = abs(sma_fast - sma_slow) / max(c, 1e-9)           # 0..~%
+        ma_sep = float(row["ma_sep"])                               # |SMA20 - SMA50| / close, 0..~%
         rsi_pulse = abs(rsi - 50.0) / 50.0                          # 0..1
-        vol_norm = min((atr / max(c,1e-9)) / 0.02, 1.0)             # ATR 2%+ caps
+        vol_norm = min(float(row["atr_pct"]) / 0.02, 1.0)           # ATR 2%+ caps
 
         raw_strength = 0.5 * min(ma_sep * 50.0, 1.0) + 0.5 * min(rsi_pulse, 1.0)
         strength = float(max(0.0, min(raw_strength * (0.75 + 0.25*vol_norm), 1.0)))
@@ -47,9 +49,9 @@ class TAStrategyAgent:
     async def run(self):
         sub = self.bus.subscribe("market.features")
         async for e in sub:
-            df: pd.DataFrame = e.payload["df"]
-            latest = df.iloc[-1]
-            sig = self._decide(latest)
+            frame: FeatureFrame = e.payload["frame"]
+            # columns TechAgent did not precompute (e.g. it runs in another process) are derived here
+            sig = self._decide(FeatureContext.from_frame(frame).latest_row(COLS))
             await self.bus.publish(Event(topic="strategy.log", payload={"note": f"TA decision: {sig}"}))
             await self.bus.publish(Event(topic="signals.target", payload={"side": sig["side"], "strength": sig["strength"]}))
             # For a live loop, you could sleep and re-emit on a schedule; for demo, one-shot is fine.
\ No newline at end of file
@@ -1,27 +1,43 @@
-import asyncio
+from collections import deque
+import pandas as pd
 from macats.event_bus import Event
-from macats.data.market import load_ohlcv, indicators
+from macats.data.bar_store import STORE
+from macats import features
+from macats.data.frames import FeatureFrame
+from macats.scheduler import BarScheduler
 from macats.config import SETTINGS
 
 class TechAgent:
-    def __init__(self, bus, yf_symbol=None, interval=None, lookback="60d", exchange_id=None):
+    """
+    Emits market.features {"frame": FeatureFrame} — one read-only frame per cycle shared by
+    every consumer. With shared=True (SHARED_FRAMES=1) frames live in shared memory so
+    agents in worker processes can map them; the last SHARED_FRAMES_KEEP are kept alive for
+    that, and a worker that arrives after a frame's block is gone drops that one event.
+    Bars come from the process-wide bar store, so a scanner in the same process reuses them.
+    Columns: OHLCV + the classic indicators + whatever consumers declared with
+    features.request(), each computed once per bar.
+    """
+    def __init__(self, bus, yf_symbol=None, interval=None, lookback="60d", exchange_id=None, shared=None):
         self.bus = bus
         self.symbol = yf_symbol or SETTINGS.symbol
         self.interval = interval or SETTINGS.timeframe
         self.lookback = lookback
         self.exchange_id = exchange_id or SETTINGS.exchange_id
+        self.shared = SETTINGS.shared_frames if shared is None else shared
+        self._recent = deque(maxlen=max(1, SETTINGS.shared_frames_keep))
 
     async def run(self):
+        sched = BarScheduler(close_delay=SETTINGS.bar_close_delay)
+        sched.add(self.symbol, self.interval)
         while True:
+            await sched.next_due()   # new bar closed
             try:
-                df = load_ohlcv(
-                    symbol=self.symbol,
-                    interval=self.interval,
-                    lookback=self.lookback,
-                    exchange_id=self.exchange_id,
-                )
-                feats = indicators(df).tail(500)
-                await self.bus.publish(Event(topic="market.features", payload={"df": feats}))
+                df = STORE.frame(self.symbol, self.interval, lookback=self.lookback, exchange_id=self.exchange_id)
+                ctx = features.FeatureContext.from_pandas(df).indicators()
+                names = dict.fromkeys((*features.BASE, *features.INDICATORS, *features.requested()))
+                cols = pd.DataFrame({n: ctx[n][-500:] for n in names}, index=pd.to_datetime(ctx.ts[-500:], unit="ns"))
+                frame = FeatureFrame.from_pandas(cols, shared=self.shared)
+                self._recent.append(frame)
+                await self.bus.publish(Event(topic="market.features", payload={"frame": frame}))
             except Exception as e:
-                await self.bus.publish(Event(topic="strategy.log", payload={"note": f"TechAgent error: {e}"}))
-            await asyncio.sleep(10)  # adjust cadence as you like
\ No newline at end of file
+                await self.bus.publish(Event(topic="strategy.log", payload={"note": f"TechAgent error: {e}"}))
\ No newline at end of file
@@ -0,0 +1,120 @@
+# macats/backtest.py
+"""
+Event-driven backtest: replays recorded OHLCV bars through the live agent stack
+(FSVZO evaluation -> netting -> risk -> paper execution -> stops -> portfolio) on one
+in-process bus, advancing a simulated clock bar by bar.
+
+Bars file: CSV with a header or JSON lines, columns ts,symbol,o,h,l,c,v (ts = bar open, epoch secs).
+
+    python -m macats backtest data/bars.csv --out logs/backtest
+"""
+import asyncio
+import csv
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from macats.config import SETTINGS
+from macats.event_bus import Event, EventBus
+from macats.scheduler import timeframe_seconds
+
+
+def load_bars(path: str) -> Dict[str, pd.DataFrame]:
+    """symbol -> OHLCV frame indexed by bar open time (UTC)."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith((".jsonl", ".json")):
+            rows: List[Dict[str, Any]] = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+    df = pd.DataFrame(rows)
+    for c in ("ts", "o", "h", "l", "c", "v"):
+        df[c] = df[c].astype(float)
+    df["ts"] = pd.to_datetime(df["ts"], unit="s")
+    return {str(s): g.drop(columns="symbol").set_index("ts").sort_index() for s, g in df.groupby("symbol")}
+
+
+async def settle(bus: EventBus, rounds: int = 3) -> None:
+    """Yield until every subscriber queue is empty (all agents reacted to what was published)."""
+    idle = 0
+    while idle < rounds:
+        await asyncio.sleep(0)
+        busy = any(q.qsize() for qs in bus.subscribers.values() for q in qs)
+        idle = 0 if busy else idle + 1
+
+
+async def run_backtest(path: str, out_dir: str = "logs/backtest", balance: Optional[float] = None,
+                       tf: Optional[str] = None, window: int = 200, warmup: int = 60) -> Dict[str, Any]:
+    from macats.agents.execution_agent import ExecutionAgent
+    from macats.agents.fsvzo_scanner_agent import FSVZOScannerAgent
+    from macats.agents.portfolio_agent import PortfolioAgent
+    from macats.agents.risk_agent import RiskAgent
+    from macats.agents.signal_netting_agent import SignalNettingAgent, cycle_topic
+    from macats.agents.stop_agent import StopAgent
+    from macats.data.feed import ManualFeed
+    from macats.reports import compute_stats, load_logs
+    from macats.risk_engine import RiskEngine
+
+    bars = load_bars(path)
+    tf = tf or SETTINGS.timeframe
+    balance = balance or SETTINGS.paper_start_balance
+    for name in ("trades.csv", "equity.csv"):
+        p = os.path.join(out_dir, name)
+        if os.path.exists(p):
+            os.remove(p)
+
+    now = [0.0]
+    clock = lambda: now[0]
+    bus = EventBus()
+    topic = "signals.candidate" if SETTINGS.signal_netting else "signals.target"
+    scanner = FSVZOScannerAgent(bus, topic=topic)
+    risk = RiskAgent(bus, balance=balance)
+    risk.risk = RiskEngine(sample_secs=timeframe_seconds(tf), confidence=SETTINGS.var_confidence)
+    agents = [risk, ExecutionAgent(bus), StopAgent(bus), PortfolioAgent(bus, balance, log_dir=out_dir, clock=clock)]
+    if SETTINGS.signal_netting:
+        agents.append(SignalNettingAgent(bus, in_topic=topic, clock=clock))
+    tasks = [asyncio.create_task(a.run()) for a in agents]
+    await settle(bus)
+
+    feed = ManualFeed(bus, publish_bars=True)
+    steps = sorted(set().union(*(df.index for df in bars.values())))
+    pos = {s: 0 for s in bars}
+    signals = 0
+    for ts in steps:
+        t = ts.timestamp()
+        now[0] = t + timeframe_seconds(tf)          # the bar is closed: we are at its close
+        cycle, scanned = int(now[0]), []
+        for sym, df in bars.items():
+            i = pos[sym]
+            if i >= len(df) or df.index[i] != ts:
+                continue
+            pos[sym] = i + 1
+            r = df.iloc[i]
+            await feed.emit("bar", sym, {"tf": tf, "ts": t, "o": r["o"], "h": r["h"], "l": r["l"], "c": r["c"], "v": r["v"], "closed": True})
+            await feed.emit("last", sym, {"price": r["c"], "ts": now[0]})
+            if i + 1 < warmup:
+                continue
+            scanned.append(sym)
+            try:
+                side, detail = scanner._evaluate(sym, df.iloc[max(0, i + 1 - window): i + 1])
+            except (ValueError, IndexError, KeyError):
+                continue                               # not enough clean bars yet
+            if side != "flat":
+                signals += 1
+                await bus.publish(Event(topic=topic, payload={
+                    "symbol": sym, "side": side, "strength": 0.8, "score": detail["score"],
+                    "sl_price": detail["sl_price"], "tp_price": detail["tp_price"], "atr": detail["atr"], "cycle": cycle}))
+        await settle(bus)
+        risk.risk.sample()
+        if scanned:
+            await bus.publish(Event(topic=cycle_topic(topic), payload={
+                "cycle": cycle, "shard": 0, "shard_count": 1, "symbols": scanned}))
+        await settle(bus)
+
+    for task in tasks:
+        task.cancel()
+    trades, equity = load_logs(out_dir)
+    stats = compute_stats(trades, equity)
+    stats.update({"bars": len(steps), "symbols": len(bars), "signals": signals})
+    return stats
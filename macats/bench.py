@@ -0,0 +1,314 @@
+# macats/bench.py
+"""
+Benchmarks with a stored baseline.
+
+  python -m macats bench                      # run all suites, compare with bench/baseline.json
+  python -m macats bench micro -k portfolio   # one suite, filtered by name
+  python -m macats bench --update-baseline    # accept current numbers
+
+Suites:
+  imports  cold import time in fresh interpreters (best of N), plus a check that each
+           module doesn't pull in heavy dependencies at import time
+  micro    hot paths on seeded synthetic data: indicators, FSVZO evaluation, portfolio
+           fills / mark-to-market, EventBus throughput, report stats, LLM JSON parsing
+"""
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+BASELINE = os.path.join("bench", "baseline.json")
+
+# module -> heavy packages it must NOT import eagerly
+IMPORT_TARGETS: Dict[str, List[str]] = {
+    "macats.cli": ["pandas", "numpy", "yfinance", "ccxt", "matplotlib", "aiohttp"],
+    "macats.orchestrator": ["pandas", "yfinance", "ccxt", "matplotlib", "aiohttp"],
+    "macats.reports": ["matplotlib", "yfinance", "ccxt"],
+    "macats.data.market": ["yfinance", "ccxt"],
+    "macats.agents.fsvzo_scanner_agent": ["yfinance", "ccxt", "matplotlib"],
+    "macats.agents.portfolio_agent": ["pandas", "yfinance", "ccxt", "matplotlib"],
+}
+HEAVY = sorted({m for ms in IMPORT_TARGETS.values() for m in ms})
+
+_PROBE = """
+import sys, time
+t = time.perf_counter()
+import {mod}
+dt = time.perf_counter() - t
+print(dt, ",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def import_time(module: str, repeat: int = 5) -> Dict[str, Any]:
+    """Best-of-`repeat` cold import time (ms) and heavy modules that came along."""
+    best, leaked = float("inf"), ""
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", _PROBE.format(mod=module, heavy=HEAVY)],
+                             capture_output=True, text=True)
+        if out.returncode != 0:
+            return {"error": (out.stderr.strip().splitlines() or ["failed"])[-1]}
+        dt, leaked = out.stdout.split(" ", 1) if " " in out.stdout else (out.stdout, "")
+        best = min(best, float(dt) * 1000.0)
+    loaded = [m for m in leaked.strip().split(",") if m]
+    return {"ms": round(best, 2), "leaks": [m for m in loaded if m in IMPORT_TARGETS[module]]}
+
+
+def run_imports(repeat: int = 5) -> Dict[str, Any]:
+    return {f"import:{m}": import_time(m, repeat) for m in IMPORT_TARGETS}
+
+
+# --------------------------- synthetic data ---------------------------
+
+def synthetic_ohlcv(n: int = 500, seed: int = 7, start: str = "2024-01-01", freq: str = "1h"):
+    """GBM closes with wicks and occasional volume spikes (so FSVZO takes its full path)."""
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    c = 100.0 * np.exp(np.cumsum(rng.normal(0.0002, 0.01, n)))
+    o = np.r_[c[0], c[:-1]]
+    h = np.maximum(o, c) * (1 + np.abs(rng.normal(0, 0.003, n)))
+    l = np.minimum(o, c) * (1 - np.abs(rng.normal(0, 0.003, n)))
+    v = rng.lognormal(5, 0.5, n) * np.where(rng.random(n) < 0.05, 4.0, 1.0)
+    idx = pd.date_range(start, periods=n, freq=freq.replace("m", "min"))
+    return pd.DataFrame({"o": o, "h": h, "l": l, "c": c, "v": v}, index=idx)
+
+
+def synthetic_logs(n: int = 5000, seed: int = 7):
+    """(trades, equity) frames shaped like PortfolioAgent's CSVs after load_logs()."""
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    ts = pd.to_datetime(1.7e9 + np.arange(n) * 60.0, unit="s")
+    equity = pd.DataFrame({"ts": ts, "equity": 10000 * np.exp(np.cumsum(rng.normal(0, 0.001, n)))})
+    m = max(1, n // 10)
+    realized = np.cumsum(rng.normal(0, 5, m))
+    trades = pd.DataFrame({"ts": ts[::10][:m], "realized_total": realized, "realized_after": realized})
+    return trades, equity
+
+
+def synthetic_llm_replies(n: int = 100, seed: int = 7) -> List[str]:
+    import random
+    rnd = random.Random(seed)
+    out = []
+    for i in range(n):
+        body = json.dumps({"sentiment": rnd.uniform(-1, 1), "macro_risk": rnd.choice(["low", "med", "high"]),
+                           "confidence": rnd.random(), "notes": "x" * rnd.randint(10, 200)})
+        out.append(rnd.choice([body, f"```json\n{body}\n```", f"Sure! Here you go: {body} Hope it helps."]))
+    return out
+
+
+# --------------------------- micro suite ---------------------------
+
+def timeit(fn: Callable[[], Any], repeat: int = 5, min_time: float = 0.1) -> float:
+    """Best-of-`repeat` seconds per call; calls per round are auto-ranged to last >= min_time."""
+    number = 1
+    while True:
+        t = time.perf_counter()
+        for _ in range(number):
+            fn()
+        dt = time.perf_counter() - t
+        if dt >= min_time or number >= 1 << 20:
+            break
+        number *= 2 if dt == 0 else max(2, min(10, int(min_time / dt) + 1))
+    best = dt / number
+    for _ in range(repeat - 1):
+        t = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - t) / number)
+    return best
+
+
+def _b_indicators():
+    from macats.data.market import indicators
+    df = synthetic_ohlcv(500)
+    return lambda: indicators(df)
+
+
+def _b_fsvzo_evaluate():
+    from macats.event_bus import EventBus
+    from macats.agents.fsvzo_scanner_agent import FSVZOScannerAgent
+    from macats.features import CONTEXTS
+    agent = FSVZOScannerAgent(EventBus())
+    df = synthetic_ohlcv(300)
+
+    def run():
+        CONTEXTS.clear()            # a new bar every call: measure the evaluation, not the cache
+        return agent._evaluate("BTC/USDT", df)
+    return run
+
+
+def _portfolio():
+    from macats.event_bus import EventBus
+    from macats.agents.portfolio_agent import PortfolioAgent
+    agent = PortfolioAgent(EventBus(), 1e9, log_dir=tempfile.mkdtemp(prefix="macats-bench-"))
+    for i in range(50):
+        agent._set_last_price(f"S{i}", 100.0 + i)
+    return agent
+
+
+def _b_portfolio_apply_fill():
+    agent = _portfolio()
+    seq = [(f"S{i % 50}", "long" if i % 3 else "flat", 1.0 + i % 5, 100.0 + i % 7) for i in range(1000)]
+    def run():
+        for sym, side, qty, px in seq:
+            agent._apply_fill(sym, side, qty, px)
+    return run, len(seq)
+
+
+def _b_portfolio_mtm():
+    agent = _portfolio()
+    for i in range(50):
+        agent._apply_fill(f"S{i}", "long", 1.0, 100.0)
+    return agent._mark_to_market
+
+
+def _bus_throughput(subscribers: int, n: int = 20000):
+    from macats.event_bus import Event, EventBus
+
+    async def once():
+        bus = EventBus()
+        done = asyncio.Event()
+        left = [subscribers]
+
+        async def consume():
+            k = 0
+            async for _ in bus.subscribe("bench"):
+                k += 1
+                if k == n:
+                    break
+            left[0] -= 1
+            if not left[0]:
+                done.set()
+
+        tasks = [asyncio.create_task(consume()) for _ in range(subscribers)]
+        await asyncio.sleep(0)
+        payload = {"symbol": "BTC/USDT", "price": 100.0}
+        for i in range(n):
+            await bus.publish(Event("bench", payload))
+            if i % 256 == 0:
+                await asyncio.sleep(0)
+        await done.wait()
+        await asyncio.gather(*tasks)
+
+    return (lambda: asyncio.run(once())), n
+
+
+def _b_compute_stats():
+    from macats.reports import compute_stats
+    trades, equity = synthetic_logs(5000)
+    return lambda: compute_stats(trades, equity)
+
+
+def _b_force_json():
+    from macats.llm.providers import _force_json
+    replies = synthetic_llm_replies(100)
+    def run():
+        for r in replies:
+            _force_json(r)
+    return run, len(replies)
+
+
+# name -> setup() returning fn or (fn, ops per call); results are per op
+MICRO: Dict[str, Callable[[], Any]] = {
+    "market.indicators[500]": _b_indicators,
+    "fsvzo._evaluate[300]": _b_fsvzo_evaluate,
+    "portfolio._apply_fill": _b_portfolio_apply_fill,
+    "portfolio._mark_to_market[50]": _b_portfolio_mtm,
+    "event_bus.publish[1 sub]": lambda: _bus_throughput(1),
+    "event_bus.publish[4 subs]": lambda: _bus_throughput(4),
+    "reports.compute_stats[5000]": _b_compute_stats,
+    "llm._force_json": _b_force_json,
+}
+
+
+def run_micro(repeat: int = 5, pattern: str = "") -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    for name, setup in MICRO.items():
+        if pattern and pattern not in name:
+            continue
+        try:
+            made = setup()
+            fn, ops = made if isinstance(made, tuple) else (made, 1)
+            per_op = timeit(fn, repeat=repeat) / ops
+        except ImportError as e:            # optional dependency missing here
+            results[f"micro:{name}"] = {"skipped": str(e)}
+            continue
+        results[f"micro:{name}"] = {"us": round(per_op * 1e6, 3), "ops_s": round(1.0 / per_op, 1)}
+    return results
+
+
+# --------------------------- baseline ---------------------------
+
+def _value(r: Dict[str, Any]) -> Optional[float]:
+    return r.get("ms", r.get("us"))
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regression messages: slower than baseline*(1+tolerance), or a new heavy import."""
+    problems = []
+    for name, r in results.items():
+        if "error" in r:
+            problems.append(f"{name}: {r['error']}")
+            continue
+        if r.get("leaks"):
+            problems.append(f"{name}: imports {', '.join(r['leaks'])} eagerly")
+        b, v = baseline.get(name) or {}, _value(r)
+        unit = "ms" if "ms" in r else "us"
+        if v is not None and _value(b) and v > _value(b) * (1 + tolerance):
+            problems.append(f"{name}: {v:.2f} {unit} vs baseline {_value(b):.2f} {unit} (+{v / _value(b) - 1:.0%})")
+    return problems
+
+
+def _line(name: str, r: Dict[str, Any], b: Dict[str, Any]) -> str:
+    if "ms" in r or "us" in r:
+        unit = "ms" if "ms" in r else "us"
+        delta = f"  ({_value(r) / _value(b) - 1:+.0%})" if _value(b) else ""
+        return f"{name:48s} {_value(r):12.3f} {unit}{delta}"
+    return f"{name:48s} {r.get('error') or r.get('skipped', '')}"
+
+
+SUITES = ("imports", "micro")
+
+
+def main(suites: List[str], baseline: str = BASELINE, update: bool = False, tolerance: float = 0.25,
+         repeat: int = 5, out: Optional[str] = None, pattern: str = "") -> int:
+    unknown = [s for s in suites if s not in SUITES]
+    if unknown:
+        print(f"unknown suite(s): {', '.join(unknown)} (have: {', '.join(SUITES)})")
+        return 2
+    base = {}
+    if os.path.exists(baseline):
+        with open(baseline) as f:
+            base = json.load(f)
+    results: Dict[str, Any] = {}
+    if "imports" in suites:
+        results.update({k: v for k, v in run_imports(repeat).items() if pattern in k})
+    if "micro" in suites:
+        results.update(run_micro(repeat, pattern))
+    for name, r in results.items():
+        print(_line(name, r, base.get(name) or {}))
+    if out:
+        meta = {"python": platform.python_version(), "machine": platform.machine(), "ts": time.time()}
+        with open(out, "w") as f:
+            json.dump({"_meta": meta, **results}, f, indent=2, sort_keys=True)
+    if update:
+        os.makedirs(os.path.dirname(baseline) or ".", exist_ok=True)
+        old = {}
+        if os.path.exists(baseline):
+            with open(baseline) as f:
+                old = json.load(f)
+        keep = {k: v for k, v in results.items() if "skipped" not in v and "error" not in v}
+        with open(baseline, "w") as f:
+            json.dump({**old, **keep}, f, indent=2, sort_keys=True)
+        print(f"baseline updated: {baseline}")
+        return 0
+    problems = compare(results, base, tolerance)
+    for p in problems:
+        print(f"REGRESSION {p}")
+    return 1 if problems else 0
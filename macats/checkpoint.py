@@ -0,0 +1,121 @@
+# macats/checkpoint.py
+"""
+Snapshot + write-ahead log for agent state, so a restart is one snapshot load plus a short
+replay instead of starting over (or re-reading trades.csv).
+
+    <dir>/<name>.snap   codec-encoded state, written to a temp file and renamed into place
+    <dir>/<name>.wal    records applied since that snapshot, one frame each:
+                        u32 length | u32 crc32 | codec({"seq": n, "r": record})
+
+An agent appends a record *before* applying it, and snapshots every `every_secs` or
+`every_records` records, whichever comes first; the WAL is truncated after each snapshot.
+Recovery skips records the snapshot already covers (a crash between rename and truncate)
+and stops at the first torn or corrupt frame (a crash mid-append).
+"""
+import os
+import struct
+import time
+import zlib
+from typing import Any, List, Optional, Tuple
+
+from macats.codec import decode, encode
+
+_FRAME = struct.Struct("<II")
+_CRC = struct.Struct("<I")
+_MAGIC = b"MCK1"
+
+
+class Checkpointer:
+    def __init__(self, directory: str, name: str, every_secs: float = 60.0, every_records: int = 1000,
+                 fsync: bool = False):
+        os.makedirs(directory, exist_ok=True)
+        self.dir = directory
+        self.snap_path = os.path.join(directory, f"{name}.snap")
+        self.wal_path = os.path.join(directory, f"{name}.wal")
+        self.every_secs = every_secs
+        self.every_records = every_records
+        self.fsync = fsync
+        self.seq = 0                  # last record written
+        self.pending = 0              # records since the last snapshot
+        self.last_snapshot = time.monotonic()
+        self._wal = None
+
+    # --------------------------- recovery ---------------------------
+
+    def load(self, repair: bool = True) -> Tuple[Optional[Any], List[Any]]:
+        """
+        (snapshot state or None, records to replay on top of it, oldest first).
+        repair=False only reads: for peeking at another agent's live checkpoint.
+        """
+        state, snap_seq = None, 0
+        if os.path.exists(self.snap_path):
+            with open(self.snap_path, "rb") as f:
+                blob = f.read()
+            if len(blob) >= 8 and blob[:4] == _MAGIC and _CRC.unpack_from(blob, 4)[0] == zlib.crc32(blob[8:]):
+                snap = decode(blob, 8)
+                state, snap_seq = snap["state"], snap["seq"]
+        records = []
+        self.seq = snap_seq
+        if os.path.exists(self.wal_path):
+            with open(self.wal_path, "rb") as f:
+                buf = f.read()
+            i = 0
+            while i + _FRAME.size <= len(buf):
+                n, crc = _FRAME.unpack_from(buf, i)
+                body = buf[i + _FRAME.size: i + _FRAME.size + n]
+                if len(body) < n or zlib.crc32(body) != crc:
+                    break                 # torn tail: everything before it is intact
+                i += _FRAME.size + n
+                rec = decode(body)
+                if rec["seq"] > snap_seq:
+                    records.append(rec["r"])
+                    self.seq = rec["seq"]
+            if repair and i < len(buf):   # drop the torn tail so new frames follow good ones
+                with open(self.wal_path, "r+b") as f:
+                    f.truncate(i)
+        self.pending = len(records)
+        return state, records
+
+    # --------------------------- write path ---------------------------
+
+    def append(self, record: Any) -> bool:
+        """Log one record; True when a snapshot is due."""
+        if self._wal is None:
+            self._wal = open(self.wal_path, "ab")
+        self.seq += 1
+        body = encode({"seq": self.seq, "r": record})
+        self._wal.write(_FRAME.pack(len(body), zlib.crc32(body)) + body)
+        self._wal.flush()
+        if self.fsync:
+            os.fsync(self._wal.fileno())
+        self.pending += 1
+        return self.due()
+
+    def due(self) -> bool:
+        return self.pending >= self.every_records or (
+            self.pending > 0 and time.monotonic() - self.last_snapshot >= self.every_secs)
+
+    def snapshot(self, state: Any) -> None:
+        body = encode({"seq": self.seq, "state": state})
+        tmp = self.snap_path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(_MAGIC + _CRC.pack(zlib.crc32(body)) + body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snap_path)
+        if hasattr(os, "O_DIRECTORY"):
+            fd = os.open(self.dir, os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        if self._wal is not None:
+            self._wal.close()
+        self._wal = open(self.wal_path, "wb")     # truncate: the snapshot covers it all
+        self.pending = 0
+        self.last_snapshot = time.monotonic()
+
+    def close(self) -> None:
+        if self._wal is not None:
+            self._wal.close()
+            self._wal = None
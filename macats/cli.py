@@ -0,0 +1,193 @@
+# macats/cli.py
+"""
+macats command line. Heavy dependencies are imported inside each subcommand, so
+`macats report --no-plot` never loads matplotlib and `macats bench` starts instantly.
+
+  python -m macats run
+  python -m macats report [--log-dir logs] [--no-plot] [--json]
+  python -m macats backtest BARS [--out logs/backtest] [--balance 10000]
+  python -m macats loadtest [--symbols 10,50,200] [--tps 200,1000,4000] [--stage-secs 10]
+  python -m macats traces [--path logs/traces.bin] [--json]
+  python -m macats journal [--dir journal] [--topic T ...] [--since TIME] [--until TIME] [--stats]
+  python -m macats bench [imports|micro] [-k NAME] [--update-baseline] [--out results.json]
+"""
+import argparse
+import json
+import sys
+from typing import List, Optional
+
+
+def _load_env() -> None:
+    # before anything imports macats.config (settings are read at import)
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
+
+
+def _print_stats(stats, as_json: bool) -> None:
+    if as_json:
+        print(json.dumps(stats, indent=2, default=float))
+        return
+    print("=== STATS ===")
+    for k, v in stats.items():
+        if "rate" in k or "drawdown" in k:
+            print(f"{k}: {v:.2%}")
+        else:
+            print(f"{k}: {v}")
+
+
+def cmd_run(args) -> int:
+    import asyncio
+    from macats.orchestrator import main as orchestrator_main
+    asyncio.run(orchestrator_main())
+    return 0
+
+
+def cmd_report(args) -> int:
+    import os
+    from macats.reports import compute_stats, load_logs, plot_equity
+    trades, equity = load_logs(args.log_dir)
+    _print_stats(compute_stats(trades, equity), args.json)
+    if not args.no_plot:
+        plot_equity(equity, out=os.path.join(args.log_dir, "equity_curve.png"))
+    return 0
+
+
+def cmd_backtest(args) -> int:
+    import asyncio
+    from macats.backtest import run_backtest
+    stats = asyncio.run(run_backtest(args.bars, out_dir=args.out, balance=args.balance, tf=args.tf,
+                                     window=args.window))
+    _print_stats(stats, args.json)
+    return 0
+
+
+def cmd_loadtest(args) -> int:
+    import asyncio
+    from macats.loadgen import run_load
+    symbols = [int(x) for x in args.symbols.split(",")]
+    tps = [float(x) for x in args.tps.split(",")] if args.tps else [20.0 * s for s in symbols]
+    res = asyncio.run(run_load(symbols, tps, secs=args.stage_secs, bar_secs=args.bar_secs, seed=args.seed,
+                               keep_going=args.keep_going, echo=None if args.json else print,
+                               signal_rate=args.signal_rate))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(res, f, indent=2)
+    if args.json:
+        print(json.dumps(res, indent=2))
+    else:
+        print(f"capacity: {res['capacity']}  saturation: {res['saturation']}")
+    return 0
+
+
+def cmd_traces(args) -> int:
+    import os
+    from macats.tracing import format_report, latency_report, read_traces
+    rep = latency_report(read_traces(args.path)) if os.path.exists(args.path) else {}
+    print(json.dumps(rep, indent=2) if args.json else (format_report(rep) or "no traces"))
+    return 0
+
+
+def _ns(t: Optional[str]) -> Optional[int]:
+    """Epoch seconds or ISO time (UTC if no offset) -> ns."""
+    if not t:
+        return None
+    from datetime import datetime, timezone
+    try:
+        return int(float(t) * 1e9)
+    except ValueError:
+        dt = datetime.fromisoformat(t)
+        return int((dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)).timestamp() * 1e9)
+
+
+def cmd_journal(args) -> int:
+    from macats.journal import JournalReader
+    reader = JournalReader(args.dir)
+    since, until = _ns(args.since), _ns(args.until)
+    if args.stats:
+        print(json.dumps(reader.stats(since, until), indent=2))
+        return 0
+    for n, (ts, topic, payload) in enumerate(reader.read(since, until, args.topic or ())):
+        if args.limit and n >= args.limit:
+            break
+        print(json.dumps({"ts": ts / 1e9, "topic": topic, "payload": payload}, default=str))
+    return 0
+
+
+def cmd_bench(args) -> int:
+    from macats import bench
+    return bench.main(args.suite or list(bench.SUITES), baseline=args.baseline, update=args.update_baseline,
+                      tolerance=args.tolerance, repeat=args.repeat, out=args.out, pattern=args.k)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="macats", description="Multi-agent crypto trading system")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    r = sub.add_parser("run", help="run the agent stack (same as main.py)")
+    r.set_defaults(func=cmd_run)
+
+    r = sub.add_parser("report", help="stats (and equity plot) from the paper logs")
+    r.add_argument("--log-dir", default="logs")
+    r.add_argument("--no-plot", action="store_true", help="skip the plot (no matplotlib import)")
+    r.add_argument("--json", action="store_true")
+    r.set_defaults(func=cmd_report)
+
+    r = sub.add_parser("backtest", help="replay recorded bars through the agents")
+    r.add_argument("bars", help="CSV/JSONL with ts,symbol,o,h,l,c,v")
+    r.add_argument("--out", default="logs/backtest")
+    r.add_argument("--balance", type=float, default=None)
+    r.add_argument("--tf", default=None, help="bar timeframe (default: TIMEFRAME)")
+    r.add_argument("--window", type=int, default=200, help="bars per evaluation")
+    r.add_argument("--json", action="store_true")
+    r.set_defaults(func=cmd_backtest)
+
+    r = sub.add_parser("loadtest", help="ramp a synthetic market through the agents (no network)")
+    r.add_argument("--symbols", default="10,25,50,100,200", help="symbols per stage")
+    r.add_argument("--tps", default=None, help="ticks/s per stage (default: 20 per symbol)")
+    r.add_argument("--stage-secs", type=float, default=10.0)
+    r.add_argument("--bar-secs", type=float, default=2.0, help="wall secs per synthetic bar (one scan each)")
+    r.add_argument("--seed", type=int, default=7)
+    r.add_argument("--signal-rate", type=float, default=0.1,
+                   help="share of symbols given an injected signal per bar (0: scanner signals only)")
+    r.add_argument("--keep-going", action="store_true", help="run every stage even after saturation")
+    r.add_argument("--json", action="store_true")
+    r.add_argument("--out", default=None, help="write results JSON here")
+    r.set_defaults(func=cmd_loadtest)
+
+    r = sub.add_parser("traces", help="per-stage scan -> fill latency from recorded traces")
+    r.add_argument("--path", default="logs/traces.bin")
+    r.add_argument("--json", action="store_true")
+    r.set_defaults(func=cmd_traces)
+
+    r = sub.add_parser("journal", help="read the event journal (JOURNAL_DIR)")
+    r.add_argument("--dir", default="journal")
+    r.add_argument("--topic", action="append", help="only this topic (repeatable)")
+    r.add_argument("--since", default=None, help="epoch secs or ISO time")
+    r.add_argument("--until", default=None, help="epoch secs or ISO time")
+    r.add_argument("--limit", type=int, default=0)
+    r.add_argument("--stats", action="store_true", help="record counts per topic instead of records")
+    r.set_defaults(func=cmd_journal)
+
+    r = sub.add_parser("bench", help="benchmarks vs the stored baseline")
+    r.add_argument("suite", nargs="*", help="imports, micro (default: all)")
+    r.add_argument("-k", default="", help="only benchmarks whose name contains this")
+    r.add_argument("--baseline", default="bench/baseline.json")
+    r.add_argument("--update-baseline", action="store_true")
+    r.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown (0.25 = +25%%)")
+    r.add_argument("--repeat", type=int, default=5)
+    r.add_argument("--out", default=None, help="write results JSON here")
+    r.set_defaults(func=cmd_bench)
+    return p
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    _load_env()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
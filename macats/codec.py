@@ -0,0 +1,137 @@
+# macats/codec.py
+"""
+Compact binary encoding for event payloads (JSON-like values).
+
+    None/True/False : 1 byte
+    int             : tag + zigzag varint
+    float           : tag + 8 bytes (little-endian double)
+    str / bytes     : tag + varint length + data
+    list / tuple    : tag + varint count + items
+    dict            : tag + varint count + (key, value) pairs
+
+NumPy scalars are encoded as plain int/float. Anything else raises TypeError.
+"""
+import struct
+from typing import Any, Tuple
+
+_NONE, _TRUE, _FALSE, _INT, _FLOAT, _STR, _BYTES, _LIST, _DICT = range(9)
+_F64 = struct.Struct("<d")
+
+
+def _varint(n: int, out: bytearray) -> None:
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _enc(obj: Any, out: bytearray) -> None:
+    t = type(obj)
+    if t is str:
+        b = obj.encode("utf-8")
+        out.append(_STR)
+        _varint(len(b), out)
+        out += b
+    elif t is float:
+        out.append(_FLOAT)
+        out += _F64.pack(obj)
+    elif obj is None:
+        out.append(_NONE)
+    elif t is bool:
+        out.append(_TRUE if obj else _FALSE)
+    elif t is int:
+        out.append(_INT)
+        if not -(1 << 63) <= obj < (1 << 63):
+            raise TypeError("codec: int out of int64 range")
+        _varint((obj << 1) ^ (obj >> 63), out)
+    elif t is dict:
+        out.append(_DICT)
+        _varint(len(obj), out)
+        for k, v in obj.items():
+            _enc(k, out)
+            _enc(v, out)
+    elif t is list or t is tuple:
+        out.append(_LIST)
+        _varint(len(obj), out)
+        for v in obj:
+            _enc(v, out)
+    elif t is bytes or t is bytearray or t is memoryview:
+        b = bytes(obj)
+        out.append(_BYTES)
+        _varint(len(b), out)
+        out += b
+    elif hasattr(obj, "item") and hasattr(obj, "dtype") and getattr(obj, "ndim", 1) == 0:
+        _enc(obj.item(), out)          # numpy scalar
+    elif isinstance(obj, (dict, list, tuple, str, int, float)):
+        _enc(_coerce(obj), out)
+    else:
+        raise TypeError(f"codec: cannot encode {t.__name__}")
+
+
+def _coerce(obj: Any) -> Any:
+    # subclasses (defaultdict, IntEnum, ...) -> their plain base type
+    for base in (bool, int, float, str, dict, list, tuple):
+        if isinstance(obj, base):
+            return base(obj)
+    return obj
+
+
+def encode(obj: Any) -> bytes:
+    out = bytearray()
+    _enc(obj, out)
+    return bytes(out)
+
+
+def encode_into(obj: Any, out: bytearray) -> None:
+    _enc(obj, out)
+
+
+def _dec(buf, i: int) -> Tuple[Any, int]:
+    tag = buf[i]
+    i += 1
+    if tag == _STR or tag == _BYTES or tag == _INT or tag == _LIST or tag == _DICT:
+        n = 0
+        shift = 0
+        while True:
+            b = buf[i]
+            i += 1
+            n |= (b & 0x7F) << shift
+            if b < 0x80:
+                break
+            shift += 7
+        if tag == _STR:
+            return str(buf[i:i + n], "utf-8"), i + n
+        if tag == _INT:
+            return (n >> 1) ^ -(n & 1), i
+        if tag == _BYTES:
+            return bytes(buf[i:i + n]), i + n
+        if tag == _LIST:
+            items = []
+            for _ in range(n):
+                v, i = _dec(buf, i)
+                items.append(v)
+            return items, i
+        d = {}
+        for _ in range(n):
+            k, i = _dec(buf, i)
+            v, i = _dec(buf, i)
+            d[k] = v
+        return d, i
+    if tag == _FLOAT:
+        return _F64.unpack_from(buf, i)[0], i + 8
+    if tag == _NONE:
+        return None, i
+    if tag == _TRUE:
+        return True, i
+    if tag == _FALSE:
+        return False, i
+    raise ValueError(f"codec: bad tag {tag} at {i - 1}")
+
+
+def decode(buf, offset: int = 0) -> Any:
+    return _dec(buf, offset)[0]
+
+
+def decode_from(buf, offset: int = 0) -> Tuple[Any, int]:
+    """Decode one value starting at offset; returns (value, next offset)."""
+    return _dec(buf, offset)
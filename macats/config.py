@@ -19,6 +19,64 @@ class Settings(BaseModel):
     api_key: str = os.getenv("API_KEY", "")
     api_secret: str = os.getenv("API_SECRET", "")
     password: str = os.getenv("PASSWORD", "")
+    worker_agents: str = os.getenv("WORKER_AGENTS", "")   # e.g. "scanner,portfolio" -> own processes
+    intrabar_secs: float = float(os.getenv("INTRABAR_SECS", 15))       # price-only refresh of held symbols between bar closes (0: off)
+    bar_close_delay: float = float(os.getenv("BAR_CLOSE_DELAY", 2.0))  # secs after a close before fetching
+    market_feed: str = os.getenv("MARKET_FEED", "")   # ""|binance|ws:<url>|replay:<path>[@speed]
+    local_agents: str = os.getenv("LOCAL_AGENTS", "")      # agents run by this node (default: all)
+    bus_role: str = os.getenv("BUS_ROLE", "")               # ""|hub|node — multi-node TCP bus
+    bus_host: str = os.getenv("BUS_HOST", "127.0.0.1")
+    bus_port: int = int(os.getenv("BUS_PORT", 7411))
+    bus_node: str = os.getenv("BUS_NODE", "")
+    shard_index: int = int(os.getenv("SHARD_INDEX", 0))
+    shard_count: int = int(os.getenv("SHARD_COUNT", 1))
+    sent_batch_size: int = int(os.getenv("SENT_BATCH_SIZE", 32))
+    sent_batch_max_wait_ms: float = float(os.getenv("SENT_BATCH_MAX_WAIT_MS", 250))
+    shared_frames: bool = os.getenv("SHARED_FRAMES", "0") == "1"
+    shared_frames_keep: int = int(os.getenv("SHARED_FRAMES_KEEP", 16))   # frames TechAgent keeps mapped for late workers
+    # paper execution model (macats/paper_engine.py)
+    taker_fee_bps: float = float(os.getenv("TAKER_FEE_BPS", 10))
+    maker_fee_bps: float = float(os.getenv("MAKER_FEE_BPS", 2))
+    spread_bps: float = float(os.getenv("SPREAD_BPS", 2))
+    slip_atr_frac: float = float(os.getenv("SLIP_ATR_FRAC", 0.05))
+    impact_bps: float = float(os.getenv("IMPACT_BPS", 10))
+    max_participation: float = float(os.getenv("MAX_PARTICIPATION", 0))   # >0: partial fills vs bar volume
+    exec_latency_ms: float = float(os.getenv("EXEC_LATENCY_MS", 0))
+    # portfolio VaR gate (macats/risk_engine.py); 0 disables
+    var_limit_pct: float = float(os.getenv("VAR_LIMIT_PCT", 10))         # 1-day VaR cap, % of balance
+    var_confidence: float = float(os.getenv("VAR_CONFIDENCE", 0.99))
+    risk_sample_secs: float = float(os.getenv("RISK_SAMPLE_SECS", 60))
+    risk_batch: bool = os.getenv("RISK_BATCH", "1") == "1"   # allocate a scan cycle's signals as one basket
+    risk_batch_wait: float = float(os.getenv("RISK_BATCH_WAIT", 5))   # secs after a cycle's first marker to wait for other shards
+    # signal netting between scanner and risk (agents/signal_netting_agent.py)
+    signal_netting: bool = os.getenv("SIGNAL_NETTING", "1") == "1"
+    net_min_hold_secs: float = float(os.getenv("NET_MIN_HOLD_SECS", 3600))
+    net_band: float = float(os.getenv("NET_BAND", 0.15))
+    net_exit_after: int = int(os.getenv("NET_EXIT_AFTER", 2))
+    net_forward_flat: bool = os.getenv("NET_FORWARD_FLAT", "0") == "1"
+    # per-agent profiling (macats/profiling.py); dump with SIGUSR1 or every PROFILE_DUMP_SECS
+    profile: bool = os.getenv("PROFILE", "0") == "1"
+    profile_slow_ms: float = float(os.getenv("PROFILE_SLOW_MS", 50))
+    profile_dump_secs: float = float(os.getenv("PROFILE_DUMP_SECS", 0))
+    profile_path: str = os.getenv("PROFILE_PATH", "")   # JSON summary written on each dump
+    # scan -> fill tracing (macats/tracing.py); traces land in <log_dir>/traces.bin
+    trace: bool = os.getenv("TRACE", "1") == "1"
+    # restart recovery (macats/checkpoint.py): portfolio/stops/risk snapshots + WAL; "" disables
+    state_dir: str = os.getenv("STATE_DIR", "state")
+    checkpoint_secs: float = float(os.getenv("CHECKPOINT_SECS", 60))
+    checkpoint_fsync: bool = os.getenv("CHECKPOINT_FSYNC", "0") == "1"   # fsync every WAL record
+    # shared OHLCV rings (macats/data/bar_store.py): bars kept per symbol/timeframe
+    bar_capacity: int = int(os.getenv("BAR_CAPACITY", 1000))
+    scanner_htf: str = os.getenv("SCANNER_HTF", "")   # e.g. "4h": FSVZO confirmed by a resampled higher timeframe
+    # event journal (macats/journal.py): every bus event to <dir>/events-*.jnl; "" disables
+    journal_dir: str = os.getenv("JOURNAL_DIR", "")
+    journal_topics: str = os.getenv("JOURNAL_TOPICS", "")     # comma list; "" = all
+    journal_segment_mb: float = float(os.getenv("JOURNAL_SEGMENT_MB", 64))
+    # universe pre-filter (macats/data/universe.py): one bulk ticker snapshot; all 0 disables
+    universe_top_n: int = int(os.getenv("UNIVERSE_TOP_N", 0))                          # keep the top N by volume x range
+    universe_min_quote_vol: float = float(os.getenv("UNIVERSE_MIN_QUOTE_VOL", 0))      # 24h quote volume floor
+    universe_min_range_pct: float = float(os.getenv("UNIVERSE_MIN_RANGE_PCT", 0))      # 24h (high-low)/last floor
+    universe_refresh_secs: float = float(os.getenv("UNIVERSE_REFRESH_SECS", 900))
 
 FLAGS = Flags()
 SETTINGS = Settings()
\ No newline at end of file
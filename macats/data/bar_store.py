@@ -0,0 +1,327 @@
+# macats/data/bar_store.py
+"""
+Process-wide OHLCV store: one fixed-capacity ring per (symbol, timeframe), shared by every
+agent in the process, so each bar is downloaded once and memory per symbol is fixed.
+
+    df = STORE.frame("BTC/USDT", "1h", lookback="7d")     # closed bars, pandas (copy)
+    w  = STORE.window("BTC/USDT", "1h", 200)               # FeatureFrame of views (no copy)
+    STORE.on_bar(lambda sym, tf, ring: ...)                # new bar(s) appended
+
+Rings are mirrored double buffers: every row is written at i and i + capacity, so the last
+n rows are always one contiguous slice and window() never copies. A view stays valid until
+`capacity - n` more bars are appended (then the slots are reused); copy what you keep.
+
+frame()/window() only download when the ring does not already hold the last closed bar
+(or this lookback was never loaded), so TechAgent and the scanner asking for the same
+symbol in the same bar share one download. follow(bus) keeps rings current from market.bar
+(MARKET_FEED), in which case the bar-close downloads are skipped altogether.
+Symbols are keyed by their Yahoo form (BTC/USDT, BTCUSDT and BTC-USD share a ring), so
+Yahoo downloads, CCXT downloads and feed bars can land in one ring: "v" is always stored as
+quote (USD) volume. Yahoo reports that already; base-unit volume (CCXT frames tagged
+df.attrs["volume"] == "base", market.bar without "qv") is converted with v * close.
+derive("4h") serves a higher timeframe resampled from the base rings (data/resample.py).
+"""
+import time
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from macats.config import SETTINGS
+from macats.data.frames import FeatureFrame
+from macats.data.market import _normalize_to_yf, load_ohlcv
+from macats.scheduler import bar_open, closed_bars, timeframe_seconds
+
+if TYPE_CHECKING:
+    from macats.data.resample import Resampler   # resample imports BarRing from here
+
+COLS = ("o", "h", "l", "c", "v")
+_NS = 1_000_000_000
+_PERIOD_SECS = {"wk": 604800, "mo": 2592000, "y": 31536000, "d": 86400, "h": 3600, "m": 60}
+
+Key = Tuple[str, str]
+BarHook = Callable[[str, str, "BarRing"], None]
+
+
+class BarRing:
+    """ts (int64 ns, bar open) + o/h/l/c/v (float64) for the last `capacity` bars."""
+
+    __slots__ = ("capacity", "_ts", "_vals", "_pos", "_n")
+
+    def __init__(self, capacity: int):
+        self.capacity = int(capacity)
+        self._ts = np.zeros(2 * self.capacity, dtype=np.int64)
+        self._vals = np.zeros((len(COLS), 2 * self.capacity), dtype=np.float64)
+        self._pos = 0          # next write slot, in [0, capacity)
+        self._n = 0
+
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def last_ts(self) -> Optional[int]:
+        return int(self._ts[self._pos + self.capacity - 1]) if self._n else None
+
+    @property
+    def first_ts(self) -> Optional[int]:
+        return int(self._ts[self._pos + self.capacity - self._n]) if self._n else None
+
+    # --------------------------- writes ---------------------------
+
+    def append(self, ts: int, o: float, h: float, l: float, c: float, v: float) -> None:
+        i, j = self._pos, self._pos + self.capacity
+        self._ts[i] = self._ts[j] = ts
+        self._vals[:, i] = self._vals[:, j] = (o, h, l, c, v)
+        self._pos = (self._pos + 1) % self.capacity
+        self._n = min(self._n + 1, self.capacity)
+
+    def update_last(self, o: float, h: float, l: float, c: float, v: float) -> None:
+        """Overwrite the newest bar in place (the forming bar ticking)."""
+        i = (self._pos - 1) % self.capacity
+        self._vals[:, i] = self._vals[:, i + self.capacity] = (o, h, l, c, v)
+
+    def upsert(self, ts: int, o: float, h: float, l: float, c: float, v: float) -> bool:
+        """Append a newer bar or update the newest one; older bars are ignored. True if appended."""
+        last = self.last_ts
+        if last is None or ts > last:
+            self.append(ts, o, h, l, c, v)
+            return True
+        if ts == last:
+            self.update_last(o, h, l, c, v)
+        return False
+
+    def extend(self, ts: np.ndarray, vals: np.ndarray) -> None:
+        """Bulk append rows (ts ascending, newer than last_ts); vals is (5, k)."""
+        k = len(ts)
+        if k > self.capacity:
+            ts, vals, k = ts[-self.capacity:], vals[:, -self.capacity:], self.capacity
+        idx = (self._pos + np.arange(k)) % self.capacity
+        self._ts[idx] = self._ts[idx + self.capacity] = ts
+        self._vals[:, idx] = vals
+        self._vals[:, idx + self.capacity] = vals
+        self._pos = (self._pos + k) % self.capacity
+        self._n = min(self._n + k, self.capacity)
+
+    def reset(self) -> None:
+        self._pos = self._n = 0
+
+    # --------------------------- reads ---------------------------
+
+    def _span(self, n: Optional[int]) -> Tuple[int, int]:
+        n = self._n if n is None else max(0, min(int(n), self._n))
+        end = self._pos + self.capacity
+        return end - n, end
+
+    def arrays(self, n: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(ts, vals) views of the last n bars; vals rows are o/h/l/c/v."""
+        s, e = self._span(n)
+        return self._ts[s:e], self._vals[:, s:e]
+
+    def window(self, n: Optional[int] = None, closed_before: Optional[int] = None) -> FeatureFrame:
+        """
+        Last n bars as a read-only FeatureFrame of views. closed_before (ns) drops trailing
+        bars that open at or after it, i.e. the forming bar.
+        """
+        s, e = self._span(None)
+        if closed_before is not None:
+            e = s + int(np.searchsorted(self._ts[s:e], closed_before, side="left"))
+        if n is not None:
+            s = max(s, e - int(n))
+        return FeatureFrame(self._ts[s:e], {c: self._vals[i, s:e] for i, c in enumerate(COLS)})
+
+
+def lookback_bars(lookback: str, tf: str) -> Optional[int]:
+    """Bars in a yfinance-style period ("7d", "1mo", ...) at tf; None if unknown ("max")."""
+    for unit, secs in _PERIOD_SECS.items():
+        if lookback.endswith(unit) and lookback[:-len(unit)].isdigit():
+            return int(lookback[:-len(unit)]) * secs // timeframe_seconds(tf)
+    return None
+
+
+def _as_rows(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    idx = df.index
+    if hasattr(idx, "as_unit"):
+        idx = idx.as_unit("ns")
+    n = len(df)
+    # yfinance may hand back (n, 1) columns; take the first
+    vals = np.vstack([np.asarray(df[c], dtype=np.float64).reshape(n, -1)[:, 0] for c in COLS]) if n else np.zeros((len(COLS), 0))
+    return np.asarray(idx.asi8, dtype=np.int64), vals
+
+
+class BarStore:
+    def __init__(self, capacity: int = 1000, loader: Callable[..., pd.DataFrame] = load_ohlcv,
+                 clock: Callable[[], float] = time.time):
+        self.capacity = capacity
+        self.loader = loader
+        self.clock = clock
+        self.rings: Dict[Key, BarRing] = {}
+        self.downloads = 0
+        self._served: Dict[Key, Set[str]] = {}
+        self._final: Dict[Key, int] = {}      # open ts of the newest bar known to be closed
+        self._hooks: List[BarHook] = []
+        self.derived: Dict[str, str] = {}      # tf -> base tf it is resampled from
+        self._resamplers: Dict[Key, "Resampler"] = {}
+
+    @staticmethod
+    def key(symbol: str, tf: str) -> Key:
+        return (_normalize_to_yf(symbol) or symbol, tf)
+
+    def ring(self, symbol: str, tf: str) -> BarRing:
+        k = self.key(symbol, tf)
+        r = self.rings.get(k)
+        if r is None:
+            r = self.rings[k] = BarRing(self.capacity)
+        return r
+
+    # --------------------------- subscriptions ---------------------------
+
+    def on_bar(self, hook: BarHook) -> Callable[[], None]:
+        """
+        hook(symbol, tf, ring) after new bars land or a feed bar closes (not for the initial
+        history); for derived timeframes, when a bar completes. Returns an unsubscribe.
+        """
+        self._hooks.append(hook)
+        return lambda: self._hooks.remove(hook) if hook in self._hooks else None
+
+    def _fire(self, k: Key) -> None:
+        for hook in list(self._hooks):
+            hook(k[0], k[1], self.rings[k])
+
+    # --------------------------- writes ---------------------------
+
+    def ingest(self, symbol: str, tf: str, df: pd.DataFrame, volume: Optional[str] = None) -> int:
+        """
+        Merge a downloaded frame of closed bars (bar-open index); returns how many bars were new.
+        volume: unit of df["v"], "quote" or "base" (default df.attrs["volume"], else "quote").
+        """
+        k = self.key(symbol, tf)
+        r = self.ring(symbol, tf)
+        ts, vals = _as_rows(df)
+        if not len(ts):
+            return 0
+        if (volume or df.attrs.get("volume", "quote")) == "base":
+            vals[4] *= vals[3]
+        self._final[k] = max(self._final.get(k, ts[-1]), int(ts[-1]))
+        last = r.last_ts
+        if last is None or (ts[0] < r.first_ts and len(r) < r.capacity):
+            # first load, or a longer lookback: rebuild, keeping anything newer (e.g. from the feed)
+            keep_ts, keep_vals = r.arrays()
+            m = keep_ts > ts[-1]
+            ts, vals = np.concatenate([ts, keep_ts[m]]), np.concatenate([vals, keep_vals[:, m]], axis=1)
+            r.reset()
+            r.extend(ts, vals)
+            added = 0 if last is None else int(np.count_nonzero(ts > last))
+        else:
+            i = int(np.searchsorted(ts, last, side="left"))
+            if i < len(ts) and ts[i] == last:
+                r.update_last(*vals[:, i])
+                i += 1
+            r.extend(ts[i:], vals[:, i:])
+            added = len(ts) - i
+        if added:
+            self._fire(k)
+        return added
+
+    def upsert(self, symbol: str, tf: str, ts: float, o: float, h: float, l: float, c: float, v: float,
+               closed: bool = True) -> bool:
+        """One bar from a feed (ts in seconds, bar open; closed=False while forming); True if it started a new bar."""
+        k = self.key(symbol, tf)
+        t = int(round(ts * _NS))
+        new = self.ring(symbol, tf).upsert(t, o, h, l, c, v)
+        final = closed and t > self._final.get(k, -1)
+        if final:
+            self._final[k] = t
+        if new or final:
+            self._fire(k)
+        return new
+
+    async def follow(self, bus, tf: Optional[str] = None) -> None:
+        """Keep rings current from market.bar (bars without a tf are taken as `tf`)."""
+        tf = tf or SETTINGS.timeframe
+        async for e in bus.subscribe("market.bar"):
+            p = e.payload
+            try:
+                o, h, l, c, v = (float(p[x]) for x in COLS)
+                qv = float(p["qv"]) if p.get("qv") is not None else v * c     # feed v is base units
+                self.upsert(p["symbol"], p.get("tf") or tf, float(p["ts"]), o, h, l, c, qv,
+                            closed=p.get("closed", True) is not False)
+            except (KeyError, TypeError, ValueError):
+                continue
+
+    # --------------------------- derived timeframes ---------------------------
+
+    def derive(self, tf: str, base_tf: Optional[str] = None) -> None:
+        """Serve `tf` by resampling `base_tf` bars (default SETTINGS.timeframe) instead of downloading it."""
+        base_tf = base_tf or SETTINGS.timeframe
+        if self.derived.get(tf) == base_tf:
+            return
+        if tf in self.derived:
+            raise ValueError(f"{tf} already derived from {self.derived[tf]}")
+        timeframe_seconds(tf)                       # reject bad timeframes up front
+        if not self.derived:
+            self.on_bar(self._on_base)
+        self.derived[tf] = base_tf
+
+    def _resample(self, sym: str, tf: str) -> None:
+        from macats.data.resample import Resampler
+        base_tf = self.derived[tf]
+        base = self.rings.get((sym, base_tf))
+        final = self._final.get((sym, base_tf))
+        if base is None or final is None:
+            return
+        k = (sym, tf)
+        rs = self._resamplers.get(k)
+        if rs is None:
+            rs = self._resamplers[k] = Resampler(tf, base_tf, self.ring(sym, tf))
+        backfill = rs.seen is None
+        if rs.catch_up(base, final) and not backfill:
+            self._fire(k)
+
+    def _on_base(self, sym: str, tf: str, ring: BarRing) -> None:
+        for dtf, base_tf in self.derived.items():
+            if base_tf == tf:
+                self._resample(sym, dtf)
+
+    # --------------------------- reads ---------------------------
+
+    def _last_closed_open(self, tf: str) -> int:
+        sec = timeframe_seconds(tf)
+        return int((bar_open(self.clock(), tf) - sec) * _NS)
+
+    def ensure(self, symbol: str, tf: str, lookback: str = "7d", exchange_id: Optional[str] = None,
+               loader: Optional[Callable[..., pd.DataFrame]] = None) -> BarRing:
+        """Download only if the last closed bar is missing (or not final) or this lookback was never loaded."""
+        k = self.key(symbol, tf)
+        r = self.ring(symbol, tf)
+        if tf in self.derived:
+            self.ensure(symbol, self.derived[tf], lookback, exchange_id, loader)
+            self._resample(k[0], tf)
+            return r
+        served = self._served.setdefault(k, set())
+        if lookback in served and self._final.get(k, -1) >= self._last_closed_open(tf):
+            return r
+        df = (loader or self.loader)(symbol=symbol, interval=tf, lookback=lookback,
+                                     exchange_id=exchange_id or SETTINGS.exchange_id)
+        self.downloads += 1
+        self.ingest(symbol, tf, closed_bars(df, tf, self.clock()), volume=df.attrs.get("volume"))
+        served.add(lookback)
+        return r
+
+    def window(self, symbol: str, tf: str, n: Optional[int] = None, lookback: str = "7d",
+               exchange_id: Optional[str] = None, partial: bool = False) -> FeatureFrame:
+        """
+        Closed bars as views (see BarRing.window); n defaults to the bars in `lookback`.
+        partial=True keeps the forming bar as the last row (feed bars, derived timeframes).
+        """
+        r = self.ensure(symbol, tf, lookback, exchange_id)
+        n = lookback_bars(lookback, tf) if n is None else n
+        return r.window(n, closed_before=None if partial else self._last_closed_open(tf) + 1)
+
+    def frame(self, symbol: str, tf: str, lookback: str = "7d", exchange_id: Optional[str] = None,
+              n: Optional[int] = None, partial: bool = False) -> pd.DataFrame:
+        """Closed bars as a pandas OHLCV frame indexed by bar open (a copy; drop-in for load_ohlcv + closed_bars)."""
+        w = self.window(symbol, tf, n, lookback, exchange_id, partial)
+        return pd.DataFrame({c: w[c] for c in COLS}, index=pd.to_datetime(w.ts, unit="ns"))
+
+
+STORE = BarStore(capacity=SETTINGS.bar_capacity)
@@ -0,0 +1,203 @@
+import abc
+import asyncio
+import csv
+import json
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+
+from macats.event_bus import Event, EventBus
+
+# parse() output: ("last", symbol, {"price", "ts"}) or ("bar", symbol, {"tf","ts","o","h","l","c","v","closed"})
+FeedMsg = Tuple[str, str, Dict[str, Any]]
+
+
+class MarketFeed(abc.ABC):
+    """
+    Push-based market data source.
+    Emits:
+      - market.last {"symbol","price","ts"}
+      - market.bar  {"symbol","tf","ts","o","h","l","c","v","qv"?,"closed"}   (publish_bars=True;
+                    v in base units, qv quote volume when the exchange reports it)
+    min_interval throttles market.last per symbol (secs; 0 = every update).
+    """
+
+    def __init__(self, bus: EventBus, publish_bars: bool = False, min_interval: float = 0.0):
+        self.bus = bus
+        self.publish_bars = publish_bars
+        self.min_interval = min_interval
+        self._last_emit: Dict[str, float] = {}
+
+    async def emit(self, kind: str, symbol: str, data: Dict[str, Any]) -> None:
+        if kind == "last":
+            if self.min_interval > 0:
+                now = time.monotonic()
+                if now - self._last_emit.get(symbol, -1e18) < self.min_interval:
+                    return
+                self._last_emit[symbol] = now
+            await self.bus.publish(Event(topic="market.last", payload={"symbol": symbol, "price": float(data["price"]), "ts": data.get("ts", time.time())}))
+        elif kind == "bar" and self.publish_bars:
+            await self.bus.publish(Event(topic="market.bar", payload={"symbol": symbol, **data}))
+
+    @abc.abstractmethod
+    async def run(self) -> None:
+        """Connect and emit until cancelled."""
+
+
+class ManualFeed(MarketFeed):
+    """Driven by the caller through emit() (backtests, load tests); run() just idles."""
+
+    async def run(self) -> None:
+        await asyncio.Event().wait()
+
+
+# --------------------------- WebSocket ---------------------------
+
+def _generic_subscribe(symbols: List[str]) -> Dict[str, Any]:
+    return {"op": "subscribe", "symbols": symbols}
+
+
+def _generic_parse(msg: Dict[str, Any]) -> Iterable[FeedMsg]:
+    """{"type":"ticker","symbol","price","ts"?} / {"type":"bar","symbol","tf","ts","o","h","l","c","v","closed"?}"""
+    t = msg.get("type")
+    if t == "ticker":
+        yield "last", msg["symbol"], {"price": msg["price"], "ts": msg.get("ts", time.time())}
+    elif t == "bar":
+        yield "bar", msg["symbol"], {k: msg.get(k) for k in ("tf", "ts", "o", "h", "l", "c", "v", "closed")}
+
+
+class WebSocketTickerFeed(MarketFeed):
+    """
+    Generic WebSocket ticker client: connects, sends subscribe_msg(symbols), feeds every
+    JSON message through parse() and publishes the results. On disconnect or silence
+    longer than `stale_secs` it reconnects with backoff and resubscribes.
+    """
+
+    def __init__(self, bus: EventBus, url: str, symbols: List[str],
+                 subscribe_msg: Callable[[List[str]], Any] = _generic_subscribe,
+                 parse: Callable[[Dict[str, Any]], Iterable[FeedMsg]] = _generic_parse,
+                 stale_secs: float = 30.0, **kw):
+        super().__init__(bus, **kw)
+        self.url = url
+        self.symbols = list(symbols)
+        self.subscribe_msg = subscribe_msg
+        self.parse = parse
+        self.stale_secs = stale_secs
+        self.connects = 0
+
+    async def _session(self, session: aiohttp.ClientSession) -> None:
+        async with session.ws_connect(self.url, heartbeat=self.stale_secs / 2) as ws:
+            self.connects += 1
+            sub = self.subscribe_msg(self.symbols)
+            for m in (sub if isinstance(sub, list) else [sub]):
+                await ws.send_json(m)
+            while True:
+                msg = await ws.receive(timeout=self.stale_secs)
+                if msg.type == aiohttp.WSMsgType.TEXT:
+                    try:
+                        data = json.loads(msg.data)
+                    except ValueError:
+                        continue
+                    for kind, sym, d in self.parse(data):
+                        await self.emit(kind, sym, d)
+                elif msg.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                    return
+
+    async def run(self) -> None:
+        backoff = 0.5
+        async with aiohttp.ClientSession() as session:
+            while True:
+                started = time.monotonic()
+                try:
+                    await self._session(session)
+                except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                    await self.bus.publish(Event(topic="strategy.log", payload={"note": f"feed {self.url}: {e!r}, reconnecting"}))
+                if time.monotonic() - started > 60:
+                    backoff = 0.5           # it was a healthy session; start over
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+
+def binance_feed(bus: EventBus, symbols: List[str], tf: Optional[str] = None, **kw) -> WebSocketTickerFeed:
+    """Binance spot miniTicker (+ kline_<tf> when tf is given) streams."""
+    by_id = {s.replace("/", "").upper(): s for s in symbols}
+
+    def subscribe(syms: List[str]) -> Dict[str, Any]:
+        params = [f"{s.replace('/', '').lower()}@miniTicker" for s in syms]
+        if tf:
+            params += [f"{s.replace('/', '').lower()}@kline_{tf}" for s in syms]
+        return {"method": "SUBSCRIBE", "params": params, "id": 1}
+
+    def parse(m: Dict[str, Any]) -> Iterable[FeedMsg]:
+        sym = by_id.get(str(m.get("s", "")))
+        if sym is None:
+            return
+        if m.get("e") == "24hrMiniTicker":
+            yield "last", sym, {"price": float(m["c"]), "ts": m.get("E", 0) / 1000.0}
+        elif m.get("e") == "kline":
+            k = m["k"]
+            yield "last", sym, {"price": float(k["c"]), "ts": m.get("E", 0) / 1000.0}
+            yield "bar", sym, {"tf": k["i"], "ts": k["t"] / 1000.0, "o": float(k["o"]), "h": float(k["h"]),
+                               "l": float(k["l"]), "c": float(k["c"]), "v": float(k["v"]), "qv": float(k["q"]),
+                               "closed": bool(k["x"])}
+
+    return WebSocketTickerFeed(bus, "wss://stream.binance.com:9443/ws", symbols, subscribe, parse, **kw)
+
+
+# --------------------------- replay ---------------------------
+
+class ReplayFeed(MarketFeed):
+    """
+    Replays prices or bars from a local file (CSV with a header, or JSON lines).
+      ticks: ts,symbol,price
+      bars : ts,symbol,o,h,l,c,v[,tf]   -> market.bar + market.last at the close
+    speed=0 replays as fast as possible, 1.0 follows recorded ts gaps, 10.0 is 10x.
+    """
+
+    def __init__(self, bus: EventBus, path: str, speed: float = 0.0, yield_every: int = 256, **kw):
+        super().__init__(bus, **kw)
+        self.path = path
+        self.speed = speed
+        self.yield_every = yield_every
+
+    def _rows(self) -> Iterable[Dict[str, Any]]:
+        with open(self.path, newline="", encoding="utf-8") as f:
+            if self.path.endswith((".jsonl", ".json")):
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+            else:
+                yield from csv.DictReader(f)
+
+    async def run(self) -> None:
+        prev = None
+        for i, r in enumerate(self._rows()):
+            ts = float(r["ts"])
+            if self.speed > 0 and prev is not None and ts > prev:
+                await asyncio.sleep((ts - prev) / self.speed)
+            elif i % self.yield_every == 0:
+                await asyncio.sleep(0)
+            prev = ts
+            sym = str(r["symbol"])
+            if r.get("c") not in (None, ""):
+                bar = {"tf": r.get("tf"), "ts": ts, "closed": True,
+                       **{k: float(r[k]) for k in ("o", "h", "l", "c", "v") if r.get(k) not in (None, "")}}
+                await self.emit("bar", sym, bar)
+                await self.emit("last", sym, {"price": bar["c"], "ts": ts})
+            else:
+                await self.emit("last", sym, {"price": float(r["price"]), "ts": ts})
+
+
+def make_feed(bus: EventBus, spec: str, symbols: List[str], tf: Optional[str] = None) -> Optional[MarketFeed]:
+    """MARKET_FEED setting: '' (none) | 'binance' | 'ws:<url>' | 'replay:<path>[@speed]'."""
+    if not spec:
+        return None
+    if spec == "binance":
+        return binance_feed(bus, symbols, tf=tf, publish_bars=bool(tf))
+    if spec.startswith("ws:"):
+        return WebSocketTickerFeed(bus, spec[3:], symbols)
+    if spec.startswith("replay:"):
+        path, _, speed = spec[7:].partition("@")
+        return ReplayFeed(bus, path, speed=float(speed or 0), publish_bars=True)
+    raise ValueError(f"Unknown MARKET_FEED: {spec}")
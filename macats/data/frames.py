@@ -0,0 +1,140 @@
+import weakref
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# (shm name, rows, column names) — enough for another process to map the same block
+FrameHandle = Tuple[str, int, Tuple[str, ...]]
+
+
+def _attach_shm(name: str) -> shared_memory.SharedMemory:
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # py3.13+: don't let the tracker unlink it
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+class FeatureFrame:
+    """
+    Read-only feature table: int64 ns timestamps + float64 columns, each column contiguous.
+
+    Built once by the producer (TechAgent) and passed by reference in event payloads;
+    consumers read scalars with latest()/latest_row() and windows with tail(), all views.
+    With shared=True the data lives in one SharedMemory block and pickling the frame
+    sends only its FrameHandle, so worker processes map the same memory instead of
+    receiving a copy. The producing process owns (and unlinks) the block, so it must
+    keep a frame alive until consumers have attached.
+    """
+
+    __slots__ = ("ts", "_cols", "_shm", "_base", "__weakref__")
+
+    def __init__(self, ts: np.ndarray, cols: Dict[str, np.ndarray],
+                 shm: Optional[shared_memory.SharedMemory] = None, owner: bool = False,
+                 base: Optional["FeatureFrame"] = None):
+        self.ts = ts
+        self._cols = cols
+        self._shm = shm
+        self._base = base   # views keep the frame that owns their memory alive
+        for a in (ts, *cols.values()):
+            a.flags.writeable = False
+        if shm is not None:
+            weakref.finalize(self, FeatureFrame._release, shm, owner)
+
+    @staticmethod
+    def _release(shm: shared_memory.SharedMemory, owner: bool) -> None:
+        if owner:
+            try:
+                shm.unlink()   # existing mappings stay valid; only the name goes
+            except FileNotFoundError:
+                pass
+        try:
+            shm.close()
+        except BufferError:
+            pass               # arrays still exported; the mapping goes with them
+
+    # --------------------------- construction ---------------------------
+
+    @staticmethod
+    def _layout(buf, n: int, names: Sequence[str]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        ts = np.ndarray((n,), dtype=np.int64, buffer=buf)
+        block = np.ndarray((len(names), n), dtype=np.float64, buffer=buf, offset=8 * n)
+        return ts, {c: block[i] for i, c in enumerate(names)}
+
+    @classmethod
+    def from_pandas(cls, df, cols: Optional[Iterable[str]] = None, shared: bool = False) -> "FeatureFrame":
+        names = tuple(str(c) for c in (cols if cols is not None else df.columns))
+        n = len(df)
+        nbytes = max(8, 8 * n * (1 + len(names)))
+        shm = shared_memory.SharedMemory(create=True, size=nbytes) if shared else None
+        ts, out = cls._layout(shm.buf if shm else bytearray(nbytes), n, names)
+        idx = df.index
+        if hasattr(idx, "as_unit"):          # DatetimeIndex may not be ns-based (pandas 2+)
+            idx = idx.as_unit("ns")
+        ts[:] = idx.asi8 if hasattr(idx, "asi8") else np.arange(n)
+        for c in names:
+            # yfinance may hand back (n, 1) columns; take the first
+            out[c][:] = np.asarray(df[c], dtype=np.float64).reshape(n, -1)[:, 0]
+        return cls(ts, out, shm=shm, owner=shared)
+
+    @classmethod
+    def attach(cls, handle: FrameHandle) -> "FeatureFrame":
+        name, n, names = handle
+        shm = _attach_shm(name)
+        ts, cols = cls._layout(shm.buf, n, names)
+        return cls(ts, cols, shm=shm, owner=False)
+
+    @property
+    def handle(self) -> Optional[FrameHandle]:
+        if self._shm is None:
+            return None
+        return (self._shm.name, len(self.ts), self.columns)
+
+    def __reduce__(self):
+        if self._shm is not None:
+            return (FeatureFrame.attach, (self.handle,))
+        return (FeatureFrame, (np.array(self.ts), {c: np.array(a) for c, a in self._cols.items()}))
+
+    # --------------------------- access ---------------------------
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        return tuple(self._cols)
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def __contains__(self, col: str) -> bool:
+        return col in self._cols
+
+    def __getitem__(self, col: str) -> np.ndarray:
+        return self._cols[col]
+
+    def latest(self, col: str) -> float:
+        return float(self._cols[col][-1])
+
+    def latest_row(self, cols: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        return {c: float(self._cols[c][-1]) for c in (cols if cols is not None else self._cols)}
+
+    def tail(self, n: int) -> "FeatureFrame":
+        """Last n rows as views (no copy)."""
+        n = min(int(n), len(self.ts))
+        k = len(self.ts) - n
+        return FeatureFrame(self.ts[k:], {c: a[k:] for c, a in self._cols.items()}, base=self)
+
+    def to_pandas(self, cols: Optional[Iterable[str]] = None):
+        import pandas as pd
+        names: List[str] = list(cols) if cols is not None else list(self._cols)
+        idx = pd.to_datetime(self.ts, unit="ns")
+        return pd.DataFrame({c: self._cols[c] for c in names}, index=idx.rename("ts"))
+
+    def to_csv(self, cols: Sequence[str], limit: int = 60) -> str:
+        """Compact CSV for LLM prompts: 'ts,<cols>' header, last `limit` rows."""
+        t = self.tail(limit)
+        stamps = np.datetime_as_string(t.ts.astype("datetime64[ns]"), unit="s")
+        lines = ["ts," + ",".join(cols)]
+        data = [t[c] for c in cols]
+        for i, s in enumerate(stamps):
+            lines.append(s + "," + ",".join(repr(float(d[i])) for d in data))
+        return "\n".join(lines) + "\n"
+
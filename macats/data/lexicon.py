@@ -0,0 +1,164 @@
+import csv
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+_TOKEN = re.compile(r"\$?[a-z0-9]+")
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens; a leading '$' is kept so cashtags stay distinct."""
+    return _TOKEN.findall(text.lower())
+
+
+class PhraseMatcher:
+    """
+    Aho-Corasick automaton over word tokens.
+    Patterns are phrases of one or more words mapped to an arbitrary value.
+    find() returns leftmost-longest, non-overlapping matches as (start, n_tokens, value),
+    so "short squeeze" wins over "short" when both are patterns.
+    Matching is one pass over the tokens regardless of the number of patterns.
+    """
+
+    def __init__(self, patterns: Dict[str, Any]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, Any]]] = [[]]
+        for phrase, value in patterns.items():
+            toks = tokenize(phrase)
+            if toks:
+                self._add(toks, value)
+        self._build()
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+    def _add(self, toks: List[str], value: Any) -> None:
+        node = 0
+        for t in toks:
+            nxt = self._goto[node].get(t)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][t] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node] = [(len(toks), value)]
+
+    def _build(self) -> None:
+        # BFS to fill failure links and merge suffix outputs (longest first)
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for tok, child in self._goto[node].items():
+                queue.append(child)
+                f = self._fail[node]
+                while f and tok not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[child] = self._goto[f].get(tok, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find_tokens(self, toks: List[str]) -> List[Tuple[int, int, Any]]:
+        goto, fail, out = self._goto, self._fail, self._out
+        root = goto[0]
+        hits: List[Tuple[int, int, Any]] = []
+        state = 0
+        for i, tok in enumerate(toks):
+            if state == 0:
+                state = root.get(tok, 0)
+            else:
+                while state and tok not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(tok, 0)
+            if state and out[state]:
+                for n, value in out[state]:
+                    hits.append((i - n + 1, n, value))
+        if len(hits) < 2:
+            return hits
+        # leftmost-longest, non-overlapping
+        hits.sort(key=lambda h: (h[0], -h[1]))
+        picked: List[Tuple[int, int, Any]] = []
+        end = -1
+        for h in hits:
+            if h[0] > end:
+                picked.append(h)
+                end = h[0] + h[1] - 1
+        return picked
+
+    def find(self, text: str) -> List[Tuple[int, int, Any]]:
+        return self.find_tokens(tokenize(text))
+
+
+# --------------------------- lexicon ---------------------------
+
+DEFAULT_PHRASES: Dict[str, float] = {
+    "all time high": 1.5, "new ath": 1.5, "short squeeze": 1.5, "risk on": 1.0,
+    "etf approval": 1.5, "golden cross": 1.0, "higher low": 0.5,
+    "rug pull": -2.0, "death cross": -1.0, "risk off": -1.0, "lower high": -0.5,
+    "long squeeze": -1.5, "sell off": -1.0, "exchange hack": -2.0, "etf rejected": -1.5,
+}
+
+# base -> aliases; "$" + base (cashtag) is always added. Tickers and project names that are
+# plain English words (link, dot, near, ether, algo, theta, curve, maker, ...) are not bare
+# aliases: those coins only match as cashtags or by an unambiguous name.
+COIN_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "BTC": ("btc", "bitcoin", "xbt"), "ETH": ("eth", "ethereum"), "SOL": ("sol", "solana"),
+    "BNB": ("bnb",), "XRP": ("xrp",), "ADA": ("ada", "cardano"), "DOGE": ("doge", "dogecoin"),
+    "AVAX": ("avax",), "DOT": ("polkadot",), "MATIC": ("matic",), "TRX": ("trx", "tron"),
+    "LINK": ("chainlink",), "ATOM": (), "LTC": ("ltc", "litecoin"), "UNI": ("uniswap",),
+    "ETC": ("ethereum classic",), "XMR": ("xmr", "monero"), "APT": ("aptos",), "ARB": ("arbitrum",),
+    "NEAR": ("near protocol",), "OP": (), "HBAR": ("hbar", "hedera"), "ICP": ("icp",),
+    "FIL": ("filecoin",), "STX": ("stx",), "SUI": ("sui",), "ALGO": ("algorand",),
+    "VET": ("vechain",), "MKR": ("mkr",), "GRT": ("grt",), "SAND": (),
+    "AXS": ("axs", "axie"), "AAVE": ("aave",), "RUNE": ("thorchain",), "THETA": (),
+    "EGLD": ("egld", "multiversx"), "KAVA": ("kava",), "INJ": ("injective",), "CRV": ("crv",),
+    "FTM": ("ftm", "fantom"), "DYDX": ("dydx",), "LDO": ("ldo", "lido"), "GMX": ("gmx",),
+    "ENS": ("ens",), "CHZ": ("chz", "chiliz"), "COMP": (), "1INCH": ("1inch",),
+    "BAL": (), "ZIL": ("zil", "zilliqa"), "FLR": ("flr",),
+}
+
+
+def load_lexicon(path: str) -> Dict[str, float]:
+    """Read a weighted lexicon from JSON ({"term": weight}) or CSV (term,weight rows)."""
+    if path.endswith(".json"):
+        with open(path) as f:
+            return {str(k): float(v) for k, v in json.load(f).items()}
+    out: Dict[str, float] = {}
+    with open(path, newline="") as f:
+        for row in csv.reader(f):
+            if len(row) >= 2 and not row[0].startswith("#"):
+                try:
+                    out[row[0]] = float(row[1])
+                except ValueError:
+                    continue  # header
+    return out
+
+
+class Lexicon:
+    """
+    Weighted sentiment terms/phrases plus coin tags, compiled into one PhraseMatcher.
+    score_tags(text) -> (score, [bases mentioned]).
+    """
+
+    def __init__(self, weights: Dict[str, float],
+                 coins: Optional[Dict[str, Iterable[str]]] = None):
+        coins = COIN_ALIASES if coins is None else coins
+        patterns: Dict[str, Tuple[float, Optional[str]]] = {}
+        for base, aliases in coins.items():
+            for a in (*aliases, "$" + base.lower()):
+                patterns[a] = (0.0, base)
+        for term, w in weights.items():
+            _, base = patterns.get(term, (0.0, None))
+            patterns[term] = (float(w), base)
+        self.matcher = PhraseMatcher(patterns)
+
+    def score_tags(self, text: str) -> Tuple[float, List[str]]:
+        score = 0.0
+        coins: List[str] = []
+        for _, _, (w, base) in self.matcher.find_tokens(tokenize(text)):
+            score += w
+            if base is not None and base not in coins:
+                coins.append(base)
+        return score, coins
+
+    def score(self, text: str) -> float:
+        return self.score_tags(text)[0]
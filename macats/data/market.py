@@ -1,6 +1,7 @@
+from functools import lru_cache
 import pandas as pd
-import yfinance as yf
-import ccxt
+# yfinance / ccxt are imported inside the download helpers: they cost seconds at import
+# and most processes (reports, workers, risk/execution nodes) never call them
 
 COMMON_QUOTES = ["USDT", "USDC", "BUSD", "USD"]
 
@@ -36,6 +37,7 @@ def _normalize_to_yf(symbol: str) -> str | None:
     return None
 
 def _yf_download(yf_symbol: str, interval: str, lookback: str) -> pd.DataFrame:
+    import yfinance as yf
     df = yf.download(
         tickers=yf_symbol,
         interval=interval,
@@ -47,12 +49,15 @@ def _yf_download(yf_symbol: str, interval: str, lookback: str) -> pd.DataFrame:
         raise ValueError(f"No data returned from yfinance for {yf_symbol}")
     df = df.rename(columns=str.lower)
     df = df.rename(columns={"open":"o","high":"h","low":"l","close":"c","volume":"v"})
-    return df.dropna()
+    df = df.dropna()
+    df.attrs["volume"] = "quote"     # Yahoo crypto volume is in USD
+    return df
 
 def _ccxt_download(exchange_id: str, symbol: str, timeframe: str, limit: int = 500) -> pd.DataFrame:
     """
     Fetch OHLCV via CCXT (public). symbol must be exchange-style, e.g. 'BTC/USDT'.
     """
+    import ccxt
     if not hasattr(ccxt, exchange_id):
         raise ValueError(f"Unknown exchange_id: {exchange_id}")
     ex = getattr(ccxt, exchange_id)()
@@ -77,7 +82,30 @@ def _ccxt_download(exchange_id: str, symbol: str, timeframe: str, limit: int = 5
     df = pd.DataFrame(ohlcv, columns=["ts","o","h","l","c","v"])
     df["ts"] = pd.to_datetime(df["ts"], unit="ms")
     df = df.set_index("ts").sort_index()
-    return df.dropna()
+    df = df.dropna()
+    df.attrs["volume"] = "base"      # exchange OHLCV volume is in base units
+    return df
+
+@lru_cache(maxsize=None)
+def _exchange(exchange_id: str):
+    """One public ccxt client per exchange, markets loaded once."""
+    import ccxt
+    if not hasattr(ccxt, exchange_id):
+        raise ValueError(f"Unknown exchange_id: {exchange_id}")
+    ex = getattr(ccxt, exchange_id)()
+    ex.load_markets()
+    return ex
+
+def fetch_last_price(symbol: str, exchange_id: str = "binance") -> float:
+    """
+    Cheap price-only refresh (one ticker call, no bars) for intrabar stop checks.
+    symbol is exchange-style (BTC/USDT).
+    """
+    t = _exchange(exchange_id).fetch_ticker(symbol)
+    px = t.get("last") or t.get("close")
+    if px is None:
+        raise ValueError(f"No last price from {exchange_id} for {symbol}")
+    return float(px)
 
 def load_ohlcv(symbol: str = "BTC-USD",
                interval: str = "1h",
@@ -86,6 +114,7 @@ def load_ohlcv(symbol: str = "BTC-USD",
     """
     Try Yahoo Finance first (after normalizing symbol), then fall back to CCXT.
     For CCXT we use `exchange_id` and assume `symbol` is exchange-style (BTC/USDT or BTCUSDT).
+    df.attrs["volume"] says which unit "v" is in: "quote" (Yahoo, USD) or "base" (CCXT).
     """
     # 1) Try Yahoo Finance
     yf_sym = _normalize_to_yf(symbol) or (symbol if "-" in symbol else None)
@@ -109,19 +138,11 @@ def load_ohlcv(symbol: str = "BTC-USD",
 def indicators(df: pd.DataFrame) -> pd.DataFrame:
     """
     Compute basic TA features used by downstream agents.
-    Adds: sma_fast, sma_slow, rsi, atr
+    Adds: sma_fast, sma_slow, rsi, atr  (definitions live in macats/features.py)
     """
+    from macats.features import INDICATORS, FeatureContext
+    ctx = FeatureContext.from_pandas(df)
     d = df.copy()
-    d["sma_fast"] = d["c"].rolling(20).mean()
-    d["sma_slow"] = d["c"].rolling(50).mean()
-
-    r = d["c"].pct_change().fillna(0.0)
-    up = r.clip(lower=0).rolling(14).mean()
-    down = (-r.clip(upper=0)).rolling(14).mean().replace(0, 1e-9)
-    rs = up / down
-    d["rsi"] = 100 - (100 / (1 + rs))
-
-    # simple ATR proxy
-    d["atr"] = (d["h"] - d["l"]).rolling(14).mean()
-
+    for name in INDICATORS:
+        d[name] = ctx[name]
     return d.dropna()
\ No newline at end of file
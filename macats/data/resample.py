@@ -0,0 +1,74 @@
+# macats/data/resample.py
+"""
+Higher timeframes derived locally from base bars already in the bar store, so 4h / 1d
+context next to SETTINGS.timeframe costs no extra downloads.
+
+    STORE.derive("4h")                                  # from SETTINGS.timeframe bars
+    df = STORE.frame("BTC/USDT", "4h", lookback="30d")  # closed 4h bars
+    w  = STORE.window("BTC/USDT", "4h", partial=True)   # + the forming 4h bar so far
+
+Each closed base bar is folded into the higher-timeframe ring in O(1): it opens a new bar
+(o/h/l/c/v from the base bar) or extends the forming one (h = max, l = min, c = last,
+v = sum). A higher bar is complete once the base bar that ends at its close has been
+folded; store hooks fire then. Only closed base bars are folded, so the forming higher bar
+never carries a half-built base bar. On the first fold for a symbol the history already in
+the base ring is backfilled, starting at the first aligned bucket (a bucket whose opening
+base bars fell out of the ring would be wrong, so it is skipped). Depth is therefore bounded
+by the base ring: 1000 1h bars give ~250 4h bars, ~41 daily ones, and more accrue live.
+"""
+from typing import Optional
+
+import numpy as np
+
+from macats.data.bar_store import BarRing
+from macats.scheduler import bar_open, timeframe_seconds
+
+_NS = 1_000_000_000
+
+
+class Resampler:
+    """Folds closed `base_tf` bars into one `tf` ring (one symbol)."""
+
+    def __init__(self, tf: str, base_tf: str, ring: BarRing):
+        self.tf, self.base_tf = tf, base_tf
+        self.sec, self.base_sec = timeframe_seconds(tf), timeframe_seconds(base_tf)
+        if self.sec <= self.base_sec or self.sec % self.base_sec:
+            raise ValueError(f"{tf} is not a multiple of {base_tf}")
+        self.ring = ring
+        self.seen: Optional[int] = None      # open ts (ns) of the last base bar folded
+
+    def _open(self, ts: int) -> int:
+        return int(bar_open(ts / _NS, self.tf)) * _NS
+
+    def fold(self, ts: int, o: float, h: float, l: float, c: float, v: float) -> bool:
+        """One closed base bar (open ts in ns); True if it completed a higher-timeframe bar."""
+        if self.seen is not None and ts <= self.seen:
+            return False
+        self.seen = ts
+        start = self._open(ts)
+        last = self.ring.last_ts
+        if last == start:
+            _, cur = self.ring.arrays(1)
+            self.ring.update_last(cur[0, 0], max(cur[1, 0], h), min(cur[2, 0], l), c, cur[4, 0] + v)
+        elif last is None or start > last:
+            self.ring.append(start, o, h, l, c, v)
+        else:
+            return False
+        return ts + self.base_sec * _NS >= start + self.sec * _NS
+
+    def catch_up(self, base: BarRing, final: int) -> int:
+        """Fold base bars newer than `seen` up to `final` (open ts of the newest closed one); returns bars completed."""
+        ts, vals = base.arrays()
+        if self.seen is None:
+            # first pass: begin at an aligned bucket so the first higher bar is whole
+            aligned = np.flatnonzero(np.array([self._open(int(t)) == t for t in ts], dtype=bool))
+            if not len(aligned):
+                return 0
+            i = int(aligned[0])
+        else:
+            i = int(np.searchsorted(ts, self.seen, side="right"))
+        j = int(np.searchsorted(ts, final, side="right"))
+        done = 0
+        for k in range(i, j):
+            done += self.fold(int(ts[k]), *vals[:, k])
+        return done
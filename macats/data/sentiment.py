@@ -1,27 +1,97 @@
-import re, random, time
+import asyncio, json, random, time
+from typing import AsyncIterator, Dict, Optional
+
+from macats.data.lexicon import Lexicon, DEFAULT_PHRASES
 
 POS = {"moon","pump","breakout","bullish","rocket","win","long"}
 NEG = {"dump","bearish","rug","short","liquidate","fear","crash"}
 
+DEFAULT_WEIGHTS: Dict[str, float] = {**{w: 1.0 for w in POS}, **{w: -1.0 for w in NEG}, **DEFAULT_PHRASES}
+
+SAMPLES = [
+    "BTC looks bullish, breakout soon?",
+    "Funding too high, crash coming",
+    "ETH on a rocket, careful at resistance",
+    "Chop city. Staying flat.",
+    "Bearish divergence on 4h, likely dump",
+    "Macro improving, DXY down, risk on",
+]
+
+_DEFAULT_LEXICON: Optional[Lexicon] = None
+
+def default_lexicon() -> Lexicon:
+    global _DEFAULT_LEXICON
+    if _DEFAULT_LEXICON is None:
+        _DEFAULT_LEXICON = Lexicon(DEFAULT_WEIGHTS)
+    return _DEFAULT_LEXICON
+
+def lexicon_score(text: str) -> float:
+    """Weighted score: POS words +1, NEG words -1, plus DEFAULT_PHRASES."""
+    return default_lexicon().score(text)
+
 def toy_stream():
     """
     Fake sentiment stream. Yields dicts:
     {'ts': timestamp, 'text': str, 'score': float}
+    Blocking (time.sleep) — inside the event loop use toy_source() instead.
     """
-    samples = [
-        "BTC looks bullish, breakout soon?",
-        "Funding too high, crash coming",
-        "ETH on a rocket, careful at resistance",
-        "Chop city. Staying flat.",
-        "Bearish divergence on 4h, likely dump",
-        "Macro improving, DXY down, risk on",
-    ]
     while True:
-        text = random.choice(samples)
-        toks = re.findall(r"[a-z]+", text.lower())
-        score = sum(1 for t in toks if t in POS) - sum(1 for t in toks if t in NEG)
-        yield {"ts": time.time(), "text": text, "score": float(score)}
+        text = random.choice(SAMPLES)
+        yield {"ts": time.time(), "text": text, "score": lexicon_score(text)}
         time.sleep(0.5)
 
+# --------------------------- async sources ---------------------------
+# A source is any async iterable of {"text": str, "ts"?: float, ...} dicts.
+
+async def toy_source(interval: float = 0.5) -> AsyncIterator[Dict]:
+    """Non-blocking version of toy_stream() (unscored)."""
+    while True:
+        yield {"ts": time.time(), "text": random.choice(SAMPLES), "source": "toy"}
+        await asyncio.sleep(interval)
+
+class FileReplaySource:
+    """
+    Replays texts from a local file: JSON lines ({"ts","text",...}) or plain text (one per line).
+    speed=0 replays as fast as possible; speed=1.0 follows the recorded ts gaps, 10.0 is 10x.
+    """
+    def __init__(self, path: str, speed: float = 0.0, loop: bool = False, yield_every: int = 1024):
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        self.yield_every = yield_every
+
+    def _parse(self, line: str) -> Optional[Dict]:
+        line = line.strip()
+        if not line:
+            return None
+        if line.startswith("{"):
+            try:
+                d = json.loads(line)
+            except ValueError:
+                return None
+            return d if "text" in d else None
+        return {"text": line}
+
+    async def __aiter__(self) -> AsyncIterator[Dict]:
+        while True:
+            prev_ts = None
+            with open(self.path, encoding="utf-8") as f:
+                for i, line in enumerate(f):
+                    item = self._parse(line)
+                    if item is None:
+                        continue
+                    ts = item.get("ts")
+                    if self.speed > 0 and ts is not None:
+                        if prev_ts is not None and ts > prev_ts:
+                            await asyncio.sleep((ts - prev_ts) / self.speed)
+                        prev_ts = ts
+                    elif i % self.yield_every == 0:
+                        await asyncio.sleep(0)
+                    item.setdefault("ts", time.time())
+                    item.setdefault("source", self.path)
+                    yield item
+            if not self.loop:
+                return
+
 def headless_note():
-    return "Replace toy_stream() with Playwright/Selenium or APIs (Reddit, Twitter, CryptoPanic)."
\ No newline at end of file
+    return "Replace toy_stream() with Playwright/Selenium or APIs (Reddit, Twitter, CryptoPanic)."
@@ -0,0 +1,139 @@
+import bisect
+import hashlib
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+DEFAULT_UNIVERSE = "BTC/USDT,ETH/USDT,SOL/USDT,BNB/USDT,XRP/USDT,ADA/USDT,DOGE/USDT,AVAX/USDT,DOT/USDT,MATIC/USDT,TRX/USDT,LINK/USDT,ATOM/USDT,LTC/USDT,UNI/USDT,ETC/USDT,XMR/USDT,APT/USDT,ARB/USDT,NEAR/USDT,OP/USDT,HBAR/USDT,ICP/USDT,FIL/USDT,STX/USDT,SUI/USDT,ALGO/USDT,VET/USDT,MKR/USDT,GRT/USDT,SAND/USDT,AXS/USDT,AAVE/USDT,RUNE/USDT,THETA/USDT,EGLD/USDT,KAVA/USDT,INJ/USDT,CRV/USDT,FTM/USDT,DYDX/USDT,LDO/USDT,GMX/USDT,ENS/USDT,CHZ/USDT,COMP/USDT,1INCH/USDT,BAL/USDT,ZIL/USDT,FLR/USDT"
+
+def parse_universe(spec: str) -> List[str]:
+    return [s.strip() for s in spec.split(",") if s.strip()]
+
+def _h(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+class HashRing:
+    """
+    Consistent hashing ring with virtual nodes.
+    Adding/removing a node only moves ~1/N of the keys, so scanner shards keep most
+    of their symbols (and caches) when the node count changes.
+    """
+    def __init__(self, nodes: Iterable[str], vnodes: int = 64):
+        self._ring = sorted((_h(f"{n}#{i}"), n) for n in nodes for i in range(vnodes))
+        self._keys = [k for k, _ in self._ring]
+
+    def lookup(self, key: str) -> str:
+        if not self._ring:
+            raise ValueError("empty ring")
+        i = bisect.bisect(self._keys, _h(key)) % len(self._ring)
+        return self._ring[i][1]
+
+    def assign(self, keys: Iterable[str]) -> Dict[str, List[str]]:
+        out: Dict[str, List[str]] = {}
+        for k in keys:
+            out.setdefault(self.lookup(k), []).append(k)
+        return out
+
+def shard_universe(symbols: Iterable[str], index: int, count: int) -> List[str]:
+    """Symbols owned by shard `index` of `count` (all of them when count <= 1)."""
+    symbols = list(symbols)
+    if count <= 1:
+        return symbols
+    ring = HashRing(f"shard-{i}" for i in range(count))
+    me = f"shard-{index}"
+    return [s for s in symbols if ring.lookup(s) == me]
+
+# --------------------------- liquidity / volatility pre-filter ---------------------------
+
+# snapshot: symbol -> {"last", "quote_volume" (24h, quote ccy), "range_pct" ((high - low) / last, 24h)}
+Snapshot = Dict[str, Dict[str, float]]
+
+def ticker_snapshot(symbols: Iterable[str], exchange_id: str = "binance") -> Snapshot:
+    """One bulk fetch_tickers call for the whole universe."""
+    from macats.data.market import _exchange        # ccxt only when the filter is on
+    ex = _exchange(exchange_id)
+    symbols = list(symbols)
+    try:
+        tickers = ex.fetch_tickers(symbols)
+    except Exception:
+        tickers = ex.fetch_tickers()                 # some exchanges only do "all tickers"
+    out: Snapshot = {}
+    for s in symbols:
+        t = tickers.get(s)
+        last = t and (t.get("last") or t.get("close"))
+        if not last:
+            continue
+        qv = t.get("quoteVolume") or (t.get("baseVolume") or 0.0) * last
+        hi, lo = t.get("high") or last, t.get("low") or last
+        out[s] = {"last": float(last), "quote_volume": float(qv), "range_pct": float(hi - lo) / float(last)}
+    return out
+
+def bar_snapshot(store, symbols: Iterable[str], tf: str) -> Snapshot:
+    """The same 24h stats from bars already in the bar store (symbols never loaded are absent; ring volume is quote)."""
+    from macats.scheduler import timeframe_seconds
+    n = max(1, 86400 // timeframe_seconds(tf))
+    out: Snapshot = {}
+    for s in symbols:
+        ring = store.rings.get(store.key(s, tf))
+        if ring is None or not len(ring):
+            continue
+        _, (o, h, l, c, v) = ring.arrays(n)
+        last = float(c[-1])
+        if last > 0:
+            out[s] = {"last": last, "quote_volume": float(v.sum()),
+                      "range_pct": float(h.max() - l.min()) / last}
+    return out
+
+class UniverseFilter:
+    """
+    Keeps the scan to symbols that can plausibly trade: 24h quote volume >= min_quote_volume,
+    24h range >= min_range_pct, then the top_n by volume x range. The snapshot is refreshed
+    at most every refresh_secs. Symbols missing from the snapshot are kept (nothing to judge
+    them by); if a refresh fails the previous active set stays. With no threshold and no
+    top_n it is a no-op and never calls `source`.
+    """
+
+    def __init__(self, source: Callable[[List[str]], Snapshot], min_quote_volume: float = 0.0,
+                 min_range_pct: float = 0.0, top_n: int = 0, refresh_secs: float = 900.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.source = source
+        self.min_quote_volume = min_quote_volume
+        self.min_range_pct = min_range_pct
+        self.top_n = top_n
+        self.refresh_secs = refresh_secs
+        self.clock = clock
+        self.snapshot: Snapshot = {}
+        self.refreshed: Optional[float] = None
+        self.errors = 0
+        self._active: Optional[List[str]] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.min_quote_volume > 0 or self.min_range_pct > 0 or self.top_n > 0)
+
+    def select(self, symbols: List[str], snap: Snapshot) -> List[str]:
+        ok, unknown = [], []
+        for s in symbols:
+            st = snap.get(s)
+            if st is None:
+                unknown.append(s)
+            elif st["quote_volume"] >= self.min_quote_volume and st["range_pct"] >= self.min_range_pct:
+                ok.append(s)
+        if self.top_n > 0:
+            ok = sorted(ok, key=lambda s: snap[s]["quote_volume"] * snap[s]["range_pct"], reverse=True)[:self.top_n]
+        keep = set(ok) | set(unknown)
+        return [s for s in symbols if s in keep]      # universe order
+
+    def active(self, symbols: List[str]) -> List[str]:
+        if not self.enabled:
+            return symbols
+        now = self.clock()
+        if self._active is None or self.refreshed is None or now - self.refreshed >= self.refresh_secs:
+            try:
+                self.snapshot = self.source(symbols)
+                self._active = self.select(symbols, self.snapshot)
+            except Exception:
+                self.errors += 1
+                if self._active is None:
+                    self._active = list(symbols)
+            self.refreshed = now
+        return self._active
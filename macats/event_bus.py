@@ -1,25 +1,38 @@
 import asyncio
 from dataclasses import dataclass
-from typing import Any, Dict
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
 
 @dataclass
 class Event:
     topic: str
     payload: Dict[str, Any]
+    origin: Optional[str] = None   # set by transports for events that came from another bus
 
 class EventBus:
+    """
+    Topic pub/sub. Every subscribe() call gets its own queue, registered when subscribe()
+    is called, and sees every event published on the topic after that (fan-out).
+    Events on topics with no subscribers are dropped.
+    """
     def __init__(self):
-        self.queues: dict[str, asyncio.Queue] = {}
-
-    def topic(self, name: str) -> asyncio.Queue:
-        if name not in self.queues:
-            self.queues[name] = asyncio.Queue()
-        return self.queues[name]
+        self.subscribers: dict[str, List[asyncio.Queue]] = {}
+        # taps see every published event (sync, must not block): transports, recorders
+        self.taps: List[Callable[[Event], None]] = []
 
     async def publish(self, event: Event):
-        await self.topic(event.topic).put(event)
+        for tap in self.taps:
+            tap(event)
+        for q in self.subscribers.get(event.topic, ()):
+            q.put_nowait(event)
+
+    def subscribe(self, name: str) -> AsyncIterator[Event]:
+        q: asyncio.Queue = asyncio.Queue()
+        self.subscribers.setdefault(name, []).append(q)
+        return self._drain(name, q)
 
-    async def subscribe(self, name: str):
-        q = self.topic(name)
-        while True:
-            yield await q.get()
\ No newline at end of file
+    async def _drain(self, name: str, q: asyncio.Queue):
+        try:
+            while True:
+                yield await q.get()
+        finally:
+            self.subscribers[name].remove(q)
@@ -0,0 +1,255 @@
+# macats/features.py
+"""
+Declarative feature registry + a memoizing evaluation context.
+
+A feature names its inputs (OHLCV columns or other features) and parameters:
+
+    @feature("ema_fast", "c", span=20)
+    def _ema(c, span): ...
+
+FeatureContext(bars) computes a feature the first time it is asked for, inputs first, and
+keeps the array; features with the same function, inputs and params (bb_mid and sma_fast)
+are computed once. Only what consumers read is ever computed.
+
+    ctx = FeatureContext.from_pandas(df)
+    ind = ctx.indicators()          # rows where the classic indicators are defined, as
+    ind.latest("ema_fast")          # indicators() returned them; later features start there
+
+CONTEXTS keeps one context per (symbol, timeframe) until the next bar, so several
+consumers evaluating the same bars share it. Consumers of TechAgent's market.features frame
+declare the columns they read with request(); TechAgent computes the union (plus
+INDICATORS) once per bar.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from macats.data.frames import FeatureFrame
+
+BASE = ("o", "h", "l", "c", "v")
+INDICATORS = ("sma_fast", "sma_slow", "rsi", "atr")     # what data.market.indicators() adds
+
+
+@dataclass(frozen=True)
+class Feature:
+    name: str
+    fn: Callable[..., np.ndarray]
+    inputs: Tuple[str, ...]
+    params: Tuple[Tuple[str, Any], ...] = ()
+
+    @property
+    def key(self) -> Tuple[Any, ...]:
+        """Identity of the computation: same fn, inputs and params -> same array."""
+        return (self.fn, self.inputs, self.params)
+
+
+REGISTRY: Dict[str, Feature] = {}
+
+
+def feature(name: str, *inputs: str, **params: Any):
+    """Register fn(*input_arrays, **params) -> array (same length) as `name`."""
+    def deco(fn: Callable[..., np.ndarray]) -> Callable[..., np.ndarray]:
+        REGISTRY[name] = Feature(name, fn, tuple(inputs), tuple(sorted(params.items())))
+        return fn
+    return deco
+
+
+def register(name: str, fn: Callable[..., np.ndarray], *inputs: str, **params: Any) -> Feature:
+    REGISTRY[name] = f = Feature(name, fn, tuple(inputs), tuple(sorted(params.items())))
+    return f
+
+
+# --------------------------- built-in features ---------------------------
+# pandas rolling/ewm so values match what the agents computed inline before
+
+def _sma(x: np.ndarray, window: int) -> np.ndarray:
+    return pd.Series(x).rolling(window).mean().to_numpy()
+
+
+def _ema(x: np.ndarray, span: int) -> np.ndarray:
+    return pd.Series(x).ewm(span=span, min_periods=span).mean().to_numpy()
+
+
+@feature("rsi", "c", window=14)
+def _rsi(c: np.ndarray, window: int) -> np.ndarray:
+    r = pd.Series(c).pct_change().fillna(0.0)
+    up = r.clip(lower=0).rolling(window).mean()
+    down = (-r.clip(upper=0)).rolling(window).mean().replace(0, 1e-9)
+    return (100 - (100 / (1 + up / down))).to_numpy()
+
+
+@feature("atr", "h", "l", window=14)
+def _atr(h: np.ndarray, l: np.ndarray, window: int) -> np.ndarray:
+    return pd.Series(h - l).rolling(window).mean().to_numpy()     # simple ATR proxy
+
+
+@feature("rsi_prev", "rsi")
+def _rsi_prev(rsi: np.ndarray) -> np.ndarray:
+    """Mean RSI of the two bars before each bar (the "was RSI rising" reference)."""
+    out = np.full(len(rsi), np.nan)
+    out[2:] = (rsi[:-2] + rsi[1:-1]) / 2
+    return out
+
+
+@feature("trend", "sma_fast", "sma_slow")
+def _trend(fast: np.ndarray, slow: np.ndarray) -> np.ndarray:
+    return np.sign(fast - slow)
+
+
+@feature("ma_sep", "sma_fast", "sma_slow", "c")
+def _ma_sep(fast: np.ndarray, slow: np.ndarray, c: np.ndarray) -> np.ndarray:
+    return np.abs(fast - slow) / np.maximum(c, 1e-9)
+
+
+@feature("atr_pct", "atr", "c")
+def _atr_pct(atr: np.ndarray, c: np.ndarray) -> np.ndarray:
+    return atr / np.maximum(c, 1e-9)
+
+
+register("sma_fast", _sma, "c", window=20)
+register("sma_slow", _sma, "c", window=50)
+register("bb_mid", _sma, "c", window=20)            # == sma_fast: shares its array
+register("vol_sma", _sma, "v", window=20)
+register("ema_fast", _ema, "c", span=20)
+register("ema_slow", _ema, "c", span=50)
+
+
+# --------------------------- evaluation ---------------------------
+
+class FeatureContext:
+    """Lazily computed, memoized features over one window of bars (arrays are read-only views)."""
+
+    def __init__(self, ts: np.ndarray, cols: Dict[str, np.ndarray], registry: Optional[Dict[str, Feature]] = None):
+        self.ts = ts
+        self.registry = REGISTRY if registry is None else registry
+        self._values: Dict[str, np.ndarray] = dict(cols)
+        self._by_key: Dict[Tuple[Any, ...], np.ndarray] = {}
+        self._trimmed: Dict[Tuple[str, ...], "FeatureContext"] = {}
+        self.computed = 0
+
+    @classmethod
+    def from_pandas(cls, df: pd.DataFrame) -> "FeatureContext":
+        n = len(df)
+        idx = df.index
+        if hasattr(idx, "as_unit"):
+            idx = idx.as_unit("ns")
+        ts = np.asarray(idx.asi8) if hasattr(idx, "asi8") else np.arange(n)
+        # yfinance may hand back (n, 1) columns; take the first
+        return cls(ts, {c: np.asarray(df[c], dtype=np.float64).reshape(n, -1)[:, 0] for c in BASE if c in df})
+
+    @classmethod
+    def from_frame(cls, frame: FeatureFrame) -> "FeatureContext":
+        return cls(frame.ts, {c: frame[c] for c in frame.columns})
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._values or name in self.registry
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        v = self._values.get(name)
+        if v is not None:
+            return v
+        f = self.registry.get(name)
+        if f is None:
+            raise KeyError(f"unknown feature {name!r}")
+        v = self._by_key.get(f.key)
+        if v is None:
+            v = f.fn(*(self[i] for i in f.inputs), **dict(f.params))
+            v.flags.writeable = False
+            self._by_key[f.key] = v
+            self.computed += 1
+        self._values[name] = v
+        return v
+
+    def latest(self, name: str) -> float:
+        return float(self[name][-1])
+
+    def latest_row(self, names: Iterable[str]) -> Dict[str, float]:
+        return {n: self.latest(n) for n in names}
+
+    def _child(self, rows) -> "FeatureContext":
+        child = FeatureContext(self.ts[rows], {k: v[rows] for k, v in self._values.items()}, self.registry)
+        child._by_key = {k: v[rows] for k, v in self._by_key.items()}
+        return child
+
+    def tail_from(self, start: int) -> "FeatureContext":
+        """Context over rows [start:], carrying every feature computed so far as a view."""
+        return self._child(slice(start, None))
+
+    def indicators(self, names: Iterable[str] = INDICATORS) -> "FeatureContext":
+        """What data.market.indicators() returned: rows from the first where all `names` are defined."""
+        names = tuple(names)
+        hit = self._trimmed.get(names)
+        if hit is not None:
+            return hit
+        self._trimmed[names] = child = self._trim(names)
+        return child
+
+    def _trim(self, names: Tuple[str, ...]) -> "FeatureContext":
+        ok = np.ones(len(self), dtype=bool)
+        for n in (*BASE, *names):
+            if n in self._values or n in self.registry:
+                ok &= ~np.isnan(self[n])
+        # dropna() on raw bars that were already clean == trimming the warm-up prefix
+        first = int(np.argmax(ok)) if ok.any() else len(self)
+        if not ok[first:].all():
+            return self._child(np.flatnonzero(ok))      # gaps inside the window: a copy, not views
+        return self.tail_from(first)
+
+    def frame(self, names: Iterable[str]) -> FeatureFrame:
+        return FeatureFrame(self.ts, {n: self[n] for n in names})
+
+
+# --------------------------- consumers / cache ---------------------------
+
+_REQUESTS: Dict[str, Set[str]] = {}
+
+
+def request(consumer: str, names: Iterable[str]) -> None:
+    """Declare the feature columns `consumer` reads from market.features frames."""
+    names = set(names)
+    unknown = names - set(REGISTRY) - set(BASE)
+    if unknown:
+        raise KeyError(f"unknown features for {consumer}: {sorted(unknown)}")
+    _REQUESTS[consumer] = names
+
+
+def requested() -> List[str]:
+    """Union of every consumer's request, in registry order."""
+    want = set().union(*_REQUESTS.values()) if _REQUESTS else set()
+    return [n for n in (*BASE, *REGISTRY) if n in want]
+
+
+def _fingerprint(ctx: FeatureContext) -> Tuple[Any, ...]:
+    """Same window of the same bars: length, first/last bar open and the last bar's close/volume."""
+    if not len(ctx):
+        return ()
+    return (len(ctx), int(ctx.ts[0]), int(ctx.ts[-1]), float(ctx["c"][-1]),
+            float(ctx["v"][-1]) if "v" in ctx._values else 0.0)
+
+
+@dataclass
+class ContextCache:
+    """One context per (symbol, timeframe), replaced when the bars (or the window) change."""
+    _ctx: Dict[Tuple[str, str], Tuple[Tuple[Any, ...], FeatureContext]] = field(default_factory=dict)
+    hits: int = 0
+
+    def get(self, symbol: str, tf: str, df: pd.DataFrame) -> FeatureContext:
+        ctx = FeatureContext.from_pandas(df)            # views of df's columns where possible
+        k, fp = (symbol, tf), _fingerprint(ctx)
+        hit = self._ctx.get(k)
+        if hit is not None and hit[0] == fp:
+            self.hits += 1
+            return hit[1]
+        self._ctx[k] = (fp, ctx)
+        return ctx
+
+    def clear(self) -> None:
+        self._ctx.clear()
+
+
+CONTEXTS = ContextCache()
@@ -0,0 +1,231 @@
+# macats/journal.py
+"""
+Append-only binary journal of every EventBus event, for audit and deterministic replay.
+
+    <dir>/events-<first ts ns>.jnl   b"MCJ1", then one record per event:
+        u32 payload len | u32 crc32(topic + payload) | i64 ts ns | u8 topic len | topic | codec(payload)
+    <dir>/events-<first ts ns>.idx   (ts ns, record offset) every `index_every` records
+
+The journal is a bus tap: a publish costs one codec encode into a buffer that is written
+out every `flush_secs` (or once it passes 1 MB). Segments roll at `segment_mb`. Timestamps
+are wall clock, forced non-decreasing so time seeks can bisect. Payloads the codec cannot
+encode (market.features frames) are counted in `skipped` and left out.
+
+JournalReader maps segments read-only and seeks by time through the .idx files, then
+scans record headers; topics are filtered on the raw bytes, so only matching payloads are
+decoded. A torn tail (crash mid-write) ends the segment.
+
+    python -m macats journal --dir journal --topic exec.fills --since 2024-05-01T12:00
+"""
+import asyncio
+import mmap
+import os
+import struct
+import time
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from macats.codec import decode, encode
+from macats.event_bus import Event, EventBus
+
+_MAGIC = b"MCJ1"
+_REC = struct.Struct("<IIqB")
+_IDXREC = struct.Struct("<qq")
+_IDX = np.dtype([("ts", "<i8"), ("off", "<i8")])
+
+Record = Tuple[int, str, Any]      # (ts ns, topic, payload)
+
+
+class EventJournal:
+    def __init__(self, directory: str, topics: Iterable[str] = (), exclude: Iterable[str] = (),
+                 segment_mb: float = 64.0, flush_secs: float = 1.0, index_every: int = 256):
+        os.makedirs(directory, exist_ok=True)
+        self.dir = directory
+        self.topics = frozenset(topics)           # empty = everything
+        self.exclude = frozenset(exclude)
+        self.segment_bytes = int(segment_mb * 1024 * 1024)
+        self.flush_secs = flush_secs
+        self.index_every = index_every
+        self.records = 0
+        self.skipped: Dict[str, int] = {}
+        self._buf = bytearray()
+        self._idx = bytearray()
+        self._f = None
+        self._fi = None
+        self._size = 0                             # segment bytes incl. the unflushed buffer
+        self._seg_records = 0
+        self._last_ts = 0
+
+    def install(self, bus: EventBus) -> "EventJournal":
+        bus.taps.append(self.tap)
+        return self
+
+    # --------------------------- write path ---------------------------
+
+    def _open(self, ts: int) -> None:
+        self._close_segment()
+        base = os.path.join(self.dir, f"events-{ts:020d}")
+        self._f = open(base + ".jnl", "ab")
+        self._fi = open(base + ".idx", "ab")
+        self._size = self._f.tell()
+        if self._size == 0:
+            self._buf += _MAGIC
+            self._size = len(_MAGIC)
+        self._seg_records = 0
+
+    def tap(self, e: Event) -> None:
+        if (self.topics and e.topic not in self.topics) or e.topic in self.exclude:
+            return
+        try:
+            payload = encode(e.payload)
+        except TypeError:
+            self.skipped[e.topic] = self.skipped.get(e.topic, 0) + 1
+            return
+        ts = max(time.time_ns(), self._last_ts)
+        self._last_ts = ts
+        if self._f is None or self._size >= self.segment_bytes:
+            self._open(ts)
+        topic = e.topic.encode("utf-8")[:255]
+        if self._seg_records % self.index_every == 0:
+            self._idx += _IDXREC.pack(ts, self._size)
+        self._buf += _REC.pack(len(payload), zlib.crc32(payload, zlib.crc32(topic)), ts, len(topic))
+        self._buf += topic
+        self._buf += payload
+        self._size += _REC.size + len(topic) + len(payload)
+        self._seg_records += 1
+        self.records += 1
+        if len(self._buf) >= 1 << 20:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._f is None:
+            return
+        if self._buf:
+            self._f.write(self._buf)
+            self._f.flush()
+            self._buf.clear()
+        if self._idx:                              # index after data: it never points past the file
+            self._fi.write(self._idx)
+            self._fi.flush()
+            self._idx.clear()
+
+    def _close_segment(self) -> None:
+        if self._f is not None:
+            self.flush()
+            self._f.close()
+            self._fi.close()
+            self._f = self._fi = None
+
+    def close(self) -> None:
+        self._close_segment()
+
+    async def run(self) -> None:
+        try:
+            while True:
+                await asyncio.sleep(self.flush_secs)
+                self.flush()
+        finally:
+            self.close()
+
+
+# --------------------------- read path ---------------------------
+
+def segments(directory: str) -> List[Tuple[int, str]]:
+    """[(first ts ns, path)] oldest first."""
+    out = []
+    for name in os.listdir(directory) if os.path.isdir(directory) else ():
+        if name.startswith("events-") and name.endswith(".jnl"):
+            out.append((int(name[7:-4]), os.path.join(directory, name)))
+    return sorted(out)
+
+
+class JournalReader:
+    def __init__(self, directory: str, verify: bool = True):
+        self.dir = directory
+        self.verify = verify
+        self.corrupt = 0                 # segments cut short by a bad record
+
+    def _start_offset(self, path: str, start: Optional[int]) -> int:
+        if start is None:
+            return len(_MAGIC)
+        try:
+            raw = np.fromfile(path[:-4] + ".idx", dtype=np.uint8)
+        except FileNotFoundError:
+            return len(_MAGIC)
+        idx = raw[: len(raw) - len(raw) % _IDX.itemsize].view(_IDX)
+        k = int(np.searchsorted(idx["ts"], start, side="left")) - 1
+        return int(idx["off"][k]) if k >= 0 else len(_MAGIC)
+
+    def read(self, start: Optional[int] = None, end: Optional[int] = None,
+             topics: Iterable[str] = ()) -> Iterator[Record]:
+        """Records with start <= ts <= end (ns), optionally only `topics`, in time order."""
+        want = {t.encode("utf-8") for t in topics}
+        segs = segments(self.dir)
+        for n, (first, path) in enumerate(segs):
+            if end is not None and first > end:
+                return
+            if start is not None and n + 1 < len(segs) and segs[n + 1][0] <= start:
+                continue                             # the next segment starts before `start`
+            for rec in self._scan(path, start, end, want):
+                if rec is None:
+                    return                           # past `end`
+                yield rec
+
+    def _scan(self, path: str, start: Optional[int], end: Optional[int], want) -> Iterator[Optional[Record]]:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size <= len(_MAGIC):
+                return
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if mm[:len(_MAGIC)] != _MAGIC:
+                self.corrupt += 1
+                return
+            i = self._start_offset(path, start)
+            hdr = _REC.size
+            while i + hdr <= size:
+                n, crc, ts, tl = _REC.unpack_from(mm, i)
+                j = i + hdr + tl
+                if j + n > size:
+                    return                           # torn tail
+                topic = mm[i + hdr:j]
+                if self.verify and zlib.crc32(mm[j:j + n], zlib.crc32(topic)) != crc:
+                    self.corrupt += 1
+                    return
+                i = j + n
+                if start is not None and ts < start:
+                    continue
+                if end is not None and ts > end:
+                    yield None
+                    return
+                if want and topic not in want:
+                    continue
+                yield ts, topic.decode("utf-8"), decode(mm, j)
+        finally:
+            mm.close()
+
+    def stats(self, start: Optional[int] = None, end: Optional[int] = None) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        first = last = None
+        for ts, topic, _ in self.read(start, end):
+            counts[topic] = counts.get(topic, 0) + 1
+            first = ts if first is None else first
+            last = ts
+        return {"records": sum(counts.values()), "first_ns": first, "last_ns": last, "topics": counts}
+
+
+async def replay(bus: EventBus, directory: str, start: Optional[int] = None, end: Optional[int] = None,
+                 topics: Iterable[str] = (), speed: float = 0.0, yield_every: int = 256) -> int:
+    """Publish journaled events onto `bus` (speed=0: as fast as possible, 1.0: recorded pace)."""
+    prev, n = None, 0
+    for ts, topic, payload in JournalReader(directory).read(start, end, topics):
+        if speed > 0 and prev is not None and ts > prev:
+            await asyncio.sleep((ts - prev) / 1e9 / speed)
+        elif n % yield_every == 0:
+            await asyncio.sleep(0)
+        prev = ts
+        await bus.publish(Event(topic=topic, payload=payload, origin="journal"))
+        n += 1
+    return n
@@ -0,0 +1,334 @@
+# macats/loadgen.py
+"""
+Synthetic load test for the live agent graph, no network needed.
+
+A seeded GBM market (regime drift, volume bursts) stands in for load_ohlcv and the price
+feed. The same agents main() starts (orchestrator.AGENTS) run on one bus while ticks are
+pushed at a target rate and bars close every `bar_secs` of wall time, each close running a
+full scanner pass. Load is ramped stage by stage until the pipeline saturates.
+
+Random walks rarely reach FSVZO confluence, so each cycle also injects candidates for a
+`signal_rate` share of the symbols (trend side, ATR stops from the synthetic bars) next to
+the scanner's own; risk's slot/allocation caps are sized to the universe so they become
+orders, fills and stops. --signal-rate 0 leaves only organic signals.
+
+    python -m macats loadtest --symbols 10,50,100,200 --tps 200,1000,2000,5000 --stage-secs 10
+
+Per stage:
+  tps         ticks/s published vs target
+  backlog     per-topic queue depth (max over the stage, and its growth rate at the end)
+  latency     tick-to-fill: bar close -> scan -> netting -> risk -> fill for entries,
+              first tick through the stop level -> fill for stop exits
+  loop lag    how late a 50 ms heartbeat wakes up
+A stage is saturated when the generator falls behind, queues keep growing, or fills take
+longer than a bar. A stage without a single timed fill is invalid (it measured tick fan-out
+only) and never counts as capacity.
+"""
+import asyncio
+import math
+import tempfile
+import time
+from collections import defaultdict, deque
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from macats.config import SETTINGS
+from macats.event_bus import Event, EventBus
+from macats.scheduler import bar_open, timeframe_seconds
+
+_COLS = ("o", "h", "l", "c", "v")
+
+
+class SyntheticMarket:
+    """
+    Per-symbol GBM tick prices aggregated into bars. Drift flips sign now and then so the
+    scanner sees trends; a bar is a volume burst with probability `burst_prob`
+    (volume x burst_mult, volatility x2). load_ohlcv() serves the closed-bar history.
+    """
+
+    def __init__(self, symbols: Sequence[str], tf: str = "1h", seed: int = 7, history: int = 300,
+                 tick_vol: float = 0.002, burst_prob: float = 0.05, burst_mult: float = 4.0):
+        self.tf = tf
+        self.rng = np.random.default_rng(seed)
+        self.tick_vol = tick_vol
+        self.burst_prob, self.burst_mult = burst_prob, burst_mult
+        self.hist: Dict[str, np.ndarray] = {}
+        self.bar: Dict[str, List[float]] = {}
+        self.drift: Dict[str, float] = {}
+        self.burst: Dict[str, bool] = {}
+        for s in symbols:
+            self._seed_history(s, history)
+
+    def _seed_history(self, sym: str, n: int) -> None:
+        rng = self.rng
+        vol = self.tick_vol * 4.0                       # ~16 ticks per seeded bar
+        drift = np.repeat(rng.choice([-1.0, 1.0], max(1, n // 50 + 1)) * vol * 0.15, 50)[:n]
+        c = rng.uniform(1.0, 1000.0) * np.exp(np.cumsum(drift + rng.normal(0.0, vol, n)))
+        o = np.r_[c[0], c[:-1]]
+        h = np.maximum(o, c) * (1 + np.abs(rng.normal(0, vol / 2, n)))
+        l = np.minimum(o, c) * (1 - np.abs(rng.normal(0, vol / 2, n)))
+        v = rng.lognormal(5, 0.5, n) * np.where(rng.random(n) < self.burst_prob, self.burst_mult, 1.0)
+        self.hist[sym] = np.column_stack([o, h, l, c, v])
+        self.drift[sym] = float(drift[-1]) / 4.0
+        self.burst[sym] = False
+        self.bar[sym] = [c[-1], c[-1], c[-1], c[-1], 0.0]
+
+    def tick(self, sym: str) -> Tuple[float, float]:
+        """Advance one tick; returns (price, volume)."""
+        b = self.bar[sym]
+        sigma = self.tick_vol * (2.0 if self.burst[sym] else 1.0)
+        px = b[3] * math.exp(self.drift[sym] - 0.5 * sigma * sigma + sigma * self.rng.standard_normal())
+        v = float(self.rng.lognormal(1.5, 0.5)) * (self.burst_mult if self.burst[sym] else 1.0)
+        b[1] = max(b[1], px)
+        b[2] = min(b[2], px)
+        b[3] = px
+        b[4] += v
+        return px, v
+
+    def close_bar(self, sym: str) -> Dict[str, float]:
+        b = self.bar[sym]
+        if b[4] == 0.0:
+            b[4] = float(self.rng.lognormal(5, 0.5))       # no ticks this bar: keep volume sane
+        self.hist[sym] = np.vstack([self.hist[sym][1:], b])
+        if self.rng.random() < 0.02:
+            self.drift[sym] = -self.drift[sym]
+        self.burst[sym] = bool(self.rng.random() < self.burst_prob)
+        self.bar[sym] = [b[3], b[3], b[3], b[3], 0.0]
+        return dict(zip(_COLS, b))
+
+    def candidate(self, sym: str, cycle: Any) -> Dict[str, Any]:
+        """A scanner-shaped signal on the last closed bar: trend side, 1.5 ATR stop, 1R target."""
+        from macats import tracing
+        h = self.hist[sym]
+        px = float(h[-1, 3])
+        atr = float((h[-14:, 1] - h[-14:, 2]).mean())
+        short = self.drift[sym] < 0 and bool(getattr(SETTINGS, "allow_shorts", False))    # spot: longs only
+        side = "short" if short else "long"
+        d = 1.0 if side == "long" else -1.0
+        return {"symbol": sym, "side": side, "strength": 0.8, "score": 3, "atr": atr,
+                "sl_price": px - d * 1.5 * atr, "tp_price": px + d * 1.5 * atr, "cycle": cycle,
+                "trace": tracing.mark(tracing.start("scan"), "signal"), "synthetic": True}
+
+    def load_ohlcv(self, symbol: str, interval: Optional[str] = None, lookback: str = "", exchange_id: str = "") -> pd.DataFrame:
+        """Drop-in for data.market.load_ohlcv: closed bars, indexed so the last one just closed."""
+        h = self.hist[symbol]
+        sec = timeframe_seconds(interval or self.tf)
+        last_open = bar_open(time.time(), interval or self.tf) - sec
+        idx = pd.to_datetime(last_open - sec * np.arange(len(h) - 1, -1, -1), unit="s")
+        return pd.DataFrame(h, index=idx, columns=list(_COLS))
+
+
+def _pct(xs: List[float], q: float) -> float:
+    return float(np.percentile(xs, q)) if xs else 0.0
+
+
+class LatencyProbe:
+    """
+    Bus tap (sync, cheap) that timestamps events as they are published and pairs each fill
+    with what caused it: the bar close of its scan cycle (orders.batch / signal orders) or
+    the first tick through its stop level (StopAgent flats).
+    """
+
+    def __init__(self, ring: int = 64):
+        self.published: Dict[str, int] = defaultdict(int)
+        self.cycle_t: Dict[Any, float] = {}
+        self.bar_t: Dict[str, float] = {}
+        self.marks: Dict[str, deque] = defaultdict(lambda: deque(maxlen=ring))
+        self.start: Dict[str, Tuple[str, float]] = {}
+        self.latency: Dict[str, List[float]] = {"entry": [], "stop": []}
+
+    def _trigger(self, sym: str, level: float) -> Optional[float]:
+        marks = self.marks.get(sym)
+        if not marks:
+            return None
+        above = marks[-1][2] >= level
+        t0 = None
+        for t, lo, hi in reversed(marks):
+            if (hi >= level) if above else (lo <= level):
+                t0 = t
+            else:
+                break
+        return t0
+
+    def tap(self, e: Event) -> None:
+        now = time.perf_counter()
+        topic, p = e.topic, e.payload
+        self.published[topic] += 1
+        if topic == "market.last":
+            px = float(p["price"])
+            self.marks[p["symbol"]].append((now, px, px))
+        elif topic == "market.bar":
+            self.marks[p["symbol"]].append((now, float(p["l"]), float(p["h"])))
+            self.bar_t[p["symbol"]] = now
+        elif topic == "orders.batch":
+            t0 = self.cycle_t.get(p.get("cycle"))
+            if t0 is not None:
+                for o in p.get("orders", ()):
+                    self.start[o["order_id"]] = ("entry", t0)
+        elif topic == "orders.planned" and p.get("order_id"):
+            if p.get("stop_id"):
+                t0 = self._trigger(p["symbol"], float(p["stop_px"])) if p.get("stop_px") is not None else None
+                if t0 is not None:
+                    self.start[p["order_id"]] = ("stop", t0)
+            elif p.get("symbol") in self.bar_t:
+                self.start[p["order_id"]] = ("entry", self.bar_t[p["symbol"]])
+        elif topic == "exec.fills" and p.get("status") == "filled":
+            hit = self.start.pop(p.get("order_id"), None)     # first fill of the order
+            if hit is not None:
+                self.latency[hit[0]].append(now - hit[1])
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {k: {"n": len(v), "p50_ms": round(_pct(v, 50) * 1e3, 2), "p99_ms": round(_pct(v, 99) * 1e3, 2),
+                    "max_ms": round(max(v, default=0.0) * 1e3, 2)} for k, v in self.latency.items()}
+
+
+def backlog(bus: EventBus) -> Dict[str, int]:
+    """Queued events per topic (summed over that topic's subscribers)."""
+    return {t: sum(q.qsize() for q in qs) for t, qs in bus.subscribers.items() if qs}
+
+
+def _build(bus: EventBus, market: SyntheticMarket, log_dir: str):
+    from macats.orchestrator import AGENTS
+    from macats.runtime import load_agent
+
+    extra = {"scanner": {"loader": market.load_ohlcv}, "portfolio": {"log_dir": log_dir}}
+    agents: Dict[str, Any] = {}
+    for key, (path, kwargs, _, _) in AGENTS.items():
+        if key == "netting" and not SETTINGS.signal_netting:
+            continue
+        kw = {**kwargs, **extra.get(key, {})}
+        if "state_dir" in kw:
+            kw["state_dir"] = None          # never restore from (or write to) the live checkpoints
+        agents[key] = load_agent(path)(bus, **kw)
+    return agents
+
+
+async def run_stage(symbols: int, tps: float, secs: float = 10.0, bar_secs: float = 2.0,
+                    seed: int = 7, signal_rate: float = 0.1) -> Dict[str, Any]:
+    """One load level on a fresh bus and agent stack."""
+    from macats.agents.signal_netting_agent import cycle_topic
+    from macats.data.feed import ManualFeed
+
+    syms = [f"SYN{i:04d}/USDT" for i in range(symbols)]
+    market = SyntheticMarket(syms, tf=SETTINGS.timeframe, seed=seed)
+    bus = EventBus()
+    probe = LatencyProbe()
+    bus.taps.append(probe.tap)
+    agents = _build(bus, market, tempfile.mkdtemp(prefix="macats-load-"))
+    scanner = agents.pop("scanner")
+    risk = agents["risk"]
+    if signal_rate > 0:
+        # injected signals must reach execution: slots and allocation for the whole universe
+        risk.max_open = symbols
+        risk.max_portfolio_allocation_pct = max(risk.max_portfolio_allocation_pct, symbols * risk.per_trade_allocation_pct)
+    inject = max(1, round(signal_rate * symbols)) if signal_rate > 0 else 0
+    tasks = [asyncio.create_task(a.run()) for a in agents.values()]
+    await asyncio.sleep(0.01)                           # let the agents subscribe
+    feed = ManualFeed(bus, publish_bars=True)
+
+    peak: Dict[str, int] = defaultdict(int)
+    samples: List[Tuple[float, int]] = []
+    lags: List[float] = []
+    running = True
+
+    async def sampler():
+        while running:
+            t = time.perf_counter()
+            await asyncio.sleep(0.05)
+            lags.append(time.perf_counter() - t - 0.05)
+            depth = backlog(bus)
+            for k, v in depth.items():
+                peak[k] = max(peak[k], v)
+            samples.append((time.perf_counter(), sum(depth.values())))
+
+    sampling = asyncio.create_task(sampler())
+    cycles = signals = injected = emitted = 0
+    t0 = time.perf_counter()
+    end, next_bar = t0 + secs, t0 + bar_secs
+    while (now := time.perf_counter()) < end:
+        for _ in range(int((now - t0) * tps) - emitted):
+            sym = syms[emitted % symbols]
+            emitted += 1
+            px, _ = market.tick(sym)
+            await feed.emit("last", sym, {"price": px, "ts": time.time()})
+        if now >= next_bar:
+            next_bar += bar_secs
+            cycles += 1
+            probe.cycle_t[cycles] = time.perf_counter()
+            ts = bar_open(time.time(), SETTINGS.timeframe)
+            for sym in syms:
+                await feed.emit("bar", sym, {"tf": SETTINGS.timeframe, "ts": ts, **market.close_bar(sym), "closed": True})
+            n = 0
+            for sym in syms:
+                n += await scanner._scan(sym, cycles)
+                await asyncio.sleep(0)
+            signals += n
+            for i in market.rng.choice(symbols, size=inject, replace=False):
+                await bus.publish(Event(topic=scanner.topic, payload=market.candidate(syms[i], cycles)))
+                injected += 1
+                n += 1
+            await bus.publish(Event(topic=cycle_topic(scanner.topic), payload={
+                "cycle": cycles, "shard": 0, "shard_count": 1, "signals": n, "symbols": syms}))
+        await asyncio.sleep(0.002)
+    elapsed = time.perf_counter() - t0
+
+    running = False
+    await sampling
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    tail = [s for s in samples if s[0] >= t0 + elapsed / 2] or samples
+    growth = (tail[-1][1] - tail[0][1]) / max(tail[-1][0] - tail[0][0], 1e-9) if len(tail) > 1 else 0.0
+    lat = probe.summary()
+    res = {
+        "symbols": symbols, "tps_target": tps, "tps": round(emitted / elapsed, 1), "cycles": cycles,
+        "signals": signals, "injected": injected, "orders": probe.published["orders.batch"] + probe.published["orders.planned"],
+        "fills": probe.published["exec.fills"], "latency": lat,
+        "backlog_peak": dict(sorted(peak.items(), key=lambda kv: -kv[1])),
+        "backlog_end": samples[-1][1] if samples else 0, "backlog_growth": round(growth, 1),
+        "loop_lag_ms": {"p99": round(_pct(lags, 99) * 1e3, 2), "max": round(max(lags, default=0.0) * 1e3, 2)},
+    }
+    why = []
+    if res["tps"] < 0.9 * tps:
+        why.append(f"generator behind ({res['tps']:.0f}/{tps:.0f} tps)")
+    if growth > 0.05 * tps and res["backlog_end"] > max(100, tps * 0.5):
+        why.append(f"queues growing (+{growth:.0f} ev/s, {res['backlog_end']} queued)")
+    worst = max(v["p99_ms"] for v in lat.values())
+    if worst > bar_secs * 1e3:
+        why.append(f"fill p99 {worst:.0f} ms > bar ({bar_secs:.1f} s)")
+    res["saturated"], res["why"] = bool(why), "; ".join(why)
+    res["valid"] = sum(v["n"] for v in lat.values()) > 0
+    return res
+
+
+async def run_load(symbols: Sequence[int], tps: Sequence[float], secs: float = 10.0, bar_secs: float = 2.0,
+                   seed: int = 7, keep_going: bool = False, echo=None, signal_rate: float = 0.1) -> Dict[str, Any]:
+    """Ramp through (symbols[i], tps[i]) stages (the shorter list repeats its last value)."""
+    n = max(len(symbols), len(tps))
+    stages = []
+    for i in range(n):
+        s, r = symbols[min(i, len(symbols) - 1)], tps[min(i, len(tps) - 1)]
+        res = await run_stage(s, r, secs, bar_secs, seed, signal_rate)
+        stages.append(res)
+        if echo:
+            echo(format_stage(res))
+        if res["saturated"] and not keep_going:
+            break
+    ok = [s for s in stages if not s["saturated"] and s["valid"]]
+    bad = [s for s in stages if s["saturated"]]
+    return {"stages": stages,
+            "capacity": {k: ok[-1][k] for k in ("symbols", "tps")} if ok else None,
+            "saturation": {k: bad[0][k] for k in ("symbols", "tps_target", "why")} if bad else None}
+
+
+def format_stage(r: Dict[str, Any]) -> str:
+    e, s = r["latency"]["entry"], r["latency"]["stop"]
+    top = ", ".join(f"{k}={v}" for k, v in list(r["backlog_peak"].items())[:3] if v)
+    return (f"{r['symbols']:5d} sym {r['tps']:8.0f}/{r['tps_target']:.0f} tps | fills {r['fills']:5d} | "
+            f"entry p50/p99 {e['p50_ms']:.1f}/{e['p99_ms']:.1f} ms (n={e['n']}) stop p99 {s['p99_ms']:.1f} ms | "
+            f"lag p99 {r['loop_lag_ms']['p99']:.1f} ms | backlog {r['backlog_end']} ({r['backlog_growth']:+.0f}/s) "
+            f"{top}" + (f" | SATURATED: {r['why']}" if r["saturated"] else "")
+            + ("" if r["valid"] else " | INVALID: no fills timed"))
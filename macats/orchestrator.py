@@ -1,31 +1,91 @@
 # macats/orchestrator.py
 import asyncio
 from macats.event_bus import EventBus
-from macats.agents.fsvzo_scanner_agent import FSVZOScannerAgent
-from macats.agents.risk_agent import RiskAgent
-from macats.agents.execution_agent import ExecutionAgent
-from macats.agents.stop_agent import StopAgent
-from macats.agents.portfolio_agent import PortfolioAgent
+from macats.runtime import Runtime, WorkerSpec, load_agent
+from macats.data.universe import DEFAULT_UNIVERSE, parse_universe
+from macats.agents.signal_netting_agent import cycle_topic
 from macats.config import SETTINGS
 
+# key -> (agent class, kwargs, topics it consumes, topics it produces)
+# The topic lists only matter when the agent is moved to a worker process (WORKER_AGENTS=scanner,...)
+# or when this process is a node on the TCP bus (BUS_ROLE=node, LOCAL_AGENTS=scanner).
+# SIGNAL_NETTING=1: scanner -> signals.candidate -> netting -> signals.target -> risk
+_SIG = "signals.candidate" if SETTINGS.signal_netting else "signals.target"
+_STATE = SETTINGS.state_dir or None     # checkpoints for risk/stops/portfolio (STATE_DIR="" disables); scanner reads risk's
+# SCANNER_HTF=4h: multi-timeframe FSVZO, 4h bars resampled locally from the scanner's timeframe
+_SCANNER = (("macats.agents.fsvzo_scanner_agent:MTFFSVZOScannerAgent", {"topic": _SIG, "htf": SETTINGS.scanner_htf, "state_dir": _STATE})
+            if SETTINGS.scanner_htf else ("macats.agents.fsvzo_scanner_agent:FSVZOScannerAgent", {"topic": _SIG, "state_dir": _STATE}))
+
+AGENTS = {
+    "scanner":   (*_SCANNER,                                                      # signals with sl/tp/atr
+                  ("exec.fills",), ("strategy.log", "market.last", _SIG, cycle_topic(_SIG))),
+    "netting":   ("macats.agents.signal_netting_agent:SignalNettingAgent", {"in_topic": _SIG},  # forwards changes only
+                  (_SIG, cycle_topic(_SIG), "exec.fills"), ("signals.target", "signals.cycle")),
+    "risk":      ("macats.agents.risk_agent:RiskAgent", {"balance": SETTINGS.paper_start_balance, "state_dir": _STATE},
+                  ("market.last", "signals.target", "signals.cycle", "exec.fills"), ("strategy.log", "orders.planned", "orders.batch")),
+    "execution": ("macats.agents.execution_agent:ExecutionAgent", {},             # paper exchange: fees, slippage, partials
+                  ("orders.planned", "orders.batch", "orders.cancel", "market.last", "market.bar"), ("exec.fills",)),
+    "stops":     ("macats.agents.stop_agent:StopAgent", {"state_dir": _STATE},    # auto flat on SL/TP/trailing/time stops
+                  ("market.last", "market.bar", "exec.fills"), ("orders.planned",)),
+    "portfolio": ("macats.agents.portfolio_agent:PortfolioAgent", {"start_balance": SETTINGS.paper_start_balance, "state_dir": _STATE},
+                  ("market.last", "exec.fills"), ("strategy.log",)),
+}
+
 async def main():
     bus = EventBus()
-    agents = [
-        FSVZOScannerAgent(bus),                         # emits signals.target with sl/tp/atr
-        RiskAgent(bus, balance=SETTINGS.paper_start_balance),
-        ExecutionAgent(bus),                            # fills paper orders
-        StopAgent(bus),                                 # auto flat on SL/TP breaches
-        PortfolioAgent(bus, start_balance=SETTINGS.paper_start_balance),
-    ]
+    prof, tasks = None, []
+    if SETTINGS.profile:
+        from macats.profiling import Profiler
+        prof = Profiler(slow_ms=SETTINGS.profile_slow_ms, dump_secs=SETTINGS.profile_dump_secs, path=SETTINGS.profile_path)
+        tasks += prof.install()
+    if SETTINGS.journal_dir:
+        from macats.journal import EventJournal       # audit trail + replay input, installed before any agent runs
+        journal = EventJournal(SETTINGS.journal_dir, topics=[t.strip() for t in SETTINGS.journal_topics.split(",") if t.strip()],
+                               segment_mb=SETTINGS.journal_segment_mb).install(bus)
+        tasks.append(asyncio.create_task(journal.run()))
+    remote = {k.strip() for k in SETTINGS.worker_agents.split(",") if k.strip()}
+    local = {k.strip() for k in SETTINGS.local_agents.split(",") if k.strip()} or set(AGENTS)
+
+    agents, specs = {}, []
+    for key, (path, kwargs, subs, pubs) in AGENTS.items():
+        if key not in local or (key == "netting" and not SETTINGS.signal_netting):
+            continue
+        if key in remote:
+            specs.append(WorkerSpec(key, [(path, kwargs)], subscribes=subs, publishes=pubs))
+        else:
+            agents[key] = load_agent(path)(bus, **kwargs)
+
+    # streaming prices: stops/portfolio see market.last as it happens, not once per scan
+    if SETTINGS.market_feed:
+        from macats.data.feed import make_feed      # aiohttp only when a feed is configured
+        agents["feed"] = make_feed(bus, SETTINGS.market_feed, parse_universe(getattr(SETTINGS, "universe", DEFAULT_UNIVERSE)), SETTINGS.timeframe)
+        if agents["feed"].publish_bars:
+            from macats.data.bar_store import STORE     # feed bars keep the shared rings current
+            tasks.append(asyncio.create_task(STORE.follow(bus)))
+
+    for key, a in agents.items():
+        tasks.append(prof.spawn(key, a.run()) if prof else asyncio.create_task(a.run()))
+    if specs:
+        tasks.append(asyncio.create_task(Runtime(bus, specs).run()))
 
-    tasks = [asyncio.create_task(a.run()) for a in agents]
+    # multi-node: one hub, any number of nodes (e.g. scanner shards with SHARD_INDEX/SHARD_COUNT)
+    if SETTINGS.bus_role:
+        from macats.remote_bus import BusServer, RemoteBus
+    if SETTINGS.bus_role == "hub":
+        tasks.append(asyncio.create_task(BusServer(bus, SETTINGS.bus_host, SETTINGS.bus_port).run()))
+    elif SETTINGS.bus_role == "node":
+        subs = {t for k in local for t in AGENTS[k][2]}
+        pubs = {t for k in local for t in AGENTS[k][3]}
+        node = SETTINGS.bus_node or f"node-{SETTINGS.shard_index}"
+        tasks.append(asyncio.create_task(RemoteBus(bus, SETTINGS.bus_host, SETTINGS.bus_port, node,
+                                                   subscribe=subs, publish=pubs).run()))
 
     async def log(topic):
         async for e in bus.subscribe(topic):
             print(f"[{topic}] {e.payload}")
 
     # lightweight console logs
-    for t in ["strategy.log", "orders.planned", "exec.fills"]:
+    for t in ["strategy.log", "orders.planned", "orders.batch", "exec.fills"]:
         tasks.append(asyncio.create_task(log(t)))
 
-    await asyncio.gather(*tasks)
\ No newline at end of file
+    await asyncio.gather(*tasks)
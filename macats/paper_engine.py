@@ -0,0 +1,304 @@
+# macats/paper_engine.py
+import bisect
+import heapq
+import itertools
+import os
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from macats.config import SETTINGS
+
+Fill = Dict[str, Any]
+
+_ids = itertools.count(1)
+_PREFIX = f"{os.getpid():x}{int(time.time()) & 0xFFFFFF:06x}"
+
+
+def new_order_id(prefix: str = "o") -> str:
+    """Unique per process run; producers stamp it so redelivered orders are filled once."""
+    return f"{prefix}-{_PREFIX}-{next(_ids)}"
+
+
+@dataclass
+class PaperConfig:
+    taker_fee_bps: float = 10.0
+    maker_fee_bps: float = 2.0
+    spread_bps: float = 2.0          # full quoted spread; market orders pay half
+    slip_atr_frac: float = 0.05      # extra slippage as a fraction of ATR
+    impact_bps: float = 10.0         # extra slippage per 100% of bar volume taken
+    max_participation: float = 0.0   # >0: fill at most this share of each bar's volume (partials)
+    latency_ms: float = 0.0          # order -> exchange delay; fills use the price after it
+
+    @classmethod
+    def from_settings(cls) -> "PaperConfig":
+        return cls(
+            taker_fee_bps=SETTINGS.taker_fee_bps,
+            maker_fee_bps=SETTINGS.maker_fee_bps,
+            spread_bps=SETTINGS.spread_bps,
+            slip_atr_frac=SETTINGS.slip_atr_frac,
+            impact_bps=SETTINGS.impact_bps,
+            max_participation=SETTINGS.max_participation,
+            latency_ms=SETTINGS.exec_latency_ms,
+        )
+
+
+class _Working:
+    __slots__ = ("id", "order", "sym", "dir", "leaves", "cum", "limit", "n")
+
+    def __init__(self, oid: str, order: Dict[str, Any], sym: str, d: int, qty: float, limit: Optional[float]):
+        self.id, self.order, self.sym, self.dir = oid, order, sym, d
+        self.leaves, self.cum, self.limit, self.n = qty, 0.0, limit, 0
+
+
+class LimitBook:
+    """
+    Resting limit orders for one symbol, price-time priority.
+    Bids fill when the market trades down to them, asks when it trades up:
+    each price range costs one bisect per side plus the levels it crosses.
+    """
+
+    def __init__(self):
+        self.bid_px: List[float] = []          # ascending
+        self.ask_px: List[float] = []          # ascending
+        self.levels: Dict[Tuple[int, float], Deque[_Working]] = {}
+        self.where: Dict[str, Tuple[int, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self.where)
+
+    def add(self, w: _Working) -> None:
+        key = (w.dir, w.limit)
+        q = self.levels.get(key)
+        if q is None:
+            q = self.levels[key] = deque()
+            bisect.insort(self.bid_px if w.dir > 0 else self.ask_px, w.limit)
+        q.append(w)
+        self.where[w.id] = key
+
+    def _drop_level(self, key: Tuple[int, float]) -> None:
+        del self.levels[key]
+        arr = self.bid_px if key[0] > 0 else self.ask_px
+        del arr[bisect.bisect_left(arr, key[1])]
+
+    def cancel(self, oid: str) -> Optional[_Working]:
+        key = self.where.pop(oid, None)
+        if key is None:
+            return None
+        q = self.levels[key]
+        for w in q:
+            if w.id == oid:
+                q.remove(w)
+                break
+        if not q:
+            self._drop_level(key)
+        return w
+
+    def crossed(self, high: float, low: float) -> List[_Working]:
+        """Resting orders the range [low, high] trades through, best price first, FIFO per level."""
+        out: List[_Working] = []
+        if self.bid_px and self.bid_px[-1] >= low:
+            for px in reversed(self.bid_px[bisect.bisect_left(self.bid_px, low):]):
+                out.extend(self.levels[(1, px)])
+        if self.ask_px and self.ask_px[0] <= high:
+            for px in self.ask_px[:bisect.bisect_right(self.ask_px, high)]:
+                out.extend(self.levels[(-1, px)])
+        return out
+
+
+class PaperEngine:
+    """
+    Simulated exchange for paper trading and backtests.
+
+      fills = engine.submit({"order_id","symbol","side":"long|short|flat","qty","price"?,
+                             "type":"market|limit","limit_price"?,"atr"?,"stop_px"?})
+      fills = engine.on_price(sym, px) / engine.on_bar(sym, h, l, c, v)
+
+    Market orders fill at the reference price (stop_px for a stop exit's first execution,
+    else the last market price, else the order's price) plus half the spread and slippage from ATR and
+    the share of bar volume taken, and pay the taker fee. Limit orders rest in a
+    LimitBook and fill at their limit (maker fee) when the market trades through them.
+    With max_participation > 0 an order takes at most that share of each bar's volume;
+    the rest works on later bars. Every fill carries order_id/fill_id, cum_qty and
+    leaves_qty; resubmitting a known order_id is a no-op.
+    """
+
+    def __init__(self, config: Optional[PaperConfig] = None, clock: Callable[[], float] = time.time,
+                 max_seen: int = 1_000_000):
+        self.cfg = config or PaperConfig()
+        self.clock = clock
+        self.max_seen = max_seen
+        self.last: Dict[str, float] = {}
+        self.volume: Dict[str, float] = {}     # last bar volume
+        self.room: Dict[str, float] = {}       # volume left in the current bar (participation)
+        self.atr: Dict[str, float] = {}
+        self.pos: Dict[str, float] = {}        # signed qty from our own fills (resolves "flat")
+        self.books: Dict[str, LimitBook] = {}
+        self.working: Dict[str, List[_Working]] = {}   # market orders waiting for volume
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._delayed: List[Tuple[float, int, _Working]] = []
+        self._seq = itertools.count()
+        self.stats = {"orders": 0, "fills": 0, "rejects": 0, "dupes": 0, "fees": 0.0}
+
+    # --------------------------- orders ---------------------------
+
+    def _reject(self, order: Dict[str, Any], reason: str) -> List[Fill]:
+        self.stats["rejects"] += 1
+        return [{**order, "status": "rejected", "reason": reason}]
+
+    def submit(self, order: Dict[str, Any], now: Optional[float] = None) -> List[Fill]:
+        oid = order.get("order_id")
+        if oid is None:
+            oid = new_order_id("px")
+            order = {**order, "order_id": oid}
+        elif oid in self._seen:
+            self.stats["dupes"] += 1
+            return []
+        self._seen[oid] = None
+        if len(self._seen) > self.max_seen:
+            self._seen.popitem(last=False)
+        self.stats["orders"] += 1
+
+        sym = str(order["symbol"])
+        side = order.get("side")
+        qty = float(order.get("qty", 0.0))
+        if side == "flat":
+            pos = self.pos.get(sym, 0.0)
+            if pos == 0.0:
+                return self._reject(order, "no position")
+            d = -1 if pos > 0 else 1
+            qty = abs(pos) if qty <= 0 else min(qty, abs(pos))
+        elif side == "long":
+            d = 1
+        elif side == "short":
+            d = -1
+        else:
+            return self._reject(order, f"bad side {side!r}")
+        if qty <= 0:
+            return self._reject(order, "qty <= 0")
+        if order.get("atr"):
+            self.atr[sym] = float(order["atr"])
+
+        limit = order.get("limit_price") if order.get("type") == "limit" else None
+        w = _Working(oid, order, sym, d, qty, float(limit) if limit is not None else None)
+        if self.cfg.latency_ms > 0:
+            now = self.clock() if now is None else now
+            heapq.heappush(self._delayed, (now + self.cfg.latency_ms / 1000.0, next(self._seq), w))
+            return []
+        return self._arrive(w)
+
+    def cancel(self, order_id: str) -> bool:
+        for book in self.books.values():
+            if book.cancel(order_id) is not None:
+                return True
+        for sym, ws in self.working.items():
+            for w in ws:
+                if w.id == order_id:
+                    ws.remove(w)
+                    return True
+        return False
+
+    def _arrive(self, w: _Working) -> List[Fill]:
+        if w.limit is not None:
+            px = self.last.get(w.sym)
+            if px is None or (px > w.limit if w.dir > 0 else px < w.limit):
+                book = self.books.get(w.sym)
+                if book is None:
+                    book = self.books[w.sym] = LimitBook()
+                book.add(w)
+                return []
+        return self._take(w, [], arrival=True)
+
+    def advance(self, now: Optional[float] = None) -> List[Fill]:
+        """Release orders whose latency has elapsed."""
+        out: List[Fill] = []
+        now = self.clock() if now is None else now
+        while self._delayed and self._delayed[0][0] <= now:
+            out.extend(self._arrive(heapq.heappop(self._delayed)[2]))
+        return out
+
+    # --------------------------- fills ---------------------------
+
+    def _fill(self, w: _Working, qty: float, px: float, maker: bool, out: List[Fill]) -> None:
+        fee = qty * px * (self.cfg.maker_fee_bps if maker else self.cfg.taker_fee_bps) / 1e4
+        w.leaves -= qty
+        w.cum += qty
+        w.n += 1
+        self.pos[w.sym] = self.pos.get(w.sym, 0.0) + w.dir * qty
+        self.stats["fills"] += 1
+        self.stats["fees"] += fee
+        o = w.order
+        out.append({**o, "status": "filled", "order_id": w.id, "fill_id": f"{w.id}.{w.n}",
+                    "qty": qty, "price": px, "fee": fee, "liquidity": "maker" if maker else "taker",
+                    "order_qty": o.get("qty"), "ref_price": o.get("price"),
+                    "cum_qty": w.cum, "leaves_qty": w.leaves})
+
+    def _take(self, w: _Working, out: List[Fill], arrival: bool = False) -> List[Fill]:
+        """Market (or marketable limit) execution against the simulated quote."""
+        o = w.order
+        # stop_px is where the stop triggered: it prices the first execution only; a remainder
+        # working on later bars trades at those bars' prices
+        ref = (o.get("stop_px") if arrival else None) or self.last.get(w.sym) or o.get("price")
+        if ref is None:
+            out.extend(self._reject(o, "no price"))
+            return out
+        ref = float(ref)
+        qty = w.leaves
+        room = self.room.get(w.sym) if self.cfg.max_participation > 0 else None
+        if room is not None:
+            qty = min(qty, room)
+        if qty > 0:
+            cfg = self.cfg
+            slip = cfg.spread_bps / 2e4 + cfg.slip_atr_frac * self.atr.get(w.sym, 0.0) / ref
+            vol = self.volume.get(w.sym)
+            if vol:
+                slip += cfg.impact_bps / 1e4 * qty / vol
+            px = ref * (1.0 + w.dir * slip)
+            if w.limit is not None:
+                px = min(px, w.limit) if w.dir > 0 else max(px, w.limit)
+            if room is not None:
+                self.room[w.sym] = room - qty
+            self._fill(w, qty, px, False, out)
+        if w.leaves > 1e-12:
+            self.working.setdefault(w.sym, []).append(w)
+        return out
+
+    # --------------------------- market data ---------------------------
+
+    def on_price(self, symbol: str, price: float, now: Optional[float] = None) -> List[Fill]:
+        self.last[symbol] = price
+        out = self.advance(now) if self._delayed else []
+        book = self.books.get(symbol)
+        if book:
+            self._cross(book, price, price, out)
+        return out
+
+    def on_bar(self, symbol: str, high: float, low: float, close: float, volume: float = 0.0,
+               now: Optional[float] = None) -> List[Fill]:
+        """A new bar: resets the participation budget and lets working orders continue."""
+        self.last[symbol] = close
+        if volume > 0:
+            self.volume[symbol] = volume
+            self.room[symbol] = volume * self.cfg.max_participation
+        out = self.advance(now) if self._delayed else []
+        book = self.books.get(symbol)
+        if book:
+            self._cross(book, high, low, out)
+        ws = self.working.pop(symbol, None)
+        if ws:
+            for w in ws:
+                self._take(w, out)
+        return out
+
+    def _cross(self, book: LimitBook, high: float, low: float, out: List[Fill]) -> None:
+        for w in book.crossed(high, low):
+            room = self.room.get(w.sym) if self.cfg.max_participation > 0 else None
+            qty = w.leaves if room is None else min(w.leaves, room)
+            if qty <= 0:
+                break
+            if room is not None:
+                self.room[w.sym] = room - qty
+            self._fill(w, qty, w.limit, True, out)
+            if w.leaves <= 1e-12:
+                book.cancel(w.id)
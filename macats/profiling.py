@@ -0,0 +1,194 @@
+# macats/profiling.py
+"""
+Opt-in per-agent profiling (PROFILE=1).
+
+  - every task step is timed (wall + CPU) through a task factory and attributed to the agent
+    whose run() created the task (a contextvar set by Profiler.spawn, inherited by child tasks)
+    and to the handler coroutine, e.g. portfolio / PortfolioAgent._on_fills
+  - a heartbeat task measures event-loop lag
+  - a watchdog thread snapshots the loop thread's stack when the heartbeat stalls, naming
+    the agent/handler that was running
+  - dump() on SIGUSR1 and/or every PROFILE_DUMP_SECS: table on stderr, JSON to PROFILE_PATH
+
+    kill -USR1 <pid>
+"""
+import asyncio
+import contextvars
+import json
+import signal
+import sys
+import threading
+import time
+import traceback
+import types
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+_agent: contextvars.ContextVar[str] = contextvars.ContextVar("macats_agent", default="-")
+
+
+@dataclass
+class StepStats:
+    steps: int = 0
+    wall: float = 0.0
+    cpu: float = 0.0
+    max_wall: float = 0.0
+    slow: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        n = max(self.steps, 1)
+        return {"steps": self.steps, "wall_s": round(self.wall, 4), "cpu_s": round(self.cpu, 4),
+                "mean_us": round(self.wall / n * 1e6, 1), "max_ms": round(self.max_wall * 1e3, 2), "slow": self.slow}
+
+
+class Profiler:
+    def __init__(self, slow_ms: float = 50.0, heartbeat_ms: float = 50.0, dump_secs: float = 0.0,
+                 path: str = "", keep_stalls: int = 20):
+        self.slow = slow_ms / 1000.0
+        self.heartbeat = heartbeat_ms / 1000.0
+        self.dump_secs = dump_secs
+        self.path = path
+        self.stats: Dict[Tuple[str, str], StepStats] = {}
+        self.lags: Deque[float] = deque(maxlen=2048)
+        self.stalls: Deque[Dict[str, Any]] = deque(maxlen=keep_stalls)
+        self.current: Optional[Tuple[str, str]] = None    # read by the watchdog thread
+        self._beat = time.perf_counter()
+        self._loop_thread: Optional[int] = None
+        self._stop = threading.Event()
+        self.started = time.time()
+
+    # --------------------------- attribution / step timing ---------------------------
+
+    def spawn(self, agent: str, coro) -> asyncio.Task:
+        """create_task for an agent's run(): it and every task it spawns are attributed to `agent`."""
+        ctx = contextvars.copy_context()
+        ctx.run(_agent.set, agent)
+        return ctx.run(asyncio.create_task, coro)
+
+    @types.coroutine
+    def _timed(self, coro):
+        key = (_agent.get(), getattr(coro, "__qualname__", type(coro).__name__))
+        st = self.stats.get(key)
+        if st is None:
+            st = self.stats[key] = StepStats()
+        value, exc = None, None
+        while True:
+            self.current = key
+            w0, c0 = time.perf_counter(), time.thread_time()
+            try:
+                y = coro.send(value) if exc is None else coro.throw(exc)
+            except StopIteration as e:
+                self._record(st, w0, c0)
+                return e.value
+            except BaseException:
+                self._record(st, w0, c0)
+                raise
+            self._record(st, w0, c0)
+            try:
+                value, exc = (yield y), None
+            except BaseException as e:        # cancellation etc. goes to the inner coroutine
+                value, exc = None, e
+
+    def _record(self, st: StepStats, w0: float, c0: float) -> None:
+        wall = time.perf_counter() - w0
+        st.steps += 1
+        st.wall += wall
+        st.cpu += time.thread_time() - c0
+        if wall > st.max_wall:
+            st.max_wall = wall
+        if wall > self.slow:
+            st.slow += 1
+        self.current = None
+
+    def _task_factory(self, loop, coro, **kw):
+        async def step(c=coro):
+            return await self._timed(c)
+        return asyncio.Task(step(), loop=loop, **kw)
+
+    # --------------------------- loop lag / watchdog ---------------------------
+
+    async def _heartbeat(self):
+        while True:
+            t = time.perf_counter()
+            await asyncio.sleep(self.heartbeat)
+            self._beat = time.perf_counter()
+            self.lags.append(self._beat - t - self.heartbeat)
+
+    def _watchdog(self):
+        reported = 0.0
+        while not self._stop.wait(self.heartbeat):
+            beat = self._beat
+            stalled = time.perf_counter() - beat - self.heartbeat
+            if stalled < self.slow:
+                continue
+            if beat == reported:                  # same stall, still going
+                self.stalls[-1]["stalled_ms"] = round(stalled * 1e3, 1)
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            reported = beat
+            agent, handler = self.current or ("-", "-")
+            self.stalls.append({"ts": time.time(), "stalled_ms": round(stalled * 1e3, 1), "agent": agent,
+                                "handler": handler, "stack": "".join(traceback.format_stack(frame)[-12:])})
+
+    async def _dump_timer(self):
+        while True:
+            await asyncio.sleep(self.dump_secs)
+            self.dump()
+
+    # --------------------------- install / report ---------------------------
+
+    def install(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> List[asyncio.Task]:
+        """Hook the running loop; returns the profiler's own tasks."""
+        loop = loop or asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        loop.set_task_factory(self._task_factory)
+        try:
+            loop.add_signal_handler(signal.SIGUSR1, self.dump)
+        except (AttributeError, NotImplementedError, RuntimeError):
+            pass                                  # no SIGUSR1 (Windows) or not the main thread
+        threading.Thread(target=self._watchdog, name="macats-profiler-watchdog", daemon=True).start()
+        tasks = [asyncio.create_task(self._heartbeat())]
+        if self.dump_secs > 0:
+            tasks.append(asyncio.create_task(self._dump_timer()))
+        return tasks
+
+    def close(self) -> None:
+        self._stop.set()
+
+    def summary(self) -> Dict[str, Any]:
+        agents: Dict[str, StepStats] = {}
+        for (agent, _), st in self.stats.items():
+            a = agents.setdefault(agent, StepStats())
+            a.steps += st.steps
+            a.wall += st.wall
+            a.cpu += st.cpu
+            a.max_wall = max(a.max_wall, st.max_wall)
+            a.slow += st.slow
+        lags = sorted(self.lags)
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "agents": {k: v.as_dict() for k, v in sorted(agents.items(), key=lambda kv: -kv[1].cpu)},
+            "handlers": {f"{a}/{h}": st.as_dict() for (a, h), st in sorted(self.stats.items(), key=lambda kv: -kv[1].cpu)},
+            "loop_lag_ms": {"p50": round(lags[len(lags) // 2] * 1e3, 2) if lags else 0.0,
+                            "p99": round(lags[int(len(lags) * 0.99)] * 1e3, 2) if lags else 0.0,
+                            "max": round(lags[-1] * 1e3, 2) if lags else 0.0},
+            "stalls": list(self.stalls),
+        }
+
+    def dump(self) -> Dict[str, Any]:
+        s = self.summary()
+        out = [f"=== PROFILE (uptime {s['uptime_s']}s, loop lag p50/p99/max "
+               f"{s['loop_lag_ms']['p50']}/{s['loop_lag_ms']['p99']}/{s['loop_lag_ms']['max']} ms) ==="]
+        out.append(f"{'agent/handler':56s} {'steps':>8s} {'cpu s':>9s} {'wall s':>9s} {'mean us':>9s} {'max ms':>8s} {'slow':>5s}")
+        for name, r in s["handlers"].items():
+            out.append(f"{name[:56]:56s} {r['steps']:8d} {r['cpu_s']:9.3f} {r['wall_s']:9.3f} {r['mean_us']:9.1f} {r['max_ms']:8.2f} {r['slow']:5d}")
+        for st in s["stalls"][-3:]:
+            out.append(f"--- stall {st['stalled_ms']} ms in {st['agent']}/{st['handler']}\n{st['stack']}")
+        print("\n".join(out), file=sys.stderr)
+        if self.path:
+            with open(self.path, "w") as f:
+                json.dump(s, f, indent=2)
+        return s
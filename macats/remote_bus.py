@@ -0,0 +1,223 @@
+# macats/remote_bus.py
+"""
+TCP backend that joins EventBuses on several nodes (star topology around one hub).
+
+  hub  : BusServer(bus, host, port)        — e.g. risk/execution/stops/portfolio node
+  node : RemoteBus(bus, host, port, node, subscribe=[...], publish=[...]) — e.g. scanner shards
+
+Frames are a 4-byte length + codec-encoded list:
+  [HELLO, node, epoch, subs]  [SUB, topics]  [EV, seq, topic, payload]  [ACK, seq]
+
+Topics in `reliable` (orders, fills, scan-cycle markers) get a per-link sequence number and stay
+buffered until ACKed; after a reconnect the buffer is resent, so delivery is at-least-once.
+Receivers drop already-seen sequence numbers on the same link (epoch resets on restart).
+Other topics are best-effort and dropped while a link is down.
+"""
+import asyncio
+import os
+import struct
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+from macats.codec import decode, encode
+from macats.event_bus import Event, EventBus
+
+RELIABLE_TOPICS = ("orders.planned", "orders.batch", "exec.fills", "signals.cycle", "signals.candidate.cycle")
+
+_HELLO, _SUB, _EV, _ACK = 1, 2, 3, 4
+_LEN = struct.Struct("<I")
+
+
+def _frame(msg: List[Any]) -> bytes:
+    body = encode(msg)
+    return _LEN.pack(len(body)) + body
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> List[Any]:
+    n = _LEN.unpack(await reader.readexactly(4))[0]
+    return decode(await reader.readexactly(n))
+
+
+class _Peer:
+    """Delivery state for one remote node; outlives individual connections."""
+
+    def __init__(self, node: str, reliable: Iterable[str], max_unacked: int = 100_000):
+        self.node = node
+        self.reliable = frozenset(reliable)
+        self.max_unacked = max_unacked
+        self.subs: set = set()
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.seq = 0
+        self.unacked: "OrderedDict[int, bytes]" = OrderedDict()
+        self.epoch: Optional[str] = None
+        self.last_in = 0
+        self.dropped = 0
+
+    def send(self, e: Event) -> None:
+        reliable = e.topic in self.reliable
+        if not reliable and self.writer is None:
+            return
+        try:
+            data = _frame([_EV, self.seq + 1 if reliable else 0, e.topic, e.payload])
+        except TypeError:
+            self.dropped += 1      # payload not encodable (e.g. a FeatureFrame); stays local
+            return
+        if reliable:
+            self.seq += 1
+            self.unacked[self.seq] = data
+            if len(self.unacked) > self.max_unacked:
+                self.unacked.popitem(last=False)
+                self.dropped += 1
+        if self.writer is not None:
+            self.writer.write(data)
+
+    def ack(self, seq: int) -> None:
+        while self.unacked:
+            first = next(iter(self.unacked))
+            if first > seq:
+                break
+            del self.unacked[first]
+
+    def hello(self, epoch: str) -> None:
+        if epoch != self.epoch:          # peer restarted: its sequence numbers start over
+            self.epoch = epoch
+            self.last_in = 0
+
+    def connected(self, writer: asyncio.StreamWriter) -> None:
+        self.writer = writer
+        for data in self.unacked.values():
+            writer.write(data)
+
+    def accept(self, seq: int) -> bool:
+        if seq == 0:
+            return True
+        if seq <= self.last_in:
+            return False
+        self.last_in = seq
+        return True
+
+
+async def _pump(bus: EventBus, peer: _Peer, reader: asyncio.StreamReader) -> None:
+    while True:
+        msg = await _read_frame(reader)
+        kind = msg[0]
+        if kind == _EV:
+            _, seq, topic, payload = msg
+            if seq and peer.writer is not None:
+                peer.writer.write(_frame([_ACK, seq]))
+            if peer.accept(seq):
+                await bus.publish(Event(topic=topic, payload=payload, origin=peer.node))
+        elif kind == _ACK:
+            peer.ack(msg[1])
+        elif kind == _SUB:
+            peer.subs.update(msg[1])
+        if peer.writer is not None and peer.writer.transport.get_write_buffer_size() > 1 << 20:
+            await peer.writer.drain()
+
+
+def _close(writer: Optional[asyncio.StreamWriter]) -> None:
+    if writer is not None:
+        writer.close()
+
+
+class BusServer:
+    """Hub side: accepts nodes and routes events between them and the local bus by topic."""
+
+    def __init__(self, bus: EventBus, host: str = "127.0.0.1", port: int = 7411,
+                 node: str = "hub", reliable: Iterable[str] = RELIABLE_TOPICS):
+        self.bus = bus
+        self.host, self.port = host, port
+        self.node = node
+        self.reliable = tuple(reliable)
+        self.epoch = os.urandom(8).hex()
+        self.peers: Dict[str, _Peer] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    def tap(self, e: Event) -> None:
+        for p in self.peers.values():
+            if e.topic in p.subs and e.origin != p.node:
+                p.send(e)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        peer = None
+        try:
+            kind, node, epoch, subs = await _read_frame(reader)
+            if kind != _HELLO:
+                return
+            peer = self.peers.get(node)
+            if peer is None:
+                peer = self.peers[node] = _Peer(node, self.reliable)
+            _close(peer.writer)                  # a node reconnecting replaces its old link
+            peer.hello(epoch)
+            peer.subs = set(subs)
+            writer.write(_frame([_HELLO, self.node, self.epoch, []]))
+            peer.connected(writer)
+            await self.bus.publish(Event(topic="strategy.log", payload={"note": f"bus: node {node} connected"}))
+            await _pump(self.bus, peer, reader)
+        except (asyncio.IncompleteReadError, ConnectionError, OSError, ValueError):
+            pass
+        finally:
+            if peer is not None and peer.writer is writer:
+                peer.writer = None
+            _close(writer)
+
+    async def start(self) -> None:
+        self.bus.taps.append(self.tap)
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        if self.port == 0:
+            self.port = self._server.sockets[0].getsockname()[1]
+
+    async def run(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+
+class RemoteBus:
+    """Node side: keeps a link to the hub, reconnecting with backoff and resending unacked events."""
+
+    def __init__(self, bus: EventBus, host: str = "127.0.0.1", port: int = 7411, node: str = "",
+                 subscribe: Iterable[str] = (), publish: Iterable[str] = (),
+                 reliable: Iterable[str] = RELIABLE_TOPICS):
+        self.bus = bus
+        self.host, self.port = host, port
+        self.node = node or f"node-{os.getpid()}"
+        self.subscribe = set(subscribe)
+        self.publish = frozenset(publish)
+        self.epoch = os.urandom(8).hex()
+        self.peer = _Peer("hub", reliable)
+        self.connected = asyncio.Event()
+
+    def tap(self, e: Event) -> None:
+        if e.topic in self.publish and e.origin != self.peer.node:
+            self.peer.send(e)
+
+    def subscribe_remote(self, *topics: str) -> None:
+        self.subscribe.update(topics)
+        if self.peer.writer is not None:
+            self.peer.writer.write(_frame([_SUB, list(topics)]))
+
+    async def run(self) -> None:
+        self.bus.taps.append(self.tap)
+        backoff = 0.5
+        while True:
+            writer = None
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+                writer.write(_frame([_HELLO, self.node, self.epoch, sorted(self.subscribe)]))
+                kind, hub, epoch, _ = await _read_frame(reader)
+                self.peer.node = hub
+                self.peer.hello(epoch)
+                self.peer.connected(writer)
+                self.connected.set()
+                backoff = 0.5
+                await _pump(self.bus, self.peer, reader)
+            except (asyncio.IncompleteReadError, ConnectionError, OSError, ValueError):
+                pass
+            finally:
+                self.connected.clear()
+                self.peer.writer = None
+                _close(writer)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 10.0)
@@ -1,16 +1,16 @@
 # macats/reports.py
 import os, math, csv, time
 import pandas as pd
-import matplotlib.pyplot as plt
 
 LOG_DIR = "logs"
 TRADES_CSV = os.path.join(LOG_DIR, "trades.csv")
 EQUITY_CSV = os.path.join(LOG_DIR, "equity.csv")
 PLOT_PNG = os.path.join(LOG_DIR, "equity_curve.png")
 
-def load_logs():
-    trades = pd.read_csv(TRADES_CSV) if os.path.exists(TRADES_CSV) else pd.DataFrame()
-    equity = pd.read_csv(EQUITY_CSV) if os.path.exists(EQUITY_CSV) else pd.DataFrame()
+def load_logs(log_dir=LOG_DIR):
+    trades_csv, equity_csv = os.path.join(log_dir, "trades.csv"), os.path.join(log_dir, "equity.csv")
+    trades = pd.read_csv(trades_csv) if os.path.exists(trades_csv) else pd.DataFrame()
+    equity = pd.read_csv(equity_csv) if os.path.exists(equity_csv) else pd.DataFrame()
     if "ts" in trades: trades["ts"] = pd.to_datetime(trades["ts"], unit="s")
     if "ts" in equity: equity["ts"] = pd.to_datetime(equity["ts"], unit="s")
     return trades, equity
@@ -49,6 +49,9 @@ def plot_equity(equity: pd.DataFrame, out=PLOT_PNG):
     if equity.empty:
         print("No equity data to plot.")
         return
+    import matplotlib
+    matplotlib.use("Agg")   # file output only; no display needed (cron, containers)
+    import matplotlib.pyplot as plt
     equity = equity.sort_values("ts")
     plt.figure(figsize=(9,4.5))
     plt.plot(equity["ts"], equity["equity"])
@@ -59,12 +62,5 @@ def plot_equity(equity: pd.DataFrame, out=PLOT_PNG):
     print(f"Saved {out}")
 
 if __name__ == "__main__":
-    trades, equity = load_logs()
-    stats = compute_stats(trades, equity)
-    print("=== STATS ===")
-    for k,v in stats.items():
-        if "rate" in k or "drawdown" in k:
-            print(f"{k}: {v:.2%}")
-        else:
-            print(f"{k}: {v}")
-    plot_equity(equity)
\ No newline at end of file
+    from macats.cli import main
+    main(["report"])
@@ -0,0 +1,212 @@
+# macats/risk_engine.py
+import math
+from statistics import NormalDist
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+class RiskEngine:
+    """
+    Incremental EWMA covariance of log returns across the universe, plus parametric
+    (delta-normal) portfolio VaR.
+
+      eng.on_price(sym, px)            # any number of times
+      eng.sample()                     # every `sample_secs`: one rank-1 update, O(n^2)
+      eng.set_position(sym, qty)
+      eng.var(), eng.var_with(sym, dqty), eng.max_add(sym, limit, direction), eng.marginal_var()
+
+    Σ·w is cached, so the VaR of a proposed order is O(1):
+        σ'^2 = σ^2 + 2Δ(Σw)_k + Δ^2 Σ_kk      (Δ = order notional on symbol k)
+    Symbols with fewer than `min_obs` returns use `fallback_vol` (daily) and
+    `fallback_corr` so a fresh listing isn't treated as riskless.
+    VaR is scaled from the sampling interval to `horizon_secs` with sqrt(time).
+    """
+
+    def __init__(self, sample_secs: float = 60.0, halflife: float = 720.0, confidence: float = 0.99,
+                 horizon_secs: float = 86400.0, min_obs: int = 30, fallback_vol: float = 0.04,
+                 fallback_corr: float = 0.6, capacity: int = 64):
+        self.lam = 0.5 ** (1.0 / halflife)
+        self.z = NormalDist().inv_cdf(confidence)
+        self.scale = math.sqrt(horizon_secs / sample_secs)
+        self.min_obs = min_obs
+        self.fallback_var = (fallback_vol / math.sqrt(86400.0 / sample_secs)) ** 2
+        self.fallback_corr = fallback_corr
+
+        self.index: Dict[str, int] = {}
+        self.symbols: List[str] = []
+        self.cov = np.zeros((capacity, capacity))
+        self.px = np.full(capacity, np.nan)        # latest price
+        self.prev = np.full(capacity, np.nan)      # price at the previous sample
+        self.qty = np.zeros(capacity)              # signed position
+        self.obs = np.zeros(capacity, dtype=np.int64)
+        self.samples = 0
+
+        self._eff: Optional[np.ndarray] = None     # Σ with fallbacks for cold symbols
+        self._w = np.zeros(0)                      # notional exposure at last refresh
+        self._sw = np.zeros(0)                     # Σ w
+        self._var2 = 0.0                           # w' Σ w
+        self._tmp = np.zeros((capacity, capacity))
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    # --------------------------- universe ---------------------------
+
+    def _grow(self) -> None:
+        n, cap = len(self.symbols), self.cov.shape[0] * 2
+        cov = np.zeros((cap, cap))
+        cov[:n, :n] = self.cov[:n, :n]
+        self.cov, self._tmp = cov, np.zeros((cap, cap))
+        for name, fill in (("px", np.nan), ("prev", np.nan), ("qty", 0.0)):
+            a = np.full(cap, fill)
+            a[:n] = getattr(self, name)[:n]
+            setattr(self, name, a)
+        obs = np.zeros(cap, dtype=np.int64)
+        obs[:n] = self.obs[:n]
+        self.obs = obs
+
+    def _slot(self, symbol: str) -> int:
+        i = self.index.get(symbol)
+        if i is None:
+            if len(self.symbols) == self.cov.shape[0]:
+                self._grow()
+            i = self.index[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+            self._eff = None
+        return i
+
+    # --------------------------- updates ---------------------------
+
+    def on_price(self, symbol: str, price: float) -> None:
+        if price > 0:
+            i = self._slot(symbol)       # may grow the arrays
+            self.px[i] = price
+
+    def sample(self) -> None:
+        """Rank-1 EWMA update with the log returns since the previous sample."""
+        n = len(self.symbols)
+        if n == 0:
+            return
+        px, prev = self.px[:n], self.prev[:n]
+        seen = ~np.isnan(prev) & ~np.isnan(px)
+        r = np.zeros(n)
+        np.log(px, out=r, where=seen)
+        r[seen] -= np.log(prev[seen])
+        cov, tmp = self.cov[:n, :n], self._tmp[:n, :n]
+        cov *= self.lam
+        np.outer(r, r * (1.0 - self.lam), out=tmp)
+        cov += tmp
+        self.obs[:n] += seen
+        prev[:] = np.where(np.isnan(px), prev, px)
+        self.samples += 1
+        self._eff = None
+        self.refresh()
+
+    def set_position(self, symbol: str, qty: float) -> None:
+        i = self._slot(symbol)
+        d = qty - self.qty[i]
+        self.qty[i] = qty
+        px = self.px[i]
+        if d and not np.isnan(px) and len(self._sw) == len(self.symbols):
+            # keep Σw current between samples: O(n)
+            dn = d * px
+            eff = self._effective()
+            self._var2 += 2 * dn * self._sw[i] + dn * dn * eff[i, i]
+            self._sw += eff[:, i] * dn
+            self._w[i] += dn
+        else:
+            self.refresh()
+
+    def add_position(self, symbol: str, dqty: float) -> None:
+        self.set_position(symbol, self.qty[self._slot(symbol)] + dqty)
+
+    # --------------------------- checkpoint ---------------------------
+
+    def state(self) -> Dict[str, Any]:
+        """Covariance history and prices (positions are restored by the owner)."""
+        n = len(self.symbols)
+        return {"symbols": list(self.symbols), "samples": self.samples,
+                "cov": self.cov[:n, :n].tobytes(), "px": self.px[:n].tobytes(),
+                "prev": self.prev[:n].tobytes(), "obs": self.obs[:n].tobytes()}
+
+    def load_state(self, st: Dict[str, Any]) -> None:
+        """Restore into a fresh engine."""
+        for sym in st["symbols"]:
+            self._slot(sym)
+        n = len(st["symbols"])
+        self.cov[:n, :n] = np.frombuffer(st["cov"]).reshape(n, n)
+        self.px[:n] = np.frombuffer(st["px"])
+        self.prev[:n] = np.frombuffer(st["prev"])
+        self.obs[:n] = np.frombuffer(st["obs"], dtype=np.int64)
+        self.samples = st["samples"]
+        self._eff = None
+        self.refresh()
+
+    # --------------------------- VaR ---------------------------
+
+    def _effective(self) -> np.ndarray:
+        if self._eff is None:
+            n = len(self.symbols)
+            eff = self.cov[:n, :n].copy()
+            cold = self.obs[:n] < self.min_obs
+            if cold.any():
+                var = np.diag(eff).copy()
+                var[cold] = self.fallback_var
+                sd = np.sqrt(var)
+                corr = np.outer(sd, sd) * self.fallback_corr
+                eff[cold, :] = corr[cold, :]
+                eff[:, cold] = corr[:, cold]
+                eff[cold, cold] = var[cold]
+            self._eff = eff
+        return self._eff
+
+    def refresh(self) -> None:
+        """Recompute exposure at latest prices and Σw: O(n^2)."""
+        n = len(self.symbols)
+        w = np.nan_to_num(self.qty[:n] * self.px[:n])
+        eff = self._effective()
+        self._w, self._sw = w, eff @ w
+        self._var2 = float(w @ self._sw)
+
+    def var(self) -> float:
+        """Portfolio VaR (currency units) at the configured confidence and horizon."""
+        return self.z * self.scale * math.sqrt(max(self._var2, 0.0))
+
+    def _delta(self, symbol: str, dqty: float):
+        i = self._slot(symbol)
+        if len(self._sw) != len(self.symbols):
+            self.refresh()
+        px = self.px[i]
+        return i, (0.0 if np.isnan(px) else dqty * px)
+
+    def var_with(self, symbol: str, dqty: float) -> float:
+        """Portfolio VaR if `dqty` were added to `symbol`, in O(1)."""
+        i, dn = self._delta(symbol, dqty)
+        v2 = self._var2 + 2 * dn * self._sw[i] + dn * dn * self._effective()[i, i]
+        return self.z * self.scale * math.sqrt(max(v2, 0.0))
+
+    def max_add(self, symbol: str, limit: float, direction: float = 1.0) -> float:
+        """Largest notional that can be added in `direction` (+1 buy / -1 sell) keeping VaR <= limit."""
+        i, _ = self._delta(symbol, 0.0)
+        a = self._effective()[i, i]
+        b = 2 * direction * self._sw[i]
+        c = self._var2 - (limit / (self.z * self.scale)) ** 2
+        if a <= 0:
+            return math.inf if b <= 0 and c <= 0 else 0.0
+        disc = b * b - 4 * a * c
+        if disc < 0:
+            return 0.0
+        return max(0.0, (-b + math.sqrt(disc)) / (2 * a))
+
+    def marginal_var(self) -> Dict[str, float]:
+        """dVaR/d(notional) per symbol; component VaR is notional * marginal and sums to VaR."""
+        sd = math.sqrt(max(self._var2, 0.0))
+        if sd == 0.0:
+            return {s: 0.0 for s in self.symbols}
+        m = self.z * self.scale * self._sw / sd
+        return dict(zip(self.symbols, m.tolist()))
+
+    def component_var(self) -> Dict[str, float]:
+        m = self.marginal_var()
+        return {s: float(self._w[i]) * m[s] for i, s in enumerate(self.symbols)}
@@ -0,0 +1,123 @@
+# macats/rolling.py
+from typing import Dict, Hashable, Iterable, Optional
+
+import numpy as np
+
+
+class RollingStats:
+    """
+    Fixed-capacity ring buffer with O(1) rolling stats over one or more window lengths.
+
+    push(x) updates running sum / sum of squares / positive count for every window
+    (one add + one evict each) and an EWMA. Sums are rebuilt from the buffer once per
+    `capacity` pushes so float drift can't accumulate. Memory is fixed at `capacity`.
+
+        rs = RollingStats(capacity=64, windows=(8, 32), ewm_alpha=0.2)
+        rs.push(1.0); rs.sum(8); rs.mean(32); rs.var(32); rs.pos_frac(8); rs.ewma
+    """
+
+    def __init__(self, capacity: int = 256, windows: Iterable[int] = (), ewm_alpha: float = 0.1):
+        windows = tuple(sorted({int(w) for w in windows if int(w) > 0})) or (int(capacity),)
+        self.capacity = max(int(capacity), windows[-1])
+        self.windows = windows
+        self.ewm_alpha = float(ewm_alpha)
+        self._buf = np.zeros(self.capacity, dtype=np.float64)
+        self._n = 0
+        self._sum = [0.0] * len(windows)
+        self._sq = [0.0] * len(windows)
+        self._pos = [0] * len(windows)
+        self.ewma: Optional[float] = None
+
+    def __len__(self) -> int:
+        return min(self._n, self.capacity)
+
+    def _wi(self, w: Optional[int]) -> int:
+        if w is None:
+            return len(self.windows) - 1
+        try:
+            return self.windows.index(w)
+        except ValueError:
+            raise KeyError(f"window {w} not tracked (have {self.windows})") from None
+
+    def push(self, x: float) -> None:
+        x = float(x)
+        n, cap, buf = self._n, self.capacity, self._buf
+        for k, w in enumerate(self.windows):
+            if n >= w:
+                old = float(buf[(n - w) % cap])
+                self._sum[k] -= old
+                self._sq[k] -= old * old
+                self._pos[k] -= old > 0
+            self._sum[k] += x
+            self._sq[k] += x * x
+            self._pos[k] += x > 0
+        buf[n % cap] = x
+        self._n = n + 1
+        self.ewma = x if self.ewma is None else self.ewma + self.ewm_alpha * (x - self.ewma)
+        if self._n % cap == 0:
+            self._resync()
+
+    def _resync(self) -> None:
+        for k, w in enumerate(self.windows):
+            v = self.values(w)
+            self._sum[k] = float(v.sum())
+            self._sq[k] = float((v * v).sum())
+            self._pos[k] = int((v > 0).sum())
+
+    # --------------------------- queries ---------------------------
+
+    def count(self, w: Optional[int] = None) -> int:
+        return min(self._n, self.windows[self._wi(w)])
+
+    def last(self) -> Optional[float]:
+        return float(self._buf[(self._n - 1) % self.capacity]) if self._n else None
+
+    def sum(self, w: Optional[int] = None) -> float:
+        return self._sum[self._wi(w)]
+
+    def mean(self, w: Optional[int] = None) -> float:
+        n = self.count(w)
+        return self._sum[self._wi(w)] / n if n else 0.0
+
+    def var(self, w: Optional[int] = None) -> float:
+        """Population variance over the window."""
+        k, n = self._wi(w), self.count(w)
+        if n == 0:
+            return 0.0
+        m = self._sum[k] / n
+        return max(0.0, self._sq[k] / n - m * m)
+
+    def std(self, w: Optional[int] = None) -> float:
+        return self.var(w) ** 0.5
+
+    def pos_frac(self, w: Optional[int] = None) -> float:
+        n = self.count(w)
+        return self._pos[self._wi(w)] / n if n else 0.0
+
+    def values(self, w: Optional[int] = None) -> np.ndarray:
+        """Last min(n, w) values, oldest first (a copy; for prompts/logging, not the hot path)."""
+        n = min(self._n, self.capacity if w is None else int(w))
+        idx = np.arange(self._n - n, self._n) % self.capacity
+        return self._buf[idx]
+
+
+class KeyedRollingStats(dict):
+    """Per-key RollingStats (e.g. per symbol), created on first access with a shared config."""
+
+    def __init__(self, capacity: int = 256, windows: Iterable[int] = (), ewm_alpha: float = 0.1):
+        super().__init__()
+        self._cfg = {"capacity": capacity, "windows": tuple(windows), "ewm_alpha": ewm_alpha}
+
+    def __missing__(self, key: Hashable) -> RollingStats:
+        rs = self[key] = RollingStats(**self._cfg)
+        return rs
+
+    def push(self, key: Hashable, x: float) -> RollingStats:
+        rs = self[key]
+        rs.push(x)
+        return rs
+
+    def snapshot(self, w: Optional[int] = None) -> Dict[Hashable, Dict[str, float]]:
+        return {k: {"n": rs.count(w), "sum": rs.sum(w), "mean": rs.mean(w), "pos_frac": rs.pos_frac(w),
+                    "ewma": rs.ewma if rs.ewma is not None else 0.0}
+                for k, rs in self.items()}
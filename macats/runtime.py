@@ -0,0 +1,183 @@
+# macats/runtime.py
+import asyncio
+import importlib
+import multiprocessing as mp
+import pickle
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from macats.event_bus import Event, EventBus
+
+# ("package.module:ClassName", {kwargs}) — agents are built inside the worker, so specs stay picklable
+AgentRef = Tuple[str, Dict[str, Any]]
+
+
+def load_agent(path: str):
+    mod, _, name = path.partition(":")
+    return getattr(importlib.import_module(mod), name)
+
+
+@dataclass
+class WorkerSpec:
+    """
+    One worker process with its own event loop and EventBus.
+      subscribes : topics forwarded parent -> worker
+      publishes  : topics forwarded worker -> parent
+    Anything not listed stays local to the process that published it.
+    """
+    name: str
+    agents: List[AgentRef]
+    subscribes: Tuple[str, ...] = ()
+    publishes: Tuple[str, ...] = ()
+    max_restarts: int = 5
+    restart_window: float = 300.0     # secs; restarts older than this are forgotten
+
+
+class PipeBridge:
+    """
+    Connects a local EventBus to a multiprocessing Pipe.
+    Outgoing: a bus tap queues events on `out_topics` that didn't come from `peer`.
+    Incoming: events read from the pipe are republished locally tagged with origin=`peer`,
+    so they are never echoed back.
+    """
+
+    def __init__(self, bus: EventBus, conn, peer: str, out_topics):
+        self.bus = bus
+        self.conn = conn
+        self.peer = peer
+        self.out_topics = frozenset(out_topics)
+        self._outbox: asyncio.Queue = asyncio.Queue()
+        self._closed = False
+
+    def tap(self, e: Event) -> None:
+        if e.topic in self.out_topics and e.origin != self.peer and not self._closed:
+            self._outbox.put_nowait(e)
+
+    async def _send(self) -> None:
+        while True:
+            e = await self._outbox.get()
+            try:
+                self.conn.send((e.topic, e.payload))
+            except (BrokenPipeError, EOFError, OSError):
+                return
+            except Exception as ex:   # unpicklable payload: drop it, keep the link
+                await self.bus.publish(Event(topic="strategy.log", payload={"note": f"bridge {self.peer}: dropped {e.topic}: {ex}"}))
+
+    async def _recv(self) -> None:
+        while True:
+            try:
+                raw = await asyncio.to_thread(self.conn.recv_bytes)
+            except (EOFError, OSError):
+                return
+            try:
+                topic, payload = pickle.loads(raw)
+            except Exception as ex:   # e.g. a shared frame unlinked before we mapped it: drop it, keep the link
+                await self.bus.publish(Event(topic="strategy.log", payload={"note": f"bridge {self.peer}: dropped event: {ex!r}"}))
+                continue
+            await self.bus.publish(Event(topic=topic, payload=payload, origin=self.peer))
+
+    async def run(self) -> None:
+        self.bus.taps.append(self.tap)
+        sender = asyncio.create_task(self._send())
+        try:
+            await self._recv()
+        finally:
+            self._closed = True
+            sender.cancel()
+            self.bus.taps.remove(self.tap)
+
+
+# --------------------------- worker side ---------------------------
+
+def _worker_main(spec: WorkerSpec, conn) -> None:
+    async def main():
+        bus = EventBus()
+        bridge = PipeBridge(bus, conn, "parent", spec.publishes)
+        agents = [load_agent(path)(bus, **kwargs) for path, kwargs in spec.agents]
+        tasks = [asyncio.create_task(a.run()) for a in agents]
+        link = asyncio.create_task(bridge.run())
+        # exit when the parent goes away or any agent dies (supervisor restarts us)
+        done, _ = await asyncio.wait([link, *tasks], return_when=asyncio.FIRST_COMPLETED)
+        for t in done:
+            if t is not link and t.exception() is not None:
+                raise t.exception()
+
+    asyncio.run(main())
+
+
+# --------------------------- parent side ---------------------------
+
+@dataclass
+class _Worker:
+    spec: WorkerSpec
+    proc: Any = None
+    conn: Any = None
+    bridge_task: Optional[asyncio.Task] = None
+    restarts: List[float] = field(default_factory=list)
+
+
+class Runtime:
+    """
+    Runs chosen agents in supervised worker processes, bridged to the parent bus.
+
+        rt = Runtime(bus, [WorkerSpec("scanner", [("macats.agents.fsvzo_scanner_agent:FSVZOScannerAgent", {})],
+                                      publishes=("strategy.log", "market.last", "signals.target"))])
+        await rt.run()      # starts, supervises and restarts crashed workers
+
+    Workers are spawned (not forked) so they get a clean interpreter and event loop.
+    """
+
+    def __init__(self, bus: EventBus, specs: List[WorkerSpec], poll_secs: float = 0.5):
+        self.bus = bus
+        self.workers = [_Worker(s) for s in specs]
+        self.poll_secs = poll_secs
+        self._ctx = mp.get_context("spawn")
+
+    def _start(self, w: _Worker) -> None:
+        parent_conn, child_conn = self._ctx.Pipe(duplex=True)
+        w.proc = self._ctx.Process(target=_worker_main, args=(w.spec, child_conn), name=f"macats-{w.spec.name}", daemon=True)
+        w.proc.start()
+        child_conn.close()
+        w.conn = parent_conn
+        bridge = PipeBridge(self.bus, parent_conn, w.spec.name, w.spec.subscribes)
+        w.bridge_task = asyncio.create_task(bridge.run())
+
+    def _stop(self, w: _Worker) -> None:
+        if w.proc is not None and w.proc.is_alive():
+            w.proc.terminate()
+            w.proc.join(timeout=2)
+        if w.conn is not None:
+            w.conn.close()
+        if w.bridge_task is not None:
+            w.bridge_task.cancel()
+
+    async def _restart(self, w: _Worker) -> bool:
+        now = time.monotonic()
+        w.restarts = [t for t in w.restarts if now - t < w.spec.restart_window]
+        if len(w.restarts) >= w.spec.max_restarts:
+            await self.bus.publish(Event(topic="strategy.log", payload={"note": f"worker {w.spec.name}: too many restarts, giving up"}))
+            return False
+        w.restarts.append(now)
+        await asyncio.sleep(min(30.0, 0.5 * 2 ** (len(w.restarts) - 1)))   # backoff
+        self._start(w)
+        return True
+
+    async def run(self) -> None:
+        for w in self.workers:
+            self._start(w)
+        live = list(self.workers)
+        try:
+            while live:
+                await asyncio.sleep(self.poll_secs)
+                for w in list(live):
+                    if w.proc.is_alive():
+                        continue
+                    code = w.proc.exitcode
+                    self._stop(w)
+                    await self.bus.publish(Event(topic="strategy.log", payload={"note": f"worker {w.spec.name} exited ({code}), restarting"}))
+                    if not await self._restart(w):
+                        live.remove(w)
+        finally:
+            for w in self.workers:
+                self._stop(w)
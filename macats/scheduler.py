@@ -0,0 +1,141 @@
+# macats/scheduler.py
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+_UNIT_SECS = {"m": 60, "h": 3600, "d": 86400, "w": 604800, "wk": 604800}
+_WEEK_OFFSET = 4 * 86400   # epoch is a Thursday; weekly bars open on Monday 00:00 UTC
+
+Key = Tuple[str, str, str]   # (symbol, timeframe, kind) with kind "bar" | "price"
+
+
+def timeframe_seconds(tf: str) -> int:
+    """'15m' -> 900, '1h' -> 3600, '1d' -> 86400, '1w'/'1wk' -> 604800."""
+    tf = tf.strip().lower()
+    num = tf.rstrip("abcdefghijklmnopqrstuvwxyz")
+    unit = tf[len(num):]
+    if unit not in _UNIT_SECS:
+        raise ValueError(f"Unsupported timeframe: {tf}")
+    return int(num or 1) * _UNIT_SECS[unit]
+
+
+def bar_open(ts: float, tf: str) -> float:
+    """Open time (epoch secs, UTC-aligned) of the bar containing ts."""
+    sec = timeframe_seconds(tf)
+    off = _WEEK_OFFSET if sec % 604800 == 0 else 0
+    return ((ts - off) // sec) * sec + off
+
+
+def next_bar_close(ts: float, tf: str) -> float:
+    """First bar close strictly after ts."""
+    return bar_open(ts, tf) + timeframe_seconds(tf)
+
+
+def closed_bars(df, tf: str, now: Optional[float] = None):
+    """Drop the still-forming bar(s) from an OHLCV frame indexed by bar open time."""
+    now = time.time() if now is None else now
+    idx = df.index
+    if hasattr(idx, "as_unit"):
+        opens = idx.as_unit("ns").asi8 / 1e9
+        return df[opens + timeframe_seconds(tf) <= now]
+    return df
+
+
+class BarScheduler:
+    """
+    Wakes consumers when bars close instead of polling on a fixed sleep.
+
+    Due times for many (symbol, timeframe) pairs live in one heap. A "bar" entry is due
+    `close_delay` secs after each bar close (exchanges need a moment to finalise the bar).
+    An optional "price" entry per pair fires every `fast_interval` secs in between, for
+    cheap price-only refreshes (stops) that don't need a bar fetch.
+
+        sched = BarScheduler()
+        sched.add("BTC/USDT", "1h", fast_interval=5)
+        while True:
+            for sym, tf, kind in await sched.next_due(): ...
+    """
+
+    def __init__(self, close_delay: float = 2.0, clock: Callable[[], float] = time.time):
+        self.close_delay = close_delay
+        self.clock = clock
+        self._heap: List[Tuple[float, int, int, Key]] = []
+        self._seq = itertools.count()
+        self._active: Set[Key] = set()
+        self._gen: Dict[Key, int] = {}     # bumped on re-add: entries from before a remove are stale
+        self._fast: Dict[Tuple[str, str], float] = {}
+        self._changed = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._active)
+
+    def _push(self, due: float, key: Key) -> None:
+        heapq.heappush(self._heap, (due, next(self._seq), self._gen[key], key))
+        self._changed.set()
+
+    def _live(self, entry: Tuple[float, int, int, Key]) -> bool:
+        return entry[3] in self._active and entry[2] == self._gen[entry[3]]
+
+    def _track(self, key: Key) -> None:
+        self._active.add(key)
+        self._gen[key] = self._gen.get(key, 0) + 1
+
+    def _next(self, key: Key, now: float) -> float:
+        sym, tf, kind = key
+        if kind == "price":
+            return now + self._fast[(sym, tf)]
+        return next_bar_close(now - self.close_delay, tf) + self.close_delay
+
+    def add(self, symbol: str, tf: str, fast_interval: Optional[float] = None, run_now: bool = True) -> None:
+        """Track a pair. run_now=True makes the first bar entry due immediately (warm start)."""
+        now = self.clock()
+        key = (symbol, tf, "bar")
+        if key not in self._active:
+            self._track(key)
+            self._push(now if run_now else self._next(key, now), key)
+        if fast_interval:
+            self._fast[(symbol, tf)] = float(fast_interval)
+            pkey = (symbol, tf, "price")
+            if pkey not in self._active:
+                self._track(pkey)
+                self._push(now + fast_interval, pkey)
+
+    def remove(self, symbol: str, tf: Optional[str] = None) -> None:
+        """Stop tracking; heap entries are dropped lazily when they come due."""
+        for key in [k for k in self._active if k[0] == symbol and (tf is None or k[1] == tf)]:
+            self._active.discard(key)
+            self._fast.pop((key[0], key[1]), None)
+
+    def due_in(self) -> Optional[float]:
+        while self._heap and not self._live(self._heap[0]):
+            heapq.heappop(self._heap)
+        return (self._heap[0][0] - self.clock()) if self._heap else None
+
+    def pop_due(self) -> List[Key]:
+        """All entries due now, each rescheduled to its next due time."""
+        now = self.clock()
+        out: List[Key] = []
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            if not self._live(entry):
+                continue
+            key = entry[3]
+            out.append(key)
+            self._push(self._next(key, now), key)
+        return out
+
+    async def next_due(self) -> List[Key]:
+        while True:
+            delay = self.due_in()
+            if delay is not None and delay <= 0:
+                due = self.pop_due()
+                if due:
+                    return due
+                continue
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,212 @@
+# macats/stop_book.py
+import bisect
+import heapq
+from dataclasses import astuple, dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# trigger kinds; "trail" follows the best price, "time" fires at `expires`
+SL, TP, TRAIL, TIME = "sl", "tp", "trail", "time"
+_PRIORITY = {SL: 0, TRAIL: 1, TIME: 2, TP: 3}   # same-bar ambiguity: assume the worse outcome first
+
+
+@dataclass
+class StopOrder:
+    id: int
+    symbol: str
+    kind: str               # sl | tp | trail | time
+    side: str               # side of the position it protects: long | short
+    qty: float
+    level: float = 0.0      # trigger price (unused for time stops)
+    trail: float = 0.0      # trailing distance in price units
+    peak: float = 0.0       # best price seen since activation (trailing)
+    expires: Optional[float] = None
+    group: Optional[int] = None   # OCO: members cancel each other
+
+    @property
+    def below(self) -> bool:
+        """Triggers when price falls to level (long SL/trail, short TP)."""
+        return (self.side == "long") != (self.kind == TP)
+
+
+class _SymBook:
+    __slots__ = ("below", "above", "trailing")
+
+    def __init__(self):
+        self.below: List[Tuple[float, int]] = []   # fire when low  <= level -> suffix
+        self.above: List[Tuple[float, int]] = []   # fire when high >= level -> prefix
+        self.trailing: Set[int] = set()
+
+
+class StopBook:
+    """
+    Price-indexed stop book: per symbol, two sorted (level, id) arrays.
+    A tick/bar finds every triggered stop with one bisect per side and a slice:
+    O(log n + k). Trailing stops move only when the best price improves; time stops
+    sit in a heap. OCO groups (brackets) cancel their siblings when one member fires.
+    """
+
+    def __init__(self):
+        self._next_id = 1
+        self._next_group = 1
+        self.orders: Dict[int, StopOrder] = {}
+        self._books: Dict[str, _SymBook] = {}
+        self._members: Dict[int, Set[int]] = {}
+        self._time: List[Tuple[float, int]] = []
+
+    def __len__(self) -> int:
+        return len(self.orders)
+
+    def _book(self, symbol: str) -> _SymBook:
+        b = self._books.get(symbol)
+        if b is None:
+            b = self._books[symbol] = _SymBook()
+        return b
+
+    # --------------------------- add / cancel ---------------------------
+
+    def _index(self, o: StopOrder) -> None:
+        b = self._book(o.symbol)
+        bisect.insort(b.below if o.below else b.above, (o.level, o.id))
+
+    def _unindex(self, o: StopOrder) -> None:
+        b = self._books.get(o.symbol)
+        if b is None or o.kind == TIME:
+            return
+        arr = b.below if o.below else b.above
+        i = bisect.bisect_left(arr, (o.level, o.id))
+        if i < len(arr) and arr[i][1] == o.id:
+            del arr[i]
+
+    def add(self, symbol: str, kind: str, side: str, qty: float, level: float = 0.0,
+            trail: float = 0.0, ref_price: float = 0.0, expires: Optional[float] = None,
+            group: Optional[int] = None) -> StopOrder:
+        if kind == TRAIL and (ref_price <= 0 or trail <= 0):
+            raise ValueError("trailing stop needs ref_price > 0 and trail > 0")
+        o = StopOrder(self._next_id, symbol, kind, side, float(qty), float(level), float(trail),
+                      float(ref_price), expires, group)
+        self._next_id += 1
+        if kind == TRAIL:
+            o.level = o.peak - o.trail if side == "long" else o.peak + o.trail
+        self._insert(o)
+        return o
+
+    def _insert(self, o: StopOrder) -> None:
+        if o.kind == TRAIL:
+            self._book(o.symbol).trailing.add(o.id)
+        self.orders[o.id] = o
+        if o.group is not None:
+            self._members.setdefault(o.group, set()).add(o.id)
+        if o.kind == TIME:
+            heapq.heappush(self._time, (float(o.expires), o.id))
+        else:
+            self._index(o)
+
+    def add_bracket(self, symbol: str, side: str, qty: float, sl: Optional[float] = None,
+                    tp: Optional[float] = None, trail: Optional[float] = None,
+                    ref_price: float = 0.0, expires: Optional[float] = None) -> List[StopOrder]:
+        """SL/TP/trailing/time legs for one entry, linked as an OCO group."""
+        g = self._next_group
+        self._next_group += 1
+        legs = []
+        if sl is not None:
+            legs.append(self.add(symbol, SL, side, qty, level=sl, group=g))
+        if tp is not None:
+            legs.append(self.add(symbol, TP, side, qty, level=tp, group=g))
+        if trail:
+            legs.append(self.add(symbol, TRAIL, side, qty, trail=trail, ref_price=ref_price, group=g))
+        if expires is not None:
+            legs.append(self.add(symbol, TIME, side, qty, expires=expires, group=g))
+        return legs
+
+    def cancel(self, order_id: int) -> Optional[StopOrder]:
+        o = self.orders.pop(order_id, None)
+        if o is None:
+            return None
+        self._unindex(o)     # time stops are dropped lazily from the heap
+        if o.kind == TRAIL:
+            self._books[o.symbol].trailing.discard(o.id)
+        if o.group is not None:
+            m = self._members.get(o.group)
+            if m is not None:
+                m.discard(o.id)
+                if not m:
+                    del self._members[o.group]
+        return o
+
+    def cancel_group(self, group: int) -> List[StopOrder]:
+        return [o for o in (self.cancel(i) for i in list(self._members.get(group, ()))) if o]
+
+    def cancel_symbol(self, symbol: str) -> int:
+        ids = [i for i, o in self.orders.items() if o.symbol == symbol]
+        for i in ids:
+            self.cancel(i)
+        return len(ids)
+
+    # --------------------------- checkpoint ---------------------------
+
+    def state(self) -> Dict[str, Any]:
+        return {"next_id": self._next_id, "next_group": self._next_group,
+                "orders": [list(astuple(o)) for o in self.orders.values()]}
+
+    @classmethod
+    def from_state(cls, st: Dict[str, Any]) -> "StopBook":
+        book = cls()
+        for row in st["orders"]:
+            book._insert(StopOrder(*row))
+        book._next_id, book._next_group = st["next_id"], st["next_group"]
+        return book
+
+    # --------------------------- triggering ---------------------------
+
+    def _fire(self, hits: List[StopOrder]) -> List[StopOrder]:
+        fired = []
+        for o in sorted(hits, key=lambda o: (_PRIORITY[o.kind], o.id)):
+            if o.id not in self.orders:
+                continue       # cancelled by an OCO sibling that fired first
+            self.cancel(o.id)
+            if o.group is not None:
+                self.cancel_group(o.group)
+            fired.append(o)
+        return fired
+
+    def on_bar(self, symbol: str, high: float, low: float) -> List[StopOrder]:
+        """Check a price range (bar high/low, or high == low for a tick); returns fired stops."""
+        b = self._books.get(symbol)
+        if b is None:
+            return []
+        hits = []
+        if b.below:
+            i = bisect.bisect_left(b.below, (low, -1))
+            hits += [self.orders[oid] for _, oid in b.below[i:]]
+        if b.above:
+            j = bisect.bisect_right(b.above, (high, float("inf")))
+            hits += [self.orders[oid] for _, oid in b.above[:j]]
+        fired = self._fire(hits) if hits else []
+        if b.trailing:
+            self._trail(b, high, low)
+        return fired
+
+    def on_tick(self, symbol: str, price: float) -> List[StopOrder]:
+        return self.on_bar(symbol, price, price)
+
+    def _trail(self, b: _SymBook, high: float, low: float) -> None:
+        # after the trigger check: within a bar we can't know whether the high came first
+        for oid in list(b.trailing):
+            o = self.orders[oid]
+            if o.side == "long" and high > o.peak:
+                self._unindex(o)
+                o.peak, o.level = high, high - o.trail
+                self._index(o)
+            elif o.side == "short" and low < o.peak:
+                self._unindex(o)
+                o.peak, o.level = low, low + o.trail
+                self._index(o)
+
+    def on_time(self, now: float) -> List[StopOrder]:
+        hits = []
+        while self._time and self._time[0][0] <= now:
+            _, oid = heapq.heappop(self._time)
+            o = self.orders.get(oid)
+            if o is not None:
+                hits.append(o)
+        return self._fire(hits) if hits else []
@@ -0,0 +1,121 @@
+# macats/tracing.py
+"""
+Tick-to-trade tracing across the agent pipeline.
+
+A trace rides in the event payload and is extended by each stage:
+
+    payload["trace"] = {"id": "9c1e...", "parent"?: "...", "marks": [["scan", ns], ["fetched", ns], ...]}
+
+Entries:    scan -> fetched -> signal -> netted -> risk -> planned -> filled -> ledger
+Stop exits: trigger -> planned -> filled -> ledger     (parent = the entry's trace id)
+
+Marks are time.monotonic_ns(): comparable across processes on one host (worker processes),
+not across machines. Payloads are shared by every subscriber, so mark() returns a copy.
+PortfolioAgent appends each finished trace to <log_dir>/traces.bin (codec records) and
+puts its id in trades.csv; `python -m macats traces` prints the per-stage latency breakdown.
+"""
+import os
+import struct
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, Optional
+
+from macats.codec import decode_from, encode
+from macats.config import SETTINGS
+
+Trace = Dict[str, Any]
+
+
+def start(stage: str = "scan", parent: Optional[str] = None) -> Optional[Trace]:
+    if not SETTINGS.trace:
+        return None
+    t: Trace = {"id": uuid.uuid4().hex[:16], "marks": [[stage, time.monotonic_ns()]]}
+    if parent:
+        t["parent"] = parent
+    return t
+
+
+def mark(trace: Optional[Trace], stage: str) -> Optional[Trace]:
+    if trace is None:
+        return None
+    return {**trace, "marks": trace["marks"] + [[stage, time.monotonic_ns()]]}
+
+
+def carry(payload: Dict[str, Any], stage: str) -> Optional[Trace]:
+    """The incoming event's trace, marked with this stage (None if untraced)."""
+    return mark(payload.get("trace"), stage)
+
+
+def trace_id(payload: Dict[str, Any]) -> str:
+    t = payload.get("trace")
+    return t["id"] if t else ""
+
+
+# --------------------------- export ---------------------------
+
+class TraceExporter:
+    """Appends finished traces as codec records: ids, stage names, t0 (ns) and per-mark offsets (us)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def export(self, trace: Optional[Trace], **fields: Any) -> None:
+        if not trace:
+            return
+        marks = trace["marks"]
+        t0 = marks[0][1]
+        rec = {"id": trace["id"], "parent": trace.get("parent", ""), "t0": t0,
+               "stages": [m[0] for m in marks], "us": [(m[1] - t0) // 1000 for m in marks], **fields}
+        with open(self.path, "ab") as f:
+            f.write(encode(rec))
+
+
+def read_traces(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, "rb") as f:
+        buf = f.read()
+    i = 0
+    while i < len(buf):
+        try:
+            rec, i = decode_from(buf, i)
+        except (IndexError, ValueError, struct.error):
+            return                        # torn tail after a crash
+        if i > len(buf):
+            return
+        yield rec
+
+
+# --------------------------- report ---------------------------
+
+def _pct(xs: List[float], q: float) -> float:
+    return xs[min(len(xs) - 1, int(len(xs) * q))] if xs else 0.0
+
+
+def latency_report(traces) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """{"entry"|"stop": {"scan->fetched": {"n","p50_ms","p90_ms","p99_ms","max_ms"}, ..., "total": ...}}"""
+    spans: Dict[str, Dict[str, List[float]]] = {}
+    for t in traces:
+        kind = "stop" if t["stages"][0] == "trigger" else "entry"
+        by = spans.setdefault(kind, {})
+        st, us = t["stages"], t["us"]
+        for k in range(1, len(st)):
+            by.setdefault(f"{st[k - 1]}->{st[k]}", []).append((us[k] - us[k - 1]) / 1e3)
+        by.setdefault("total", []).append(us[-1] / 1e3)
+    out: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for kind, by in spans.items():
+        out[kind] = {}
+        for span, xs in by.items():
+            xs.sort()
+            out[kind][span] = {"n": len(xs), "p50_ms": round(_pct(xs, 0.5), 3), "p90_ms": round(_pct(xs, 0.9), 3),
+                               "p99_ms": round(_pct(xs, 0.99), 3), "max_ms": round(xs[-1], 3)}
+    return out
+
+
+def format_report(rep: Dict[str, Dict[str, Dict[str, float]]]) -> str:
+    lines = []
+    for kind, spans in rep.items():
+        lines.append(f"=== {kind} ({spans['total']['n']} traces) ===")
+        lines.append(f"{'stage':24s} {'n':>6s} {'p50 ms':>10s} {'p90 ms':>10s} {'p99 ms':>10s} {'max ms':>10s}")
+        for span, r in spans.items():
+            lines.append(f"{span:24s} {r['n']:6d} {r['p50_ms']:10.3f} {r['p90_ms']:10.3f} {r['p99_ms']:10.3f} {r['max_ms']:10.3f}")
+    return "\n".join(lines)
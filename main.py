@@ -1,8 +1,6 @@
-from dotenv import load_dotenv
-load_dotenv()
+import sys
 
-import asyncio
-from macats.orchestrator import main as orchestrator_main
+from macats.cli import main
 
 if __name__ == "__main__":
-    asyncio.run(orchestrator_main())
\ No newline at end of file
+    sys.exit(main(["run"]))